@@ -0,0 +1,10 @@
+# coding=utf-8
+# Licensed Materials - Property of IBM
+# Copyright IBM Corp. 2020
+
+"""
+Benchmarks of the local engines in :py:mod:`streamsx.geospatial.local`.
+
+The suites follow the conventions of airspeed velocity (asv), run them with ``asv run`` from the package directory.
+Without asv the cases can be run and reported with ``python -m benchmarks.run`` from the package directory.
+"""
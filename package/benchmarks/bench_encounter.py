@@ -0,0 +1,74 @@
+# coding=utf-8
+# Licensed Materials - Property of IBM
+# Copyright IBM Corp. 2020
+
+"""Benchmarks of the local FlightPathEncounter engine over traffic density, index type and grid size."""
+
+import numpy as np
+
+from streamsx.geospatial.local import FlightPathEncounterEngine
+
+from benchmarks import workloads
+
+# grid size the quadtree cases run with, the quadtree does not use the grid divisions
+_QUADTREE_DIVS = 20
+
+
+def _engine(divs, index_type):
+    west, south, east, north = workloads.BBOX
+    return FlightPathEncounterEngine(north_latitude=north, south_latitude=south, west_longitude=west, east_longitude=east,
+                                     num_latitude_divs=divs, num_longitude_divs=divs, altitude_search_radius=300,
+                                     search_radius=5000, time_search_interval=120000, index_type=index_type)
+
+
+class EncounterSuite(object):
+    """Encounter detection for aircraft in Observation3D format reported every 5 seconds."""
+
+    params = ([1000, 10000], [5, 20, 80], ['grid', 'quadtree'])
+    param_names = ['objects', 'divs', 'index_type']
+    observations = 30000
+    timeout = 600
+
+    def setup(self, objects, divs, index_type):
+        if index_type == 'quadtree' and divs != _QUADTREE_DIVS:
+            raise NotImplementedError()
+        self.traffic = workloads.aircraft(objects, self.observations, seed=3)
+        self.columns = dict((name, np.array([o[name] for o in self.traffic])) for name in self.traffic[0])
+
+    def time_process(self, objects, divs, index_type):
+        engine = _engine(divs, index_type)
+        for observation in self.traffic:
+            engine.process(observation)
+
+    def time_process_columns(self, objects, divs, index_type):
+        _engine(divs, index_type).process_columns(self.columns)
+
+    def track_latency_p50(self, objects, divs, index_type):
+        return workloads.summary(workloads.latencies(_engine(divs, index_type).process, self.traffic))[1]
+    track_latency_p50.unit = 'us'
+
+    def track_latency_p99(self, objects, divs, index_type):
+        return workloads.summary(workloads.latencies(_engine(divs, index_type).process, self.traffic))[2]
+    track_latency_p99.unit = 'us'
+
+    def track_events(self, objects, divs, index_type):
+        engine = _engine(divs, index_type)
+        return sum(len(engine.process(observation)) for observation in self.traffic)
+    track_events.unit = 'events'
+
+    def peakmem_process(self, objects, divs, index_type):
+        engine = _engine(divs, index_type)
+        for observation in self.traffic:
+            engine.process(observation)
+
+    def report(self, objects, divs, index_type):
+        engine = _engine(divs, index_type)
+        events = [0]
+
+        def process(observation):
+            events[0] += len(engine.process(observation))
+        throughput, p50, p99 = workloads.summary(workloads.latencies(process, self.traffic))
+        stats = engine.stats
+        return {'throughput': throughput, 'p50': p50, 'p99': p99, 'events': events[0],
+                'cells/obs': stats['nCellsVisited'] / float(stats['nObservations']),
+                'candidates/obs': stats['nCandidates'] / float(stats['nObservations'])}
@@ -0,0 +1,78 @@
+# coding=utf-8
+# Licensed Materials - Property of IBM
+# Copyright IBM Corp. 2020
+
+"""Benchmarks of the local RegionMatch engine over region counts, polygon complexities and grid cell sizes."""
+
+import time
+
+from streamsx.geospatial.local import RegionMatchEngine
+
+from benchmarks import workloads
+
+
+class RegionMatchSuite(object):
+    """Per-tuple and micro-batch matching of moving devices against star shaped regions."""
+
+    params = ([100, 1000, 10000], [8, 64, 1024], [0.01, 0.05])
+    param_names = ['regions', 'vertices', 'cell_size']
+    observations = 20000
+    devices = 2000
+    timeout = 600
+
+    def setup(self, regions, vertices, cell_size):
+        if regions * vertices > 1000000:
+            # WKT of more than a million vertices takes minutes to generate
+            raise NotImplementedError()
+        self.regions = workloads.regions(regions, vertices, seed=1)
+        self.arrays = workloads.moving_devices(self.devices, self.observations, seed=2)
+        self.tuples = workloads.device_tuples(*self.arrays)
+
+    def _engine(self, cell_size, cell_map=False):
+        engine = RegionMatchEngine(cell_size=cell_size, cell_map=cell_map)
+        for region in self.regions:
+            engine.process_region(region)
+        return engine
+
+    def time_add_regions(self, regions, vertices, cell_size):
+        self._engine(cell_size)
+
+    def time_load_regions(self, regions, vertices, cell_size):
+        RegionMatchEngine(cell_size=cell_size).load_regions(self.regions)
+
+    def time_process(self, regions, vertices, cell_size):
+        engine = self._engine(cell_size)
+        for device in self.tuples:
+            engine.process(device)
+
+    def time_process_cell_map(self, regions, vertices, cell_size):
+        engine = self._engine(cell_size, cell_map=True)
+        for device in self.tuples:
+            engine.process(device)
+
+    def time_region_match_batch(self, regions, vertices, cell_size):
+        engine = self._engine(cell_size)
+        engine.region_match_batch(*self.arrays)
+
+    def track_latency_p50(self, regions, vertices, cell_size):
+        return workloads.summary(workloads.latencies(self._engine(cell_size).process, self.tuples))[1]
+    track_latency_p50.unit = 'us'
+
+    def track_latency_p99(self, regions, vertices, cell_size):
+        return workloads.summary(workloads.latencies(self._engine(cell_size).process, self.tuples))[2]
+    track_latency_p99.unit = 'us'
+
+    def peakmem_process(self, regions, vertices, cell_size):
+        engine = self._engine(cell_size)
+        for device in self.tuples:
+            engine.process(device)
+
+    def report(self, regions, vertices, cell_size):
+        engine = self._engine(cell_size)
+        throughput, p50, p99 = workloads.summary(workloads.latencies(engine.process, self.tuples))
+        cell_map = workloads.summary(workloads.latencies(self._engine(cell_size, cell_map=True).process, self.tuples))[0]
+        engine = self._engine(cell_size)
+        start = time.perf_counter()
+        events = engine.region_match_batch(*self.arrays)
+        batch = len(self.tuples) / (time.perf_counter() - start)
+        return {'throughput': throughput, 'p50': p50, 'p99': p99, 'cell map throughput': cell_map, 'batch throughput': batch, 'events': len(events['id'])}
@@ -0,0 +1,74 @@
+# coding=utf-8
+# Licensed Materials - Property of IBM
+# Copyright IBM Corp. 2020
+
+"""Runs the benchmark cases without asv and prints throughput, p50/p99 latency and peak RSS.
+
+Each case runs in its own process, so that the peak RSS is the one of the case. Run from the package directory::
+
+    python -m benchmarks.run                   # all cases
+    python -m benchmarks.run --quick           # smallest parameters only
+    python -m benchmarks.run --suite encounter --param index_type=quadtree
+"""
+
+import argparse
+import itertools
+import multiprocessing
+import sys
+
+from benchmarks import workloads
+from benchmarks.bench_encounter import EncounterSuite
+from benchmarks.bench_regionmatch import RegionMatchSuite
+
+SUITES = {'regionmatch': RegionMatchSuite, 'encounter': EncounterSuite}
+
+
+def _run_case(suite, params, queue):
+    instance = suite()
+    try:
+        instance.setup(*params)
+    except NotImplementedError:
+        queue.put(None)
+        return
+    result = instance.report(*params)
+    result['peak RSS MB'] = workloads.peak_rss_mb()
+    queue.put(result)
+
+
+def cases(suite, quick=False, selected=None):
+    """Returns the parameter combinations of a suite, the first value of each parameter only if `quick` is set."""
+    params = [values[:1] if quick else values for values in suite.params]
+    for combination in itertools.product(*params):
+        named = dict(zip(suite.param_names, combination))
+        if selected and any(str(named.get(k)) != v for k, v in selected.items()):
+            continue
+        yield combination
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--suite', choices=sorted(SUITES), action='append', help='Suite to run, all suites by default.')
+    parser.add_argument('--quick', action='store_true', help='Run the smallest parameters only.')
+    parser.add_argument('--param', action='append', default=[], help='Run the cases with this parameter value only, given as name=value.')
+    args = parser.parse_args(argv)
+    selected = dict(p.split('=', 1) for p in args.param)
+    context = multiprocessing.get_context('spawn')
+    for name in args.suite or sorted(SUITES):
+        suite = SUITES[name]
+        print(name + ': ' + suite.__doc__)
+        for params in cases(suite, args.quick, selected):
+            queue = context.Queue()
+            process = context.Process(target=_run_case, args=(suite, params, queue))
+            process.start()
+            result = queue.get()
+            process.join()
+            label = ' '.join('%s=%s' % p for p in zip(suite.param_names, params))
+            if result is None:
+                print('  %-45s skipped' % label)
+                continue
+            print('  %-45s %s' % (label, '  '.join('%s %.1f' % item if isinstance(item[1], float) else '%s %d' % item for item in sorted(result.items()))))
+            sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main()
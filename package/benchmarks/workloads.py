@@ -0,0 +1,145 @@
+# coding=utf-8
+# Licensed Materials - Property of IBM
+# Copyright IBM Corp. 2020
+
+"""Seeded generators of synthetic workloads and the measurement helpers shared by the suites."""
+
+import math
+import resource
+import sys
+import time
+
+import numpy as np
+
+# Berlin and its surroundings
+BBOX = (13.0, 52.2, 13.8, 52.8)
+
+_METERS_PER_DEGREE = 6371008.8 * math.pi / 180.0
+
+
+def regions(count, vertices, bbox=BBOX, seed=0, max_radius=0.02):
+    """Returns `count` star shaped regions of schema RegionMatchSchema.Regions with `vertices` vertices each.
+
+    Args:
+        count(int): Number of regions.
+        vertices(int): Number of vertices of each polygon.
+        bbox(tuple): ``(west, south, east, north)`` of the area the regions are placed in.
+        seed(int): Seed of the random generator.
+        max_radius(float): Maximum radius of a region in degrees.
+
+    Returns:
+        list: Region dictionaries.
+    """
+    rnd = np.random.RandomState(seed)
+    west, south, east, north = bbox
+    angles = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    result = []
+    for i in range(count):
+        x = rnd.uniform(west, east)
+        y = rnd.uniform(south, north)
+        r = rnd.uniform(0.2, 1.0) * max_radius * np.where(np.arange(vertices) % 2, 0.6, 1.0)
+        xs = x + r * np.cos(angles) / math.cos(math.radians(y))
+        ys = y + r * np.sin(angles)
+        ring = ','.join('%.7f %.7f' % p for p in zip(np.append(xs, xs[0]), np.append(ys, ys[0])))
+        result.append({'id': 'r%d' % i, 'polygonAsWKT': 'POLYGON((' + ring + '))', 'removeRegion': False,
+                       'notifyOnEntry': True, 'notifyOnExit': True, 'notifyOnHangout': True, 'minimumDwellTime': 60, 'timeout': 600})
+    return result
+
+
+def moving_devices(devices, observations, bbox=BBOX, seed=0, interval=10.0, speed=15.0):
+    """Returns observations of devices moving on random walks, ordered by time.
+
+    Args:
+        devices(int): Number of devices.
+        observations(int): Total number of observations.
+        bbox(tuple): ``(west, south, east, north)`` of the area the devices move in.
+        seed(int): Seed of the random generator.
+        interval(float): Seconds between two observations of a device.
+        speed(float): Speed of the devices in meters per second.
+
+    Returns:
+        tuple: Arrays ``(latitudes, longitudes, ids, timestamps)``, timestamps in seconds since epoch.
+    """
+    rnd = np.random.RandomState(seed)
+    west, south, east, north = bbox
+    steps = -(-observations // devices)
+    heading = rnd.uniform(0, 2 * np.pi, devices) + np.cumsum(rnd.normal(0, 0.3, (steps, devices)), axis=0)
+    step = speed * interval / _METERS_PER_DEGREE
+    lats = rnd.uniform(south, north, devices) + np.cumsum(step * np.cos(heading), axis=0)
+    lons = rnd.uniform(west, east, devices) + np.cumsum(step * np.sin(heading) / math.cos(math.radians((south + north) / 2)), axis=0)
+    # reflect at the borders of the area
+    lats = south + np.abs((lats - south + (north - south)) % (2 * (north - south)) - (north - south))
+    lons = west + np.abs((lons - west + (east - west)) % (2 * (east - west)) - (east - west))
+    ts = 1577836800.0 + interval * np.arange(steps)[:, None] + rnd.uniform(0, interval, devices)[None, :]
+    ids = np.tile(np.array(['d%d' % i for i in range(devices)]), steps)
+    order = np.argsort(ts.ravel(), kind='stable')[:observations]
+    return lats.ravel()[order], lons.ravel()[order], ids[order], ts.ravel()[order]
+
+
+def device_tuples(lats, lons, ids, timestamps):
+    """Converts the arrays of :py:func:`moving_devices` to tuples of schema RegionMatchSchema.Devices."""
+    return [{'id': i, 'latitude': y, 'longitude': x, 'timeStamp': t, 'matchEventType': '', 'regionName': ''}
+            for y, x, i, t in zip(lats.tolist(), lons.tolist(), ids.tolist(), timestamps.tolist())]
+
+
+def aircraft(objects, observations, bbox=BBOX, seed=0, interval=5000):
+    """Returns observations of aircraft flying straight at constant speed in Observation3D format, ordered by time.
+
+    Args:
+        objects(int): Number of aircraft.
+        observations(int): Total number of observations.
+        bbox(tuple): ``(west, south, east, north)`` of the area the aircraft start in.
+        seed(int): Seed of the random generator.
+        interval(int): Milliseconds between two observations of an aircraft.
+
+    Returns:
+        list: Observation dictionaries.
+    """
+    rnd = np.random.RandomState(seed)
+    west, south, east, north = bbox
+    lat0 = rnd.uniform(south, north, objects)
+    lon0 = rnd.uniform(west, east, objects)
+    alt0 = rnd.choice([900.0, 1500.0, 3000.0, 6000.0, 10000.0], objects) + rnd.uniform(-150, 150, objects)
+    azimuth = rnd.uniform(0, 360, objects)
+    speed = rnd.uniform(60, 260, objects)
+    climb = np.where(rnd.uniform(size=objects) < 0.2, rnd.uniform(-10, 10, objects), 0.0)
+    offset = rnd.randint(0, interval, objects)
+    result = []
+    start = 1577836800000
+    for i in range(observations):
+        o = i % objects
+        elapsed = (i // objects) * interval + int(offset[o])
+        seconds = elapsed / 1000.0
+        a = math.radians(azimuth[o])
+        latitude = lat0[o] + speed[o] * seconds * math.cos(a) / _METERS_PER_DEGREE
+        longitude = lon0[o] + speed[o] * seconds * math.sin(a) / (_METERS_PER_DEGREE * math.cos(math.radians(latitude)))
+        result.append({'entityId': 'a%d' % o, 'latitude': float(latitude), 'longitude': float(longitude),
+                       'altitude': float(alt0[o] + climb[o] * seconds), 'observationTime': start + elapsed,
+                       'azimuth': float(azimuth[o]), 'groundSpeed': float(speed[o]), 'altitudeChangeRate': float(climb[o])})
+    result.sort(key=lambda obs: obs['observationTime'])
+    return result
+
+
+def latencies(func, items):
+    """Calls `func` for each item, returns the array of the latencies in seconds."""
+    result = np.empty(len(items), dtype=np.float64)
+    clock = time.perf_counter
+    for i, item in enumerate(items):
+        start = clock()
+        func(item)
+        result[i] = clock() - start
+    return result
+
+
+def summary(latency):
+    """Returns throughput per second, p50 and p99 latency in microseconds of an array of latencies in seconds."""
+    total = latency.sum()
+    p50, p99 = np.percentile(latency, [50, 99]) * 1e6
+    return (len(latency) / total if total > 0 else float('inf'), float(p50), float(p99))
+
+
+def peak_rss_mb():
+    """Returns the peak resident set size of the process in MiB."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return rss / (1024.0 * 1024.0) if sys.platform == 'darwin' else rss / 1024.0
@@ -2,7 +2,7 @@ from setuptools import setup
 import streamsx.geospatial
 setup(
   name = 'streamsx.geospatial',
-  packages = ['streamsx.geospatial'],
+  packages = ['streamsx.geospatial', 'streamsx.geospatial.local'],
   include_package_data=True,
   version = streamsx.geospatial.__version__,
   description = 'Geospatial integration for IBM Streams',
@@ -20,6 +20,7 @@ setup(
     'Programming Language :: Python :: 3.6',
   ],
   install_requires=['streamsx>=1.14.6,<2.0'],
+  extras_require={'local': ['numpy']},
   
   test_suite='nose.collector',
   tests_require=['nose']
@@ -5,9 +5,24 @@
 """
 """
 
+import sys
 
 __version__='1.1.1'
 
 __all__ = [ 'FlightPathEncounter', 'region_match' ]
-from streamsx.geospatial._geospatial import region_match, FlightPathEncounter
 
+# the topology stack is imported on first use of region_match or FlightPathEncounter,
+# so that the local engines can be imported without it (module __getattr__ requires Python 3.7)
+if sys.version_info < (3, 7):
+    from streamsx.geospatial._geospatial import region_match, FlightPathEncounter
+else:
+    def __getattr__(name):
+        if name in __all__:
+            from streamsx.geospatial import _geospatial
+            value = getattr(_geospatial, name)
+            globals()[name] = value
+            return value
+        raise AttributeError("module 'streamsx.geospatial' has no attribute " + repr(name))
+
+    def __dir__():
+        return sorted(set(globals()) | set(__all__))
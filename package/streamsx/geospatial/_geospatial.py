@@ -6,11 +6,17 @@ import os
 import streamsx.spl.op as op
 import streamsx.spl.types
 from streamsx.topology.schema import CommonSchema, StreamSchema
+from streamsx.topology.topology import Routing
 from streamsx.spl.types import rstring
 import datetime
 import json
-from streamsx.geospatial.schema import RegionMatchSchema
+from streamsx.geospatial.schema import RegionMatchSchema, FlighPathEncounterSchema
 import streamsx.topology.composite
+from streamsx.geospatial._tiling import _Tiling, _TileRouter, _HomeTile
+from streamsx.geospatial._metrics import _MetricsCounter
+from streamsx.geospatial._restore import _InitialRegions
+from streamsx.geospatial._unchanged import _SkipUnchanged
+from streamsx.geospatial._reports import _EncounterReports, _PackEncounters
 
 def _add_toolkit_dependency(topo):
     # IMPORTANT: Dependency of this python wrapper to a specific toolkit version
@@ -39,6 +45,22 @@ class FlightPathEncounter(streamsx.topology.composite.Map):
         ...
         events = planes_stream.map(geo.FlightPathEncounter(north_latitude=52.6,south_latitude=52.4,west_longitude=13.3,east_longitude=13.5,num_latitude_divs=5,num_longitude_divs=5,search_radius=10000,altitude_search_radius=400,time_search_interval=600000), schema=FlighPathEncounterSchema.EncounterEvents)
 
+    Large areas can be split into tiles processed by parallel operators, each observation is replicated to the tiles within the halo of its position::
+
+        fpe = geo.FlightPathEncounter(north_latitude=70,south_latitude=30,west_longitude=350,east_longitude=40,num_latitude_divs=40,num_longitude_divs=50,search_radius=10000,altitude_search_radius=400,time_search_interval=60000)
+        fpe.num_latitude_tiles = 2
+        fpe.num_longitude_tiles = 4
+        events = planes_stream.map(fpe, schema=FlighPathEncounterSchema.EncounterEvents)
+
+    In busy areas the same pair of objects is found on every observation of either object. With 'report_interval' each pair is
+    reported once per interval, unless the predicted encounter changes by more than the thresholds, and with 'pack_interval'
+    the encounters of an observation are packed into one tuple of schema :py:const:`~streamsx.geospatial.schema.FlighPathEncounterSchema.EncounterLists`::
+
+        fpe.report_interval = 60000
+        fpe.report_time_threshold = 10000
+        fpe.pack_interval = 500
+        events = planes_stream.map(fpe, schema=FlighPathEncounterSchema.EncounterLists)
+
 
     .. versionadded:: 1.1
 
@@ -83,7 +105,16 @@ class FlightPathEncounter(streamsx.topology.composite.Map):
         self.encounter_distance_attribute=None
         self.encounter_time_attribute=None
         self.filter_by_bounding_box=None
+        self.index_type=None
         self.observation_attribute=None
+        self.num_latitude_tiles=None
+        self.num_longitude_tiles=None
+        self.max_ground_speed=None
+        self.metrics=None
+        self.report_interval=None
+        self.report_time_threshold=None
+        self.report_distance_threshold=None
+        self.pack_interval=None
 
         
     @property
@@ -157,6 +188,113 @@ class FlightPathEncounter(streamsx.topology.composite.Map):
     def filter_by_bounding_box(self, value):
         self._filter_by_bounding_box = value
 
+    @property
+    def index_type(self):
+        """
+            str: The spatial index used for the flying objects. ``'grid'`` is the fixed grid of num_latitude_divs x num_longitude_divs cells over the bounding box. ``'quadtree'`` selects an index that splits cells where the traffic is dense and keeps sparse areas coarse, it is supported by :py:class:`~streamsx.geospatial.local.FlightPathEncounterEngine` only. The default is ``'grid'``.
+        """
+        return self._index_type
+
+    @index_type.setter
+    def index_type(self, value):
+        self._index_type = value
+
+    @property
+    def num_latitude_tiles(self):
+        """
+            int: Number of latitude tiles (rows) the bounding box is split into. Each tile is processed by its own FlightPathEncounter operator, so that the detection scales over several hosts. An observation is sent to its home tile and to all tiles within the halo of 'search_radius' plus the distance both objects of an encounter can travel within 'time_search_interval' at 'max_ground_speed'. Each tile emits the encounters of the observations in its home tile only, so encounters found in the overlapping halos are not duplicated. The default is 1.
+        """
+        return self._num_latitude_tiles
+
+    @num_latitude_tiles.setter
+    def num_latitude_tiles(self, value):
+        self._num_latitude_tiles = value
+
+    @property
+    def num_longitude_tiles(self):
+        """
+            int: Number of longitude tiles (columns) the bounding box is split into, see 'num_latitude_tiles'. The default is 1.
+        """
+        return self._num_longitude_tiles
+
+    @num_longitude_tiles.setter
+    def num_longitude_tiles(self, value):
+        self._num_longitude_tiles = value
+
+    @property
+    def max_ground_speed(self):
+        """
+            float: Upper bound of the ground speed of the flying objects in meters per second, used for the halo of the tiles. Encounters of objects flying faster may be missed at the tile borders. The default is 300.
+        """
+        return self._max_ground_speed
+
+    @max_ground_speed.setter
+    def max_ground_speed(self, value):
+        self._max_ground_speed = value
+
+    @property
+    def metrics(self):
+        """
+            bool: Set this parameter to ``True`` to count the observations and the detected encounters as custom metrics 'nObservations' and 'nEncounters' of pass-through operators before and after the FlightPathEncounter operators. The same counters and the counters of the work per observation are available from :py:attr:`streamsx.geospatial.local.FlightPathEncounterEngine.stats`. The default is ``False``.
+        """
+        return self._metrics
+
+    @metrics.setter
+    def metrics(self, value):
+        self._metrics = value
+
+    @property
+    def report_interval(self):
+        """
+            int: Report each pair of objects once per interval of observation time, given in milliseconds. Encounters of a pair found again within the interval, by observations of either object, are dropped by a filter after the FlightPathEncounter operators. If not specified, every encounter is emitted.
+
+            .. versionadded:: 1.2
+        """
+        return self._report_interval
+
+    @report_interval.setter
+    def report_interval(self, value):
+        self._report_interval = value
+
+    @property
+    def report_time_threshold(self):
+        """
+            int: An encounter of a pair within the 'report_interval' is emitted anyway if its encounter time differs by more than this threshold from the last emitted encounter of the pair. Given in milliseconds.
+
+            .. versionadded:: 1.2
+        """
+        return self._report_time_threshold
+
+    @report_time_threshold.setter
+    def report_time_threshold(self, value):
+        self._report_time_threshold = value
+
+    @property
+    def report_distance_threshold(self):
+        """
+            float: An encounter of a pair within the 'report_interval' is emitted anyway if its encounter distance differs by more than this threshold from the last emitted encounter of the pair. Given in meters.
+
+            .. versionadded:: 1.2
+        """
+        return self._report_distance_threshold
+
+    @report_distance_threshold.setter
+    def report_distance_threshold(self, value):
+        self._report_distance_threshold = value
+
+    @property
+    def pack_interval(self):
+        """
+            int: Pack the encounters of each observation into one tuple of schema :py:const:`~streamsx.geospatial.schema.FlighPathEncounterSchema.EncounterLists`. The encounter events are collected in tumbling windows of 'pack_interval' milliseconds, the events of an observation split by the end of a window are packed into two tuples. Requires the default encounter attribute names. If not specified, one tuple is emitted per encounter.
+
+            .. versionadded:: 1.2
+        """
+        return self._pack_interval
+
+    @pack_interval.setter
+    def pack_interval(self, value):
+        self._pack_interval = value
+
     @property
     def observation_attribute(self):
         """
@@ -171,16 +309,72 @@ class FlightPathEncounter(streamsx.topology.composite.Map):
 
     def populate(self, topology, stream, schema, name, **options):
 
+        if self.index_type not in (None, 'grid'):
+            raise ValueError("The FlightPathEncounter operator supports index_type 'grid' only, '" + str(self.index_type) + "' is available in the local engine.")
+        if self.report_interval is None and (self.report_time_threshold is not None or self.report_distance_threshold is not None):
+            raise ValueError('The report thresholds require a report_interval.')
+        packed_schema = schema
+        if self.pack_interval is not None:
+            if self.encounter_attribute is not None or self.encounter_distance_attribute is not None or self.encounter_time_attribute is not None:
+                raise ValueError('The pack_interval requires the default encounter attribute names.')
+            # the operator emits single encounters that are packed into the schema of the composite
+            schema = FlighPathEncounterSchema.EncounterEvents
+        basename = name or 'FlightPathEncounter'
+        if self.metrics is True:
+            stream = stream.filter(_MetricsCounter('nObservations', 'Number of observations processed'), name=basename + '_observations')
+        events = self._populate(topology, stream, schema, name)
+        if self.report_interval is not None:
+            reports = _EncounterReports(self.report_interval, self.report_time_threshold, self.report_distance_threshold, self.observation_attribute,
+                                        self.encounter_attribute, self.encounter_distance_attribute, self.encounter_time_attribute)
+            events = events.filter(reports, name=basename + '_reports')
+        if self.metrics is True:
+            events = events.filter(_MetricsCounter('nEncounters', 'Number of encounters detected'), name=basename + '_encounters')
+        if self.pack_interval is not None:
+            window = events.batch(datetime.timedelta(milliseconds=self.pack_interval))
+            packed = window.aggregate(_PackEncounters(self.observation_attribute), name=basename + '_pack')
+            events = packed.flat_map(name=basename + '_packed').map(schema=packed_schema, name=basename + '_lists')
+        return events
+
+    def _tiling(self):
+        rows = self.num_latitude_tiles or 1
+        cols = self.num_longitude_tiles or 1
+        if rows == 1 and cols == 1:
+            return None
+        speed = self.max_ground_speed if self.max_ground_speed is not None else 300.0
+        halo = self.search_radius + 2.0 * speed * self.time_search_interval / 1000.0
+        return _Tiling(self.north_latitude, self.south_latitude, self.west_longitude, self.east_longitude, rows, cols, halo)
+
+    def _populate(self, topology, stream, schema, name):
+        tiling = self._tiling()
+        if tiling is None:
+            return self._operator(stream, schema, name, (self.north_latitude, self.south_latitude, self.west_longitude, self.east_longitude), self.num_latitude_divs, self.num_longitude_divs, self.filter_by_bounding_box)
+
+        # the tile operators see the observations of their halo, the bounding box filter is applied before the replication
+        filter_by_bounding_box = self.filter_by_bounding_box is True
+        lat_divs, lon_divs = tiling.divisions(self.num_latitude_divs, self.num_longitude_divs)
+        # the routers forget objects when the operators drop them
+        cleanup_interval = self.cleanup_interval if self.cleanup_interval is not None else 3 * self.time_search_interval
+        results = []
+        for tile in range(len(tiling)):
+            tile_name = None if name is None else name + '_tile' + str(tile)
+            tile_stream = stream.filter(_TileRouter(tiling, tile, cleanup_interval, self.observation_attribute, filter_by_bounding_box), name=None if tile_name is None else tile_name + '_route')
+            events = self._operator(tile_stream, schema, tile_name, tiling.bounds(tile), lat_divs, lon_divs, None)
+            results.append(events.filter(_HomeTile(tiling, tile, self.observation_attribute), name=None if tile_name is None else tile_name + '_home'))
+        merge = op.Invoke(topology, 'spl.utility::Union', inputs=results, schemas=schema, name=None if name is None else name + '_union')
+        return merge.outputs[0]
+
+    def _operator(self, stream, schema, name, bounds, num_latitude_divs, num_longitude_divs, filter_by_bounding_box):
+        north_latitude, south_latitude, west_longitude, east_longitude = bounds
         _op = _FlightPathEncounter(stream=stream, schema=schema, vmArg=self.vm_arg, name=name)
         _op.params['altitudeSearchRadius'] = streamsx.spl.types.int32(self.altitude_search_radius)
-        _op.params['eastLongitude'] = streamsx.spl.types.float64(self.east_longitude)
-        _op.params['northLatitude'] = streamsx.spl.types.float64(self.north_latitude)
-        _op.params['numLatitudeDivs'] = streamsx.spl.types.int32(self.num_latitude_divs)
-        _op.params['numLongitudeDivs'] = streamsx.spl.types.int32(self.num_longitude_divs)
+        _op.params['eastLongitude'] = streamsx.spl.types.float64(east_longitude)
+        _op.params['northLatitude'] = streamsx.spl.types.float64(north_latitude)
+        _op.params['numLatitudeDivs'] = streamsx.spl.types.int32(num_latitude_divs)
+        _op.params['numLongitudeDivs'] = streamsx.spl.types.int32(num_longitude_divs)
         _op.params['searchRadius'] = streamsx.spl.types.int32(self.search_radius)
-        _op.params['southLatitude'] = streamsx.spl.types.float64(self.south_latitude)
+        _op.params['southLatitude'] = streamsx.spl.types.float64(south_latitude)
         _op.params['timeSearchInterval'] = streamsx.spl.types.int32(self.time_search_interval)
-        _op.params['westLongitude'] = streamsx.spl.types.float64(self.west_longitude)
+        _op.params['westLongitude'] = streamsx.spl.types.float64(west_longitude)
         # optional parameters
         if self.cleanup_interval is not None:
             _op.params['cleanupInterval'] = streamsx.spl.types.int32(self.cleanup_interval)
@@ -190,8 +384,8 @@ class FlightPathEncounter(streamsx.topology.composite.Map):
             _op.params['encounterDistanceAttribute'] = self.encounter_distance_attribute
         if self.encounter_time_attribute is not None:
             _op.params['encounterTimeAttribute'] = self.encounter_time_attribute
-        if self.filter_by_bounding_box is not None:
-            if self.filter_by_bounding_box is True:
+        if filter_by_bounding_box is not None:
+            if filter_by_bounding_box is True:
                 _op.params['filterByBoundingBox'] = _op.expression('true')
         if self.observation_attribute is not None:
             _op.params['observationAttribute'] = _op.attribute(stream, self.observation_attribute)
@@ -199,7 +393,7 @@ class FlightPathEncounter(streamsx.topology.composite.Map):
         return _op.outputs[0]
 
 
-def region_match(stream, region_stream, schema=RegionMatchSchema.Events, event_type_attribute=None, region_name_attribute=None, id_attribute=None, latitude_attribute=None, longitude_attribute=None, timestamp_attribute=None, name=None):
+def region_match(stream, region_stream, schema=RegionMatchSchema.Events, event_type_attribute=None, region_name_attribute=None, id_attribute=None, latitude_attribute=None, longitude_attribute=None, timestamp_attribute=None, name=None, parallel_width=None, metrics=None, skip_unchanged=None, initial_regions=None):
     """Uses the RegionMatch operator to compare device data with configured regions.
 
     Stores geographical regions (also called Geofences) together with a set of attributes per region. On the input stream it receives observations from moving devices and matches the device location against the stored regions. As a result it emits events if the device enters, leaves or is hanging out in a region. The regions can be added or removed via the region_stream. The events are send to output stream. 
@@ -210,6 +404,28 @@ def region_match(stream, region_stream, schema=RegionMatchSchema.Events, event_t
         ...
         res = geo.region_match(stream=device_stream, region_stream=region_stream)
 
+    With `parallel_width` the device stream is partitioned by the device id across several RegionMatch channels, each channel keeps the state of its devices only.
+    The regions are broadcast to every channel and the events of all channels are merged into the returned stream::
+
+        res = geo.region_match(stream=device_stream, region_stream=region_stream, parallel_width=4)
+
+    With `initial_regions` the regions of a file are added to the application bundle and emitted to the RegionMatch operator
+    whenever it starts, so a restarted job matches without waiting for the region_stream to be replayed.
+    The file can be a GeoJSON or CSV file or a snapshot written by :py:meth:`streamsx.geospatial.local.RegionMatchEngine.snapshot`,
+    see :py:func:`streamsx.geospatial.local.read_regions`. A snapshot can be created offline from recorded region tuples::
+
+        from streamsx.geospatial.local import RegionMatchEngine
+        engine = RegionMatchEngine()
+        engine.load_regions(regions)
+        engine.snapshot('/tmp/regions.snapshot')
+
+        res = geo.region_match(stream=device_stream, region_stream=region_stream, initial_regions='/tmp/regions.snapshot')
+
+    With `skip_unchanged` observations of devices reporting the same position as before are dropped before the RegionMatch operator,
+    an unchanged observation is passed on once every `skip_unchanged` seconds per device::
+
+        res = geo.region_match(stream=device_stream, region_stream=region_stream, skip_unchanged=30)
+
     Args:
         stream(streamsx.topology.topology.Stream): Stream of tuples containing device data of schema :py:const:`streamsx.geospatial.schema.RegionMatchSchema.Devices`, which is matched against all configured regions, to detect events.
         region_stream(streamsx.topology.topology.Stream): Stream of tuples containing regions of schema :py:const:`streamsx.geospatial.schema.RegionMatchSchema.Regions`
@@ -221,6 +437,10 @@ def region_match(stream, region_stream, schema=RegionMatchSchema.Events, event_t
         longitude_attribute(str): Specify the name of an attribute of type 'float64' in the region_stream, that holds the longitude of the device. If not specified the default attribute name is 'longitude'. 
         timestamp_attribute(str): Specify the name of an attribute of type 'timestamp' in the region_stream, that holds the timestamp of the device measurement. If not specified the default attribute name is 'timeStamp'. 
         name(str): Operator name in the Streams context, defaults to a generated name.
+        parallel_width(int): Number of parallel RegionMatch channels. The device stream is partitioned by a hash of the `id_attribute`, so all observations of a device are matched in the same channel. If not specified or 1, a single RegionMatch operator is used.
+        metrics(bool): Count the device observations and the events by type as custom metrics 'nObservations', 'nEvents', 'nEnterEvents', 'nExitEvents' and 'nHangoutEvents' of pass-through operators before and after the RegionMatch operator. The same counters and the counters of the work per observation are available from :py:attr:`streamsx.geospatial.local.RegionMatchEngine.stats`. If not specified, no metrics are counted.
+        skip_unchanged(float): Interval in seconds for which observations of a device at the position of its last passed observation are dropped. HANGOUT events are emitted up to this interval late, the interval must be shorter than the timeouts of the regions. If not specified, all observations are matched.
+        initial_regions(str): Path of a GeoJSON, CSV or snapshot file with regions that are emitted when the job starts, in addition to the tuples of `region_stream`. Reading the file requires the ``numpy`` package at runtime.
 
     Returns:
         :py:class:`topology_ref:streamsx.topology.topology.Stream`: Output Stream with specified schema
@@ -228,9 +448,33 @@ def region_match(stream, region_stream, schema=RegionMatchSchema.Events, event_t
     # python wrapper geospatial toolkit dependency
     _add_toolkit_dependency(stream.topology)
 
+    if metrics:
+        stream = stream.filter(_MetricsCounter('nObservations', 'Number of device observations processed'), name=(name or 'RegionMatch') + '_observations')
+
+    if initial_regions is not None:
+        stream.topology.add_file_dependency(initial_regions, 'etc')
+        initial = stream.topology.source(_InitialRegions(os.path.basename(initial_regions)), name=(name or 'RegionMatch') + '_initial')
+        region_stream = region_stream.union({initial.map(schema=RegionMatchSchema.Regions, name=(name or 'RegionMatch') + '_regions')})
+
+    if parallel_width is not None and parallel_width > 1:
+        # device state is kept per id, partitioning by id keeps each device in one channel
+        stream = stream.parallel(parallel_width, routing=Routing.KEY_PARTITIONED, keys=[id_attribute if id_attribute is not None else 'id'])
+        region_stream = region_stream.parallel(parallel_width, routing=Routing.BROADCAST)
+
+    if skip_unchanged is not None:
+        # within the parallel region each channel filters the devices of its partition
+        skip = _SkipUnchanged(skip_unchanged, id_attribute or 'id', latitude_attribute or 'latitude', longitude_attribute or 'longitude', timestamp_attribute or 'timeStamp')
+        stream = stream.filter(skip, name=(name or 'RegionMatch') + '_unchanged')
+
     _op = _RegionMatch(stream=stream, schema=schema, region_stream=region_stream, eventTypeAttribute=event_type_attribute, idAttribute=id_attribute, latitudeAttribute=latitude_attribute, longitudeAttribute=longitude_attribute, regionNameAttribute=region_name_attribute, timestampAttribute=timestamp_attribute, name=name)
 
-    return _op.outputs[0]
+    events = _op.outputs[0]
+    if parallel_width is not None and parallel_width > 1:
+        events = events.end_parallel()
+    if metrics:
+        by_type = {'ENTER': 'nEnterEvents', 'EXIT': 'nExitEvents', 'HANGOUT': 'nHangoutEvents'}
+        events = events.filter(_MetricsCounter('nEvents', 'Number of events emitted', event_type_attribute or 'matchEventType', by_type), name=(name or 'RegionMatch') + '_events')
+    return events
 
 class _RegionMatch(op.Invoke):
     def __init__(self, stream, schema, region_stream, eventTypeAttribute=None, idAttribute=None, latitudeAttribute=None, longitudeAttribute=None, regionNameAttribute=None, timestampAttribute=None, name=None):
@@ -0,0 +1,48 @@
+# coding=utf-8
+# Licensed Materials - Property of IBM
+# Copyright IBM Corp. 2020
+
+import streamsx.ec
+
+
+class _MetricsCounter(object):
+    """Pass-through filter counting the tuples as custom metrics of its operator.
+
+    Every tuple increments the metric `total`. If `attribute` is set, the tuple also increments the metric
+    that `by_value` maps the value of the attribute to.
+    The metric names are the keys of the ``stats`` dicts of the local engines.
+    """
+
+    def __init__(self, total, description, attribute=None, by_value=None):
+        self.total = total
+        self.description = description
+        self.attribute = attribute
+        self.by_value = by_value or {}
+        self._metrics = None
+
+    def __enter__(self):
+        self._metrics = {None: streamsx.ec.CustomMetric(self, name=self.total, description=self.description)}
+        for value, name in self.by_value.items():
+            self._metrics[value] = streamsx.ec.CustomMetric(self, name=name, description=self.description + ' of type ' + value)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+    def __getstate__(self):
+        # metrics are created in the Streams execution context
+        state = self.__dict__.copy()
+        state['_metrics'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    def __call__(self, tuple_):
+        metrics = self._metrics
+        if metrics is not None:
+            metrics[None] += 1
+            if self.attribute is not None:
+                metric = metrics.get(tuple_[self.attribute])
+                if metric is not None:
+                    metric += 1
+        return True
@@ -0,0 +1,100 @@
+# coding=utf-8
+# Licensed Materials - Property of IBM
+# Copyright IBM Corp. 2020
+
+import heapq
+
+from streamsx.geospatial._tiling import _observation
+
+# attribute of packed events holding the list of encounters
+ENCOUNTERS = 'encounters'
+
+
+class _EncounterReports(object):
+    """Filter of encounter events reporting each pair of objects once per `interval`.
+
+    The encounter of a pair is passed if the pair was not reported within `interval` milliseconds of observation time before,
+    or if its encounter time changed by more than `time_threshold` milliseconds or its distance by more than `distance_threshold`
+    meters since the last report of the pair. Pairs are expired in the order of their last report.
+    """
+
+    def __init__(self, interval, time_threshold=None, distance_threshold=None, observation_attribute=None, encounter_attribute=None, encounter_distance_attribute=None, encounter_time_attribute=None):
+        if interval is None or interval <= 0:
+            raise ValueError('The report interval must be positive')
+        self.interval = interval
+        self.time_threshold = time_threshold
+        self.distance_threshold = distance_threshold
+        self.observation_attribute = observation_attribute
+        self.encounter_attribute = encounter_attribute or 'encounter'
+        self.encounter_distance_attribute = encounter_distance_attribute or 'encounterDistance'
+        self.encounter_time_attribute = encounter_time_attribute or 'encounterTime'
+        # pair -> (observation time, encounter time, distance) of the last report
+        self._reported = {}
+        self._expiry = []
+        self._clock = None
+        self.suppressed = 0
+
+    def report(self, entity_id, other_id, now, when, distance):
+        """Returns if the encounter of the pair observed at `now` is reported."""
+        pair = (entity_id, other_id) if entity_id <= other_id else (other_id, entity_id)
+        self._expire(now)
+        last = self._reported.get(pair)
+        if (last is not None and now - last[0] < self.interval
+                and (self.time_threshold is None or abs(when - last[1]) <= self.time_threshold)
+                and (self.distance_threshold is None or abs(distance - last[2]) <= self.distance_threshold)):
+            self.suppressed += 1
+            return False
+        self._reported[pair] = (now, when, distance)
+        heapq.heappush(self._expiry, (now, pair))
+        return True
+
+    def _expire(self, now):
+        if self._clock is None or now > self._clock:
+            self._clock = now
+        oldest = self._clock - self.interval
+        expiry = self._expiry
+        reported = self._reported
+        while expiry and expiry[0][0] <= oldest:
+            observed, pair = heapq.heappop(expiry)
+            last = reported.get(pair)
+            if last is not None and last[0] == observed:
+                del reported[pair]
+
+    def __call__(self, tuple_):
+        observation = _observation(tuple_, self.observation_attribute)
+        return self.report(observation['entityId'], tuple_[self.encounter_attribute]['entityId'], observation['observationTime'],
+                           tuple_[self.encounter_time_attribute], tuple_[self.encounter_distance_attribute])
+
+
+def _pack(events, encounter_attribute, encounter_distance_attribute, encounter_time_attribute):
+    """Packs the encounter events of one observation into one event holding the list of encounters in its ``encounters`` attribute."""
+    fields = (encounter_attribute, encounter_distance_attribute, encounter_time_attribute)
+    packed = dict((name, value) for name, value in events[0].items() if name not in fields)
+    packed[ENCOUNTERS] = [dict((name, event[name]) for name in fields) for event in events]
+    return packed
+
+
+class _PackEncounters(object):
+    """Window aggregation packing the consecutive encounter events of each observation, returns the list of packed events."""
+
+    def __init__(self, observation_attribute=None, encounter_attribute=None, encounter_distance_attribute=None, encounter_time_attribute=None):
+        self.observation_attribute = observation_attribute
+        self.encounter_attribute = encounter_attribute or 'encounter'
+        self.encounter_distance_attribute = encounter_distance_attribute or 'encounterDistance'
+        self.encounter_time_attribute = encounter_time_attribute or 'encounterTime'
+
+    def __call__(self, events):
+        result = []
+        group = []
+        key = None
+        for event in events:
+            observation = _observation(event, self.observation_attribute)
+            observed = (observation['entityId'], observation['observationTime'])
+            if group and observed != key:
+                result.append(_pack(group, self.encounter_attribute, self.encounter_distance_attribute, self.encounter_time_attribute))
+                group = []
+            key = observed
+            group.append(event)
+        if group:
+            result.append(_pack(group, self.encounter_attribute, self.encounter_distance_attribute, self.encounter_time_attribute))
+        return result
@@ -0,0 +1,22 @@
+# coding=utf-8
+# Licensed Materials - Property of IBM
+# Copyright IBM Corp. 2020
+
+import os
+
+import streamsx.ec
+
+
+class _InitialRegions(object):
+    """Source emitting the regions of a file bundled in the etc directory of the application.
+
+    The file is read with :py:func:`streamsx.geospatial.local.read_regions`, it can be a snapshot, a GeoJSON or a CSV file.
+    """
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+
+    def __call__(self):
+        # the local package requires numpy, it is imported when the source starts
+        from streamsx.geospatial.local._regions import read_regions
+        return read_regions(os.path.join(streamsx.ec.get_application_directory(), 'etc', self.file_name))
@@ -0,0 +1,187 @@
+# coding=utf-8
+# Licensed Materials - Property of IBM
+# Copyright IBM Corp. 2020
+
+import heapq
+import math
+
+_METERS_PER_DEGREE = 6371008.8 * math.pi / 180.0
+
+
+class _Tiling(object):
+    """Splits the bounding box of the FlightPathEncounter into `rows` x `cols` tiles with a halo of `halo` meters.
+
+    Tiles are numbered row by row starting at the south west corner. An observation belongs to its home tile,
+    positions outside of the bounding box belong to the nearest border tile. An observation is replicated to all tiles
+    whose area extended by the halo contains its position.
+    """
+
+    def __init__(self, north_latitude, south_latitude, west_longitude, east_longitude, rows, cols, halo):
+        if rows < 1 or cols < 1:
+            raise ValueError('The number of tiles must be positive')
+        self.north = north_latitude
+        self.south = south_latitude
+        self.west = west_longitude
+        self.span = (east_longitude - west_longitude) % 360.0 or 360.0
+        self.rows = rows
+        self.cols = cols
+        self.halo = halo
+        self.tile_height = (north_latitude - south_latitude) / rows
+        self.tile_width = self.span / cols
+        # tiles wrap around the antimeridian if the box covers all longitudes
+        self.wraps = self.span >= 360.0
+        self._halo_lat = halo / _METERS_PER_DEGREE
+
+    def __len__(self):
+        return self.rows * self.cols
+
+    def _halo_lon(self, latitude):
+        # the halo in degrees of longitude at the pole-most latitude of the halo
+        return self._halo_lat / max(math.cos(math.radians(min(90.0, abs(latitude) + self._halo_lat))), 0.01)
+
+    def _x(self, longitude):
+        # offset east of the west border, positions west of the box get negative offsets
+        x = (longitude - self.west) % 360.0
+        if not self.wraps and x > self.span and x - self.span > 360.0 - x:
+            x -= 360.0
+        return x
+
+    def _row(self, latitude):
+        return min(self.rows - 1, max(0, int(math.floor((latitude - self.south) / self.tile_height))))
+
+    def _col(self, x):
+        col = int(math.floor(x / self.tile_width))
+        if self.wraps:
+            return col % self.cols
+        return min(self.cols - 1, max(0, col))
+
+    def contains(self, latitude, longitude):
+        """Returns ``True`` if the position is inside the bounding box."""
+        return self.south <= latitude <= self.north and (longitude - self.west) % 360.0 <= self.span
+
+    def home(self, latitude, longitude):
+        """Returns the number of the tile the position belongs to."""
+        return self._row(latitude) * self.cols + self._col(self._x(longitude))
+
+    def tiles(self, latitude, longitude):
+        """Returns the numbers of all tiles whose area extended by the halo contains the position."""
+        x = self._x(longitude)
+        halo_lon = self._halo_lon(latitude)
+        rows = range(self._row(latitude - self._halo_lat), self._row(latitude + self._halo_lat) + 1)
+        c0 = int(math.floor((x - halo_lon) / self.tile_width))
+        c1 = int(math.floor((x + halo_lon) / self.tile_width))
+        if self.wraps:
+            cols = sorted(set(c % self.cols for c in range(c0, min(c1, c0 + self.cols - 1) + 1)))
+        else:
+            cols = range(min(self.cols - 1, max(0, c0)), min(self.cols - 1, max(0, c1)) + 1)
+        return [r * self.cols + c for r in rows for c in cols]
+
+    def divisions(self, num_latitude_divs, num_longitude_divs):
+        """Returns the grid divisions ``(latitude, longitude)`` of the operator of a tile, the divisions of the bounding box are divided among the tiles."""
+        return max(2, -(-num_latitude_divs // self.rows)), max(2, -(-num_longitude_divs // self.cols))
+
+    def bounds(self, tile):
+        """Returns the bounding box ``(north, south, west, east)`` of a tile extended by the halo, longitudes in the range 0 to 360."""
+        row, col = divmod(tile, self.cols)
+        south = max(-90.0, self.south + row * self.tile_height - self._halo_lat)
+        north = min(90.0, self.south + (row + 1) * self.tile_height + self._halo_lat)
+        halo_lon = self._halo_lon(max(abs(south), abs(north)))
+        width = self.tile_width + 2 * halo_lon
+        if width >= 360.0:
+            return (north, south, 0.0, 360.0)
+        west = (self.west + col * self.tile_width - halo_lon) % 360.0
+        return (north, south, west, (west + width) % 360.0)
+
+
+def _observation(tuple_, observation_attribute):
+    """Returns the observation of an input or output tuple of the FlightPathEncounter."""
+    if observation_attribute is not None:
+        return tuple_[observation_attribute]
+    observation = tuple_.get('observation')
+    return observation if isinstance(observation, dict) else tuple_
+
+
+class _Members(object):
+    """Objects observed within the halo of a tile.
+
+    An object is forgotten once its last observation within the halo is older than `interval` milliseconds before the
+    latest observation, when the operator of the tile has dropped its flight path as well. Objects are expired in the
+    order of their observation times, like the objects of the operator.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        # entity id -> observation time of the last observation within the halo
+        self._observed = {}
+        self._expiry = []
+        self._clock = None
+
+    def __len__(self):
+        return len(self._observed)
+
+    def __contains__(self, entity_id):
+        return entity_id in self._observed
+
+    def add(self, entity_id, now):
+        self._observed[entity_id] = now
+        heapq.heappush(self._expiry, (now, entity_id))
+
+    def discard(self, entity_id):
+        self._observed.pop(entity_id, None)
+
+    def expire(self, now):
+        if self._clock is None or now > self._clock:
+            self._clock = now
+        oldest = self._clock - self.interval
+        expiry = self._expiry
+        observed = self._observed
+        while expiry and expiry[0][0] <= oldest:
+            when, entity_id = heapq.heappop(expiry)
+            if observed.get(entity_id) == when:
+                del observed[entity_id]
+
+
+class _TileRouter(object):
+    """Filter passing the observations replicated to one tile.
+
+    Besides the observations within the halo of the tile, the first observation of an object after it left the halo
+    is passed, so that the tile does not keep extrapolating an outdated flight path of the object. Objects not observed
+    within the halo for `cleanup_interval` milliseconds are forgotten, the operator has dropped their flight paths.
+    """
+
+    def __init__(self, tiling, tile, cleanup_interval, observation_attribute=None, filter_by_bounding_box=False):
+        self.tiling = tiling
+        self.tile = tile
+        self.observation_attribute = observation_attribute
+        self.filter_by_bounding_box = filter_by_bounding_box
+        self._members = _Members(cleanup_interval)
+
+    def __call__(self, tuple_):
+        observation = _observation(tuple_, self.observation_attribute)
+        latitude = observation['latitude']
+        longitude = observation['longitude']
+        if self.filter_by_bounding_box and not self.tiling.contains(latitude, longitude):
+            return False
+        entity_id = observation['entityId']
+        members = self._members
+        members.expire(observation['observationTime'])
+        if self.tile in self.tiling.tiles(latitude, longitude):
+            members.add(entity_id, observation['observationTime'])
+            return True
+        if entity_id in members:
+            members.discard(entity_id)
+            return True
+        return False
+
+
+class _HomeTile(object):
+    """Filter passing the encounter events whose observation belongs to the tile, drops the duplicates found in the halos of the other tiles."""
+
+    def __init__(self, tiling, tile, observation_attribute=None):
+        self.tiling = tiling
+        self.tile = tile
+        self.observation_attribute = observation_attribute
+
+    def __call__(self, tuple_):
+        observation = _observation(tuple_, self.observation_attribute)
+        return self.tiling.home(observation['latitude'], observation['longitude']) == self.tile
@@ -0,0 +1,65 @@
+# coding=utf-8
+# Licensed Materials - Property of IBM
+# Copyright IBM Corp. 2020
+
+import datetime
+import heapq
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def _seconds(ts):
+    if hasattr(ts, 'nanoseconds'):
+        # streamsx.spl.types.Timestamp
+        return ts.time()
+    if isinstance(ts, datetime.datetime):
+        if ts.tzinfo is not None:
+            return ts.timestamp()
+        return (ts - _EPOCH).total_seconds()
+    return float(ts)
+
+
+class _SkipUnchanged(object):
+    """Filter dropping device observations at the position of the last forwarded observation of the device.
+
+    An unchanged observation is forwarded anyway once `interval` seconds have passed since the last forwarded one,
+    so that dwell times and timeouts of the regions keep being evaluated. Devices are forgotten in the order of their
+    last forwarded observation once it is older than `interval`, so only the devices of the last interval are kept.
+    """
+
+    def __init__(self, interval, id_attribute, latitude_attribute, longitude_attribute, timestamp_attribute):
+        self.interval = interval
+        self.id_attribute = id_attribute
+        self.latitude_attribute = latitude_attribute
+        self.longitude_attribute = longitude_attribute
+        self.timestamp_attribute = timestamp_attribute
+        # device id -> (latitude, longitude, time) of the last forwarded observation
+        self._forwarded = {}
+        self._expiry = []
+        self._clock = None
+
+    def __call__(self, tuple_):
+        device_id = tuple_[self.id_attribute]
+        latitude = tuple_[self.latitude_attribute]
+        longitude = tuple_[self.longitude_attribute]
+        now = _seconds(tuple_[self.timestamp_attribute])
+        self._expire(now)
+        last = self._forwarded.get(device_id)
+        if last is not None and last[0] == latitude and last[1] == longitude and now - last[2] < self.interval:
+            return False
+        self._forwarded[device_id] = (latitude, longitude, now)
+        heapq.heappush(self._expiry, (now, device_id))
+        return True
+
+    def _expire(self, now):
+        # a device whose last forwarded observation is older than the interval is forwarded anyway
+        if self._clock is None or now > self._clock:
+            self._clock = now
+        oldest = self._clock - self.interval
+        expiry = self._expiry
+        forwarded = self._forwarded
+        while expiry and expiry[0][0] <= oldest:
+            forwarded_at, device_id = heapq.heappop(expiry)
+            last = forwarded.get(device_id)
+            if last is not None and last[2] == forwarded_at:
+                del forwarded[device_id]
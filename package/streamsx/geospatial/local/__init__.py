@@ -0,0 +1,88 @@
+# coding=utf-8
+# Licensed Materials - Property of IBM
+# Copyright IBM Corp. 2020
+
+"""
+In-process implementations of the geospatial operators.
+
+The engines in this module implement the semantics of the RegionMatch operator used by
+:py:meth:`~streamsx.geospatial.region_match` and of the FlightPathEncounter operator used by
+:py:class:`~streamsx.geospatial.FlightPathEncounter` in plain Python. They do not need a Streams instance
+and can be used to test configurations, to size the spatial index, to benchmark or to replay recorded data.
+
+Tuples are passed as dictionaries with the attributes of the schemas defined in :py:mod:`streamsx.geospatial.schema`.
+Micro-batches of device observations can be matched with :py:meth:`RegionMatchEngine.region_match_batch` using NumPy arrays,
+columnar observations of flying objects (NumPy structured arrays or Arrow record batches) are processed with
+:py:meth:`FlightPathEncounterEngine.process_columns`.
+:py:class:`ShardedRegionMatchEngine` spreads the matching over several processes with the device state sharded by device id,
+:py:class:`TiledFlightPathEncounterEngine` splits the encounter detection into tiles like the tiled composite.
+Processes can share one read-only copy of the regions: :py:meth:`RegionMatchEngine.publish` writes them to a memory mapped region store file
+that the engines of the other processes use with :py:meth:`RegionMatchEngine.attach`.
+:py:func:`replay` drives recorded observations from CSV or Parquet files through an engine in event time,
+:py:func:`read_regions` reads regions from CSV, GeoJSON or snapshot files for :py:meth:`RegionMatchEngine.load_regions`.
+In asyncio applications :py:meth:`RegionMatchEngine.stream` and :py:meth:`FlightPathEncounterEngine.stream` turn an async iterable
+of observations into an async generator of events, optionally with bounded read-ahead and micro-batching.
+The geodesy functions :py:func:`meters_per_degree`, :py:func:`approximate_distance`, :py:func:`haversine_distance`,
+:py:func:`destination_point` and :py:func:`vincenty_distance` work on NumPy arrays: filter with the table based approximation
+and refine the remaining points with the ellipsoidal distance.
+
+The local engines require the ``numpy`` package, install it with ``pip install streamsx.geospatial[local]``.
+
+Example::
+
+    from streamsx.geospatial.local import RegionMatchEngine
+
+    engine = RegionMatchEngine()
+    for region in regions:
+        engine.process_region(region)
+    for device in devices:
+        for event in engine.process(device):
+            print(event)
+
+.. versionadded:: 1.2
+"""
+
+import sys
+
+# module of each exported name, a module is imported on first use of one of its names (module __getattr__ requires Python 3.7)
+_MODULES = {
+    'RegionMatchEngine': '_regionmatch',
+    'ShardedRegionMatchEngine': '_sharded',
+    'FlightPathEncounterEngine': '_encounter',
+    'TiledFlightPathEncounterEngine': '_tiled',
+    'PolygonCache': '_polygon',
+    'CompiledPolygon': '_polygon',
+    'observation_columns': '_columns',
+    'replay': '_replay',
+    'read_regions': '_regions',
+    'meters_per_degree': '_geodesy',
+    'approximate_distance': '_geodesy',
+    'haversine_distance': '_geodesy',
+    'destination_point': '_geodesy',
+    'vincenty_distance': '_geodesy',
+}
+
+__all__ = [ 'RegionMatchEngine', 'ShardedRegionMatchEngine', 'FlightPathEncounterEngine', 'TiledFlightPathEncounterEngine', 'PolygonCache', 'CompiledPolygon', 'observation_columns', 'replay', 'read_regions', 'meters_per_degree', 'approximate_distance', 'haversine_distance', 'destination_point', 'vincenty_distance' ]
+
+if sys.version_info < (3, 7):
+    from streamsx.geospatial.local._regionmatch import RegionMatchEngine
+    from streamsx.geospatial.local._sharded import ShardedRegionMatchEngine
+    from streamsx.geospatial.local._encounter import FlightPathEncounterEngine
+    from streamsx.geospatial.local._tiled import TiledFlightPathEncounterEngine
+    from streamsx.geospatial.local._polygon import PolygonCache, CompiledPolygon
+    from streamsx.geospatial.local._columns import observation_columns
+    from streamsx.geospatial.local._replay import replay
+    from streamsx.geospatial.local._regions import read_regions
+    from streamsx.geospatial.local._geodesy import meters_per_degree, approximate_distance, haversine_distance, destination_point, vincenty_distance
+else:
+    def __getattr__(name):
+        module = _MODULES.get(name)
+        if module is None:
+            raise AttributeError("module 'streamsx.geospatial.local' has no attribute " + repr(name))
+        import importlib
+        value = getattr(importlib.import_module('streamsx.geospatial.local.' + module), name)
+        globals()[name] = value
+        return value
+
+    def __dir__():
+        return sorted(set(globals()) | set(__all__))
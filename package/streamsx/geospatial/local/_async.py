@@ -0,0 +1,85 @@
+# coding=utf-8
+# Licensed Materials - Property of IBM
+# Copyright IBM Corp. 2020
+
+import asyncio
+import sys
+
+# end of the observations in the queue
+_END = object()
+
+
+async def _aiter(observations):
+    if hasattr(observations, '__aiter__'):
+        async for observation in observations:
+            yield observation
+    else:
+        for observation in observations:
+            yield observation
+
+
+async def stream(process_many, observations, batch_size=None, batch_timeout=None, queue_size=1024, executor=None):
+    """Async generator of the events of `process_many` for the observations of an async iterable, see the ``stream`` methods of the engines."""
+    if batch_size is not None and batch_size < 1:
+        raise ValueError('batch_size must be positive')
+    # get_event_loop is deprecated within coroutines, get_running_loop was added in Python 3.7
+    loop = asyncio.get_running_loop() if sys.version_info >= (3, 7) else asyncio.get_event_loop()
+    if batch_size is None and batch_timeout is None:
+        # one observation at a time, the next observation is read when the events are consumed
+        async for observation in _aiter(observations):
+            if executor is None:
+                events = process_many([observation])
+            else:
+                events = await loop.run_in_executor(executor, process_many, [observation])
+            for event in events:
+                yield event
+        return
+
+    # a reader task fills the bounded queue, it waits while the queue is full
+    queue = asyncio.Queue(queue_size)
+    errors = []
+
+    async def read():
+        try:
+            async for observation in _aiter(observations):
+                await queue.put(observation)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            errors.append(e)
+        await queue.put(_END)
+
+    reader = asyncio.ensure_future(read())
+    try:
+        end = False
+        while not end:
+            first = await queue.get()
+            if first is _END:
+                break
+            batch = [first]
+            deadline = loop.time() + batch_timeout if batch_timeout is not None else None
+            while batch_size is None or len(batch) < batch_size:
+                if deadline is None:
+                    observation = await queue.get()
+                else:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        observation = await asyncio.wait_for(queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if observation is _END:
+                    end = True
+                    break
+                batch.append(observation)
+            if executor is None:
+                events = process_many(batch)
+            else:
+                events = await loop.run_in_executor(executor, process_many, batch)
+            for event in events:
+                yield event
+        if errors:
+            raise errors[0]
+    finally:
+        reader.cancel()
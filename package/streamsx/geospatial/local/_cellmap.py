@@ -0,0 +1,149 @@
+# coding=utf-8
+# Licensed Materials - Property of IBM
+# Copyright IBM Corp. 2020
+
+import math
+
+import numpy as np
+
+from streamsx.geospatial.local._polygon import _X0, _Y0, _SLOPE, _YLO, _YHI
+
+# margin in cells around the edges, so that rounding of the cell coordinates never puts a point on the wrong side of an edge
+_MARGIN = 1e-9
+
+
+class _CellMap(object):
+    """Cells of several resolutions labeled with the regions containing them or crossed by their boundary.
+
+    Level ``l`` divides the plane into cells of ``cell_size / 2 ** l`` degrees. A region is rasterized at the finest of
+    the `levels` levels where its bounding box spans at most `cells_per_side` cells per side: each cell touched by an edge
+    of the region is a boundary cell, the other cells are fully inside or fully outside, decided by the center of the cell.
+    Only inside and boundary cells are stored, so a lookup is one dictionary lookup per level with regions.
+    Regions spanning more than `max_cells` cells at level 0 are not rasterized, they are returned as boundary regions
+    for all points of their bounding box.
+    """
+
+    def __init__(self, cell_size, levels=8, cells_per_side=16, max_cells=4096):
+        self.cell_size = float(cell_size)
+        self.cells_per_side = cells_per_side
+        self.max_cells = max_cells
+        self._scales = [float(1 << level) / self.cell_size for level in range(levels)]
+        # per level cell -> (ids of regions containing the cell, ids of regions crossing the cell)
+        self._cells = [{} for _ in range(levels)]
+        self._counts = [0] * levels
+        # region id -> (level, cells) or None for regions that are not rasterized
+        self._placed = {}
+        self._large = {}
+        self._levels = []
+        # number of cells looked up
+        self.cells_visited = 0
+
+    def __len__(self):
+        return len(self._placed)
+
+    def _level(self, bbox):
+        for level in range(len(self._scales) - 1, -1, -1):
+            scale = self._scales[level]
+            columns = math.floor(bbox[2] * scale) - math.floor(bbox[0] * scale) + 1
+            rows = math.floor(bbox[3] * scale) - math.floor(bbox[1] * scale) + 1
+            if max(columns, rows) <= self.cells_per_side or (level == 0 and columns * rows <= self.max_cells):
+                return level
+        return None
+
+    def insert(self, key, polygon):
+        """Rasterizes the :py:class:`CompiledPolygon` `polygon` as region `key`, replacing an existing region."""
+        if key in self._placed:
+            self.remove(key)
+        level = self._level(polygon.bbox)
+        if level is None:
+            self._placed[key] = None
+            self._large[key] = polygon.bbox
+            return
+        scale = self._scales[level]
+        c0, r0, boundary, inside = _rasterize(polygon, scale)
+        cells = self._cells[level]
+        placed = []
+        for rows, label in ((inside, 0), (boundary, 1)):
+            for r, c in zip(*[a.tolist() for a in np.nonzero(rows)]):
+                cell = (c0 + c, r0 + r)
+                entry = cells.get(cell)
+                if entry is None:
+                    entry = cells[cell] = ([], [])
+                entry[label].append(key)
+                placed.append(cell)
+        self._placed[key] = (level, placed)
+        self._counts[level] += 1
+        self._update_levels()
+
+    def remove(self, key):
+        placed = self._placed.pop(key, False)
+        if placed is False:
+            return False
+        if placed is None:
+            del self._large[key]
+            return True
+        level, placed = placed
+        cells = self._cells[level]
+        for cell in placed:
+            entry = cells[cell]
+            (entry[0] if key in entry[0] else entry[1]).remove(key)
+            if not entry[0] and not entry[1]:
+                del cells[cell]
+        self._counts[level] -= 1
+        self._update_levels()
+        return True
+
+    def _update_levels(self):
+        self._levels = [(self._scales[level], self._cells[level]) for level, count in enumerate(self._counts) if count]
+
+    def query_point(self, x, y):
+        """Returns the keys of the regions containing the cells of the point ``(x, y)`` and the keys of the regions that need an exact test."""
+        inside = []
+        boundary = []
+        for scale, cells in self._levels:
+            entry = cells.get((int(math.floor(x * scale)), int(math.floor(y * scale))))
+            if entry is not None:
+                inside.extend(entry[0])
+                boundary.extend(entry[1])
+        self.cells_visited += len(self._levels)
+        for key, b in self._large.items():
+            if b[0] <= x <= b[2] and b[1] <= y <= b[3]:
+                boundary.append(key)
+        return inside, boundary
+
+
+def _rasterize(polygon, scale):
+    """Returns column and row of the first cell of the bounding box of a polygon, and the boundary and inside cells as boolean arrays indexed by row and column."""
+    xmin, ymin, xmax, ymax = polygon.bbox
+    c0 = int(math.floor(xmin * scale))
+    r0 = int(math.floor(ymin * scale))
+    columns = int(math.floor(xmax * scale)) - c0 + 1
+    rows = int(math.floor(ymax * scale)) - r0 + 1
+    e = polygon.edges
+    # one pair per edge and row of cells its latitude range touches
+    first = np.clip(np.floor(e[_YLO] * scale - _MARGIN).astype(np.int64) - r0, 0, rows - 1)
+    last = np.clip(np.floor(e[_YHI] * scale + _MARGIN).astype(np.int64) - r0, 0, rows - 1)
+    counts = last - first + 1
+    edge = np.repeat(np.arange(e.shape[1]), counts)
+    row = np.repeat(first - np.cumsum(counts) + counts, counts) + np.arange(len(edge))
+    # longitude range of each edge within the latitude band of the row
+    lo = np.maximum(e[_YLO][edge], (row + r0) / scale)
+    hi = np.minimum(e[_YHI][edge], (row + r0 + 1) / scale)
+    xa = e[_X0][edge] + (lo - e[_Y0][edge]) * e[_SLOPE][edge]
+    xb = e[_X0][edge] + (hi - e[_Y0][edge]) * e[_SLOPE][edge]
+    a = np.clip(np.floor(np.minimum(xa, xb) * scale - _MARGIN).astype(np.int64) - c0, 0, columns - 1)
+    b = np.clip(np.floor(np.maximum(xa, xb) * scale + _MARGIN).astype(np.int64) - c0, 0, columns - 1)
+    # the end of horizontal edges is not stored, they cross all cells of their rows
+    flat = e[_YLO][edge] == e[_YHI][edge]
+    a[flat] = 0
+    b[flat] = columns - 1
+    marks = np.zeros((rows, columns + 1), dtype=np.int64)
+    np.add.at(marks, (row, a), 1)
+    np.add.at(marks, (row, b + 1), -1)
+    boundary = np.cumsum(marks[:, :columns], axis=1) > 0
+    # cells not crossed by an edge are inside if their center is
+    inside = np.zeros((rows, columns), dtype=bool)
+    r, c = np.nonzero(~boundary)
+    if len(r):
+        inside[r, c] = polygon.contains_many((c + c0 + 0.5) / scale, (r + r0 + 0.5) / scale)
+    return c0, r0, boundary, inside
@@ -0,0 +1,51 @@
+# coding=utf-8
+# Licensed Materials - Property of IBM
+# Copyright IBM Corp. 2020
+
+import numpy as np
+
+OBSERVATION_FIELDS = ('entityId', 'latitude', 'longitude', 'altitude', 'observationTime', 'azimuth', 'groundSpeed', 'altitudeChangeRate')
+
+
+def _arrow_column(data, name):
+    index = data.schema.get_field_index(name)
+    if index < 0:
+        raise KeyError(name)
+    column = data.column(index)
+    try:
+        # primitive columns without nulls are returned as views of the Arrow buffers
+        return column.to_numpy(zero_copy_only=False)
+    except TypeError:
+        # ChunkedArray of older pyarrow versions
+        return column.to_numpy()
+
+
+def observation_columns(data):
+    """Returns the Observation3D fields of columnar data as dict of NumPy arrays.
+
+    Numeric fields of NumPy structured arrays and of Arrow data are returned without copying.
+    Observation times given as ``datetime64`` are converted to milliseconds since epoch.
+
+    Args:
+        data: NumPy structured array, ``pyarrow.RecordBatch``, ``pyarrow.Table`` or dict of arrays with the fields of
+            :py:const:`~streamsx.geospatial.schema.FlighPathEncounterSchema.Observation3D`.
+
+    Returns:
+        dict: Field name to array.
+    """
+    if isinstance(data, np.ndarray):
+        if data.dtype.names is None:
+            raise TypeError('A structured array with the Observation3D fields is required')
+        columns = dict((name, data[name]) for name in OBSERVATION_FIELDS)
+    elif hasattr(data, 'schema') and hasattr(data, 'column'):
+        # pyarrow RecordBatch or Table, pyarrow is not imported as it is only needed by the caller
+        columns = dict((name, _arrow_column(data, name)) for name in OBSERVATION_FIELDS)
+    else:
+        columns = dict((name, np.asarray(data[name])) for name in OBSERVATION_FIELDS)
+    times = columns['observationTime']
+    if times.dtype.kind == 'M':
+        columns['observationTime'] = times.astype('datetime64[ms]').astype(np.int64)
+    lengths = set(len(column) for column in columns.values())
+    if len(lengths) > 1:
+        raise ValueError('The columns have different lengths')
+    return columns
@@ -0,0 +1,619 @@
+# coding=utf-8
+# Licensed Materials - Property of IBM
+# Copyright IBM Corp. 2020
+
+import heapq
+import math
+import time
+
+import numpy as np
+
+from streamsx.geospatial._reports import _EncounterReports, _pack
+from streamsx.geospatial.local._columns import observation_columns
+from streamsx.geospatial.local._geodesy import EARTH_RADIUS as _EARTH_RADIUS, _tangent_plane, _trig
+from streamsx.geospatial.local._index import _CellGrid, _QuadTree
+from streamsx.geospatial.local._snapshot import pack_strings, read_snapshot, unpack_strings, write_snapshot
+
+_METERS_PER_DEGREE = _EARTH_RADIUS * math.pi / 180.0
+
+# constructor arguments saved in snapshots
+_SETTINGS = ('north_latitude', 'south_latitude', 'west_longitude', 'east_longitude', 'num_latitude_divs', 'num_longitude_divs',
+             'altitude_search_radius', 'search_radius', 'time_search_interval', 'cleanup_interval', 'cleanup_batch_size',
+             'filter_by_bounding_box', 'index_type', 'observation_attribute', 'encounter_attribute', 'encounter_distance_attribute',
+             'encounter_time_attribute', 'report_interval', 'report_time_threshold', 'report_distance_threshold', 'pack_encounters')
+
+# below this number of candidates the scalar solver is faster than the array operations
+_VECTORIZE_MIN = 16
+
+_INITIAL_SLOTS = 64
+
+# columns of the motion rows: position, time and east, north and up velocity,
+# followed by sine and cosine of latitude and longitude
+_LAT, _LON, _ALT, _TIME, _VE, _VN, _VZ, _SIN_LAT, _COS_LAT, _SIN_LON, _COS_LON = range(11)
+
+# columns of the object table following the motion: azimuth, ground speed and the six columns of the swept box
+_AZIMUTH, _SPEED, _BOX = 11, 12, 13
+_COLUMNS = 19
+
+
+class FlightPathEncounterEngine(object):
+    """In-process implementation of the FlightPathEncounter operator used by :py:class:`~streamsx.geospatial.FlightPathEncounter`.
+
+    Tracks flying objects and calculates possible encounters between the objects in the future.
+    Each observation of schema :py:const:`~streamsx.geospatial.schema.FlighPathEncounterSchema.Observation3D`
+    replaces the stored data of the object, its flight path is extrapolated for `time_search_interval` and compared
+    with the extrapolated paths of the other objects. For each object coming closer than `search_radius` and `altitude_search_radius`
+    an event of schema :py:const:`~streamsx.geospatial.schema.FlighPathEncounterSchema.EncounterEvents` is returned.
+
+    The objects are stored in a spatial index over the bounding box given by `north_latitude`, `south_latitude`, `west_longitude`
+    and `east_longitude`. By default this is a grid of `num_latitude_divs` x `num_longitude_divs` cells, with `index_type` set to
+    ``'quadtree'`` cells are split where traffic is dense and stay coarse elsewhere. Each object is registered in all cells touched by
+    the bounding box of its extrapolated path (its swept volume), widened by half of the search radii. An observation is only compared
+    with the objects registered in the cells touched by its own swept volume whose swept volumes overlap with it.
+    Paths leaving the box are stored in the border cells.
+    The tracked objects are kept in a table of float64 rows indexed by slot, so that the candidates of an observation are
+    gathered with one array operation; :py:meth:`process_columns` processes observations in columnar form without per-row dictionaries.
+    The tracked objects can be saved with :py:meth:`snapshot` and loaded into a new engine with :py:meth:`restore`.
+    With `report_interval` a pair of objects is reported once per interval instead of on every observation of either object,
+    unless the predicted encounter changes by more than the report thresholds.
+
+    The constructor takes the same arguments as :py:class:`~streamsx.geospatial.FlightPathEncounter`, use :py:meth:`from_composite`
+    to create an engine with all settings of a configured composite.
+
+    Example::
+
+        from streamsx.geospatial.local import FlightPathEncounterEngine
+        engine = FlightPathEncounterEngine(north_latitude=52.6, south_latitude=52.4, west_longitude=13.3, east_longitude=13.5, num_latitude_divs=5, num_longitude_divs=5, search_radius=10000, altitude_search_radius=400, time_search_interval=600000)
+        for observation in observations:
+            for event in engine.process(observation):
+                print(event['encounter']['entityId'], event['encounterDistance'], event['encounterTime'])
+
+    .. versionadded:: 1.2
+
+    Args:
+        north_latitude(float): The latitude of the north border of the bounding box in degrees.
+        south_latitude(float): The latitude of the south border of the bounding box in degrees.
+        west_longitude(float): The longitude of the west border of the bounding box in degrees.
+        east_longitude(float): The longitude of the east border of the bounding box in degrees.
+        num_latitude_divs(int): Number of latitude divisions (rows) of the grid, not used by the quadtree.
+        num_longitude_divs(int): Number of longitude divisions (columns) of the grid, not used by the quadtree.
+        altitude_search_radius(int): The altitude distance around the flight path searched for other objects in meters.
+        search_radius(int): The radius around the flight path searched for other objects in meters.
+        time_search_interval(int): The time interval the flight path is extrapolated in milliseconds.
+        cleanup_interval(int): Objects whose last observation is older than the latest observation minus the interval are removed. Given in milliseconds, defaults to 3 times `time_search_interval`.
+        cleanup_batch_size(int): Maximum number of expiry entries examined per observation. Objects are expired incrementally in the order of their observation times instead of a periodic sweep over all objects.
+        filter_by_bounding_box(bool): Ignore observations outside of the bounding box.
+        index_type(str): The spatial index, ``'grid'`` (default) for the fixed grid or ``'quadtree'`` for an index adapting to the traffic density.
+        observation_attribute(str): Name of the input attribute holding the observation. If not set, the input tuple's ``observation`` attribute is used if present, otherwise the input tuple itself is the observation.
+        encounter_attribute(str): Name of the output attribute that receives the encountered object.
+        encounter_distance_attribute(str): Name of the output attribute that receives the distance at the encounter in meters.
+        encounter_time_attribute(str): Name of the output attribute that receives the time of the encounter in milliseconds since epoch.
+        report_interval(int): Report each pair of objects once per interval of observation time in milliseconds, later encounters of the pair within the interval are suppressed. If not set, every encounter is reported.
+        report_time_threshold(int): Report an encounter of a pair within the `report_interval` anyway if its encounter time differs by more than the threshold in milliseconds from the last report of the pair.
+        report_distance_threshold(float): Report an encounter of a pair within the `report_interval` anyway if its distance differs by more than the threshold in meters from the last report of the pair.
+        pack_encounters(bool): Return the encounters of an observation as one event holding the list of encounters in its ``encounters`` attribute, see :py:const:`~streamsx.geospatial.schema.FlighPathEncounterSchema.EncounterLists`.
+    """
+
+    def __init__(self, north_latitude, south_latitude, west_longitude, east_longitude, num_latitude_divs, num_longitude_divs, altitude_search_radius, search_radius, time_search_interval, cleanup_interval=None, cleanup_batch_size=16, filter_by_bounding_box=False, index_type=None, observation_attribute=None, encounter_attribute=None, encounter_distance_attribute=None, encounter_time_attribute=None, report_interval=None, report_time_threshold=None, report_distance_threshold=None, pack_encounters=False):
+        if not -90 <= south_latitude < north_latitude <= 90:
+            raise ValueError('Invalid latitude range of the bounding box')
+        if num_latitude_divs < 1 or num_longitude_divs < 1:
+            raise ValueError('num_latitude_divs and num_longitude_divs must be positive')
+        if time_search_interval < 1000:
+            raise ValueError('time_search_interval must be at least one second')
+        self.north_latitude = north_latitude
+        self.south_latitude = south_latitude
+        self.west_longitude = west_longitude
+        self.east_longitude = east_longitude
+        self.num_latitude_divs = num_latitude_divs
+        self.num_longitude_divs = num_longitude_divs
+        self.altitude_search_radius = altitude_search_radius
+        self.search_radius = search_radius
+        self.time_search_interval = time_search_interval
+        self.cleanup_interval = cleanup_interval if cleanup_interval is not None else 3 * time_search_interval
+        self.cleanup_batch_size = cleanup_batch_size
+        self.filter_by_bounding_box = bool(filter_by_bounding_box)
+        self.index_type = index_type or 'grid'
+        self.observation_attribute = observation_attribute
+        self.encounter_attribute = encounter_attribute or 'encounter'
+        self.encounter_distance_attribute = encounter_distance_attribute or 'encounterDistance'
+        self.encounter_time_attribute = encounter_time_attribute or 'encounterTime'
+        self.report_interval = report_interval
+        self.report_time_threshold = report_time_threshold
+        self.report_distance_threshold = report_distance_threshold
+        self.pack_encounters = bool(pack_encounters)
+        if report_interval is None and (report_time_threshold is not None or report_distance_threshold is not None):
+            raise ValueError('The report thresholds require a report_interval')
+        self._reports = None if report_interval is None else _EncounterReports(
+            report_interval, report_time_threshold, report_distance_threshold, observation_attribute,
+            self.encounter_attribute, self.encounter_distance_attribute, self.encounter_time_attribute)
+
+        self._lon_span = (east_longitude - west_longitude) % 360.0 or 360.0
+        # longitudes are unwrapped around the center of the box
+        self._lon_center = west_longitude + self._lon_span / 2.0
+        bounds = (-self._lon_span / 2.0, south_latitude, self._lon_span / 2.0, north_latitude)
+        if self.index_type == 'grid':
+            self._index = _CellGrid(bounds, num_latitude_divs, num_longitude_divs)
+        elif self.index_type == 'quadtree':
+            self._index = _QuadTree(bounds)
+        else:
+            raise ValueError('Unknown index_type: ' + str(index_type))
+        # the objects are stored in slots: a row of the table holds the motion (see _motion), azimuth,
+        # ground speed and swept box, the lists hold the entity id and the observation dict if the observation
+        # was not given in columnar form; the boxes are kept as tuples as well for the scalar overlap tests of few candidates
+        self._table = np.empty((_INITIAL_SLOTS, _COLUMNS), dtype=np.float64)
+        self._box_list = []
+        self._ids = []
+        self._records = []
+        # entity id -> slot
+        self._slots = {}
+        self._free = []
+        # min-heap of (observation time, entity id), entries of updated objects are skipped when popped
+        self._expiry = []
+        self._clock = None
+        self._observations = 0
+        self._candidate_count = 0
+        self._encounter_tests = 0
+        self._encounters = 0
+        self._expired = 0
+        self._cleanup_time = 0.0
+
+    @classmethod
+    def from_composite(cls, composite):
+        """Creates an engine with the settings of a :py:class:`~streamsx.geospatial.FlightPathEncounter` composite.
+
+        Args:
+            composite(streamsx.geospatial.FlightPathEncounter): The configured composite.
+
+        Returns:
+            FlightPathEncounterEngine: The engine.
+        """
+        return cls(composite.north_latitude, composite.south_latitude, composite.west_longitude, composite.east_longitude,
+                   composite.num_latitude_divs, composite.num_longitude_divs, composite.altitude_search_radius,
+                   composite.search_radius, composite.time_search_interval,
+                   cleanup_interval=composite.cleanup_interval, filter_by_bounding_box=composite.filter_by_bounding_box, index_type=composite.index_type,
+                   observation_attribute=composite.observation_attribute, encounter_attribute=composite.encounter_attribute,
+                   encounter_distance_attribute=composite.encounter_distance_attribute, encounter_time_attribute=composite.encounter_time_attribute,
+                   report_interval=composite.report_interval, report_time_threshold=composite.report_time_threshold,
+                   report_distance_threshold=composite.report_distance_threshold, pack_encounters=composite.pack_interval is not None)
+
+    @property
+    def object_count(self):
+        """int: Number of tracked objects."""
+        return len(self._slots)
+
+    @property
+    def stats(self):
+        """dict: Counters of the work done by the engine since it was created.
+
+        * nObservations - Observations processed.
+        * nCellsVisited - Index cells (grid cells or quadtree leaves) looked up.
+        * nCandidates - Objects registered in the looked up cells.
+        * nEncounterTests - Closest approach calculations, for candidates whose swept volume overlaps with the one of the observation.
+        * nEncounters - Encounters reported.
+        * nSuppressedEncounters - Encounters not reported because the pair was reported within the `report_interval`.
+        * nExpiredObjects - Objects removed by the cleanup.
+        * cleanupTimeMillis - Time spent in the cleanup in milliseconds.
+        * nTrackedObjects - Objects stored.
+        """
+        return {
+            'nObservations': self._observations,
+            'nCellsVisited': self._index.cells_visited,
+            'nCandidates': self._candidate_count,
+            'nEncounterTests': self._encounter_tests,
+            'nEncounters': self._encounters,
+            'nSuppressedEncounters': 0 if self._reports is None else self._reports.suppressed,
+            'nExpiredObjects': self._expired,
+            'cleanupTimeMillis': self._cleanup_time * 1000.0,
+            'nTrackedObjects': len(self._slots),
+        }
+
+    def snapshot(self, path):
+        """Writes the tracked objects to a snapshot file.
+
+        The objects are saved with the fields of :py:const:`~streamsx.geospatial.schema.FlighPathEncounterSchema.Observation3D`,
+        other attributes of the stored tuples are not saved. The file is replaced atomically. The counters of :py:attr:`stats` are not saved.
+
+        Args:
+            path(str): Path of the snapshot file.
+        """
+        ids = list(self._slots)
+        meta = {
+            'settings': dict((name, getattr(self, name)) for name in _SETTINGS),
+            'clock': self._clock,
+        }
+        slots = np.fromiter(self._slots.values(), dtype=np.intp, count=len(ids))
+        objects, offsets = pack_strings(ids)
+        write_snapshot(path, 'FlightPathEncounterEngine', meta, {'table': self._table[slots], 'objects': objects, 'object_offsets': offsets})
+
+    @classmethod
+    def restore(cls, path, mmap=True):
+        """Creates an engine from a snapshot written by :py:meth:`snapshot`.
+
+        The settings of the engine are taken from the snapshot. Encounters with restored objects return the encountered object
+        as Observation3D dict, like objects processed with :py:meth:`process_columns`.
+
+        Args:
+            path(str): Path of the snapshot file.
+            mmap(bool): Map the snapshot into memory, otherwise it is read at once.
+
+        Returns:
+            FlightPathEncounterEngine: The engine tracking the objects of the snapshot.
+        """
+        meta, arrays = read_snapshot(path, 'FlightPathEncounterEngine', mmap)
+        engine = cls(**meta['settings'])
+        table = arrays['table']
+        for entity_id, row in zip(unpack_strings(arrays['objects'], arrays['object_offsets']), table.tolist()):
+            slot = engine._allocate(entity_id)
+            box = tuple(row[_BOX:])
+            engine._box_list[slot] = box
+            engine._index.insert(slot, box)
+            engine._expiry.append((row[_TIME], entity_id))
+        # the slots of a new engine are allocated in order
+        engine._table[:len(table)] = table
+        heapq.heapify(engine._expiry)
+        engine._clock = meta['clock']
+        return engine
+
+    def _x(self, longitude):
+        return (longitude - self._lon_center + 180.0) % 360.0 - 180.0
+
+    def _swept_box(self, latitude, longitude, altitude, ve, vn, climb, speed, cos_lat):
+        """Bounding box ``(xmin, ymin, xmax, ymax, zmin, zmax)`` of the extrapolated path, widened by half of the search radii."""
+        seconds = self.time_search_interval / 1000.0
+        x = self._x(longitude)
+        cos_lat = max(cos_lat, 0.01)
+        # a small relative margin covers the error of the planar extrapolation
+        margin = self.search_radius / 2.0 + 0.01 * speed * seconds
+        dy = vn * seconds / _METERS_PER_DEGREE
+        dx = ve * seconds / (_METERS_PER_DEGREE * cos_lat)
+        my = margin / _METERS_PER_DEGREE
+        mx = my / cos_lat
+        dz = climb * seconds
+        mz = self.altitude_search_radius / 2.0
+        return (min(x, x + dx) - mx, min(latitude, latitude + dy) - my, max(x, x + dx) + mx, max(latitude, latitude + dy) + my,
+                min(altitude, altitude + dz) - mz, max(altitude, altitude + dz) + mz)
+
+    def _in_box(self, latitude, longitude):
+        return self.south_latitude <= latitude <= self.north_latitude and (longitude - self.west_longitude) % 360.0 <= self._lon_span
+
+    def _observation(self, tuple_):
+        if self.observation_attribute is not None:
+            return tuple_[self.observation_attribute]
+        observation = tuple_.get('observation')
+        return observation if isinstance(observation, dict) else tuple_
+
+    def process(self, tuple_):
+        """Processes the observation of a flying object.
+
+        Args:
+            tuple_(dict): Observation of schema :py:const:`~streamsx.geospatial.schema.FlighPathEncounterSchema.Observation3D` or a tuple holding it in its observation attribute, for example of schema :py:const:`~streamsx.geospatial.schema.FlighPathEncounterSchema.EncounterEvents`.
+
+        Returns:
+            list: Encounter events, one per object coming close to the observed object, or a single event holding all encounters if `pack_encounters` is set.
+        """
+        return self._process(tuple_, True)
+
+    def _process(self, tuple_, detect):
+        # with detect False the object is stored without searching for encounters
+        observation = self._observation(tuple_)
+        latitude = observation['latitude']
+        longitude = observation['longitude']
+        if self.filter_by_bounding_box and not self._in_box(latitude, longitude):
+            return []
+        found = self._step(observation['entityId'], latitude, longitude, observation['altitude'], observation['observationTime'],
+                           observation['azimuth'], observation['groundSpeed'], observation['altitudeChangeRate'], observation, detect)
+        events = [self._event(tuple_, observation, self._stored(slot), (distance, when)) for slot, distance, when in found]
+        if self.pack_encounters and events:
+            return [_pack(events, self.encounter_attribute, self.encounter_distance_attribute, self.encounter_time_attribute)]
+        return events
+
+    def stream(self, observations, batch_size=None, batch_timeout=None, queue_size=1024, executor=None):
+        """Processes the observations of an async iterable, returns an async generator of the encounter events.
+
+        Without batching the next observation is read when the events of the previous one are consumed, so a slow consumer
+        slows down the producer. With `batch_size` or `batch_timeout` the observations are read into a queue of at most
+        `queue_size` observations and processed in micro-batches; a batch ends when it holds `batch_size` observations or
+        `batch_timeout` seconds after its first observation arrived. Requires Python 3.6 or later.
+
+        Example::
+
+            async for event in engine.stream(observation_source, batch_timeout=0.05, executor=executor):
+                await publish(event)
+
+        Args:
+            observations: Async iterable or iterable of tuples accepted by :py:meth:`process`.
+            batch_size(int): Maximum number of observations per batch.
+            batch_timeout(float): Maximum time in seconds a batch waits for more observations. With `batch_size` only, a batch waits until it is full.
+            queue_size(int): Maximum number of observations read ahead when batching.
+            executor(concurrent.futures.Executor): Executor the observations are processed in, so the event loop is not blocked. If not set, they are processed in the event loop.
+
+        Returns:
+            Async generator of the encounter events, in the order of the observations.
+        """
+        # the async code is not imported on Python versions without async generators
+        from streamsx.geospatial.local._async import stream
+        return stream(self._process_many, observations, batch_size, batch_timeout, queue_size, executor)
+
+    def _process_many(self, tuples):
+        return [event for tuple_ in tuples for event in self.process(tuple_)]
+
+    def process_columns(self, data):
+        """Processes a batch of observations given in columnar form, in row order.
+
+        The columns are read without creating a dictionary per observation, numeric columns of NumPy structured arrays
+        and Arrow record batches are used without copying. The encountered objects are referenced by their entity id.
+
+        Args:
+            data: Observations with the fields of :py:const:`~streamsx.geospatial.schema.FlighPathEncounterSchema.Observation3D`, given as
+                NumPy structured array, ``pyarrow.RecordBatch``, ``pyarrow.Table`` or dict of arrays. The observation time can be given as
+                milliseconds since epoch or as ``datetime64``/Arrow timestamp.
+
+        Returns:
+            dict: Arrays with one element per encounter: ``'observation'`` holds the row of the observation in `data`,
+            the encounter attribute (default ``'encounter'``) the entity id of the encountered object, followed by the encounter distance and time attributes.
+        """
+        columns = observation_columns(data)
+        rows = []
+        others = []
+        distances = []
+        times = []
+        ids = columns['entityId'].tolist()
+        latitudes = columns['latitude'].tolist()
+        longitudes = columns['longitude'].tolist()
+        filtered = self.filter_by_bounding_box
+        step = self._step
+        stored_ids = self._ids
+        for i, (entity_id, latitude, longitude, altitude, now, azimuth, speed, climb) in enumerate(zip(
+                ids, latitudes, longitudes, columns['altitude'].tolist(), columns['observationTime'].tolist(),
+                columns['azimuth'].tolist(), columns['groundSpeed'].tolist(), columns['altitudeChangeRate'].tolist())):
+            if filtered and not self._in_box(latitude, longitude):
+                continue
+            for slot, distance, when in step(entity_id, latitude, longitude, altitude, now, azimuth, speed, climb, None, True):
+                rows.append(i)
+                others.append(stored_ids[slot])
+                distances.append(distance)
+                times.append(when)
+        return {
+            'observation': np.asarray(rows, dtype=np.intp),
+            self.encounter_attribute: np.asarray(others, dtype=object),
+            self.encounter_distance_attribute: np.asarray(distances, dtype=np.float64),
+            self.encounter_time_attribute: np.asarray(times, dtype=np.int64),
+        }
+
+    def _step(self, entity_id, latitude, longitude, altitude, now, azimuth, speed, climb, observation, detect):
+        """Stores an observation and returns the encounters as list of ``(slot of the other object, distance, time)``."""
+        self._observations += 1
+        start = time.perf_counter()
+        self._cleanup(now)
+        self._cleanup_time += time.perf_counter() - start
+        self._remove(entity_id)
+
+        motion = _motion(latitude, longitude, altitude, now, azimuth, speed, climb)
+        box = self._swept_box(latitude, longitude, altitude, motion[_VE], motion[_VN], climb, speed, motion[_COS_LAT])
+        found = []
+        if detect:
+            slots = self._candidates(box)
+            self._encounter_tests += len(slots)
+            if len(slots) >= _VECTORIZE_MIN:
+                hit, distance, when = _closest_encounters(motion, self._table[slots, :_AZIMUTH], self.time_search_interval, self.search_radius, self.altitude_search_radius)
+                hit = np.flatnonzero(hit)
+                found = list(zip(slots[hit].tolist(), distance[hit].tolist(), when[hit].tolist()))
+            else:
+                table = self._table
+                for slot in slots:
+                    encounter = _closest_encounter(motion, table[slot, :_AZIMUTH].tolist(), self.time_search_interval, self.search_radius, self.altitude_search_radius)
+                    if encounter is not None:
+                        found.append((slot, encounter[0], encounter[1]))
+            if self._reports is not None and found:
+                report = self._reports.report
+                ids = self._ids
+                found = [f for f in found if report(entity_id, ids[f[0]], now, f[2], f[1])]
+            self._encounters += len(found)
+
+        slot = self._allocate(entity_id)
+        self._table[slot] = motion + (azimuth, speed) + box
+        self._box_list[slot] = box
+        self._records[slot] = observation
+        self._index.insert(slot, box)
+        heapq.heappush(self._expiry, (now, entity_id))
+        return found
+
+    def _allocate(self, entity_id):
+        if self._free:
+            slot = self._free.pop()
+        else:
+            slot = len(self._ids)
+            if slot == len(self._table):
+                # the table grows by doubling
+                self._table = np.concatenate((self._table, np.empty_like(self._table)))
+            self._ids.append(None)
+            self._records.append(None)
+            self._box_list.append(None)
+        self._ids[slot] = entity_id
+        self._slots[entity_id] = slot
+        return slot
+
+    def _remove(self, entity_id):
+        slot = self._slots.pop(entity_id, None)
+        if slot is not None:
+            self._index.remove(slot, self._box_list[slot])
+            self._ids[slot] = None
+            self._records[slot] = None
+            self._free.append(slot)
+
+    def _stored(self, slot):
+        """Returns the stored observation of a slot, rebuilt from the columns if it was given in columnar form."""
+        observation = self._records[slot]
+        if observation is not None:
+            return observation
+        latitude, longitude, altitude, observed, _, _, climb = self._table[slot, :_SIN_LAT].tolist()
+        azimuth, speed = self._table[slot, _AZIMUTH:_BOX].tolist()
+        return {'entityId': self._ids[slot], 'latitude': latitude, 'longitude': longitude, 'altitude': altitude, 'observationTime': int(observed),
+                'azimuth': azimuth, 'groundSpeed': speed, 'altitudeChangeRate': climb}
+
+    def _candidates(self, box):
+        # slots registered in the cells of the box whose swept boxes overlap with the box,
+        # as list for few candidates and as array otherwise
+        found = self._index.query(box)
+        self._candidate_count += len(found)
+        if len(found) < _VECTORIZE_MIN:
+            boxes = self._box_list
+            return [slot for slot in found if _overlaps3d(boxes[slot], box)]
+        slots = np.fromiter(found, dtype=np.intp, count=len(found))
+        b = self._table[slots, _BOX:]
+        overlap = ((b[:, 0] <= box[2]) & (box[0] <= b[:, 2]) & (b[:, 1] <= box[3]) & (box[1] <= b[:, 3])
+                   & (b[:, 4] <= box[5]) & (box[4] <= b[:, 5]))
+        return slots[overlap]
+
+    def _cleanup(self, now):
+        # expires at most cleanup_batch_size heap entries older than the cleanup interval
+        if self._clock is None or now > self._clock:
+            self._clock = now
+        oldest = self._clock - self.cleanup_interval
+        expiry = self._expiry
+        slots = self._slots
+        for _ in range(self.cleanup_batch_size):
+            if not expiry or expiry[0][0] >= oldest:
+                return
+            observed, entity_id = heapq.heappop(expiry)
+            slot = slots.get(entity_id)
+            if slot is not None and self._table[slot, _TIME] == observed:
+                self._remove(entity_id)
+                self._expired += 1
+
+    def _event(self, tuple_, observation, other, encounter):
+        if observation is tuple_:
+            event = {'observation': observation}
+        else:
+            event = dict(tuple_)
+        event[self.encounter_attribute] = other
+        event[self.encounter_distance_attribute] = encounter[0]
+        event[self.encounter_time_attribute] = encounter[1]
+        return event
+
+
+def _motion(latitude, longitude, altitude, now, azimuth, speed, climb):
+    """Returns the motion row of an observation, with the columns ``_LAT`` to ``_COS_LON``."""
+    radians = math.radians(azimuth)
+    # the sines and cosines of the position are stored, the solver projects the candidates without trigonometric functions
+    return (latitude, longitude, altitude, now, speed * math.sin(radians), speed * math.cos(radians), climb) + _trig(latitude, longitude)
+
+
+def _overlaps3d(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3] and a[4] <= b[5] and b[4] <= a[5]
+
+
+def _closest_encounters(a, b, interval, search_radius, altitude_search_radius):
+    """Closest point of approach of object `a` with all candidates `b`, solved in closed form for all candidates at once.
+
+    Positions and velocities of the candidates are projected into the east/north/up (ENU) tangent plane at the position of `a`.
+    Within the time both extrapolated paths exist, the interval where the horizontal distance is within `search_radius`
+    and the altitude difference within `altitude_search_radius` is intersected, and the time of the smallest horizontal distance
+    in that interval is the encounter.
+
+    Args:
+        a(tuple): Motion of the observed object, see :py:func:`_motion`.
+        b(numpy.ndarray): Motions of the candidates, one row per candidate.
+
+    Returns:
+        tuple: Boolean array of the candidates with an encounter, array of the horizontal distances in meters and array of the absolute encounter times in milliseconds.
+    """
+    t0 = a[_TIME]
+    lag = (t0 - b[:, _TIME]) / 1000.0
+    lo = np.maximum(-lag, 0.0)
+    hi = interval / 1000.0 - np.maximum(lag, 0.0)
+
+    # rotation of the ENU frames of the candidates into the ENU frame of a, on a sphere at altitude zero,
+    # from the stored sines and cosines of the positions
+    sin_a = a[_SIN_LAT]
+    cos_a = a[_COS_LAT]
+    sin_b = b[:, _SIN_LAT]
+    cos_b = b[:, _COS_LAT]
+    # position of b in the frame of a
+    pe, pn, sin_dlon, cos_dlon = _tangent_plane(a[_SIN_LAT:], sin_b, cos_b, b[:, _SIN_LON], b[:, _COS_LON])
+    # velocity of b in the frame of a, the up component is dropped
+    ve = cos_dlon * b[:, _VE] - sin_b * sin_dlon * b[:, _VN]
+    vn = sin_a * sin_dlon * b[:, _VE] + (cos_a * cos_b + sin_a * sin_b * cos_dlon) * b[:, _VN]
+
+    # relative motion at the observation time of a
+    de = pe + ve * lag
+    dn = pn + vn * lag
+    ve = ve - a[_VE]
+    vn = vn - a[_VN]
+    dz = b[:, _ALT] + b[:, _VZ] * lag - a[_ALT]
+    vz = b[:, _VZ] - a[_VZ]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # horizontal distance within the search radius
+        qa = ve * ve + vn * vn
+        qb = 2.0 * (de * ve + dn * vn)
+        qc = de * de + dn * dn - search_radius * search_radius
+        disc = qb * qb - 4.0 * qa * qc
+        moving = qa > 0.0
+        found = np.where(moving, disc >= 0.0, qc <= 0.0)
+        root = np.sqrt(np.maximum(disc, 0.0))
+        lo = np.where(moving, np.maximum(lo, (-qb - root) / (2.0 * qa)), lo)
+        hi = np.where(moving, np.minimum(hi, (-qb + root) / (2.0 * qa)), hi)
+        tca = np.where(moving, -qb / (2.0 * qa), 0.0)
+        # altitude difference within the altitude search radius
+        climbing = vz != 0.0
+        t1 = (-altitude_search_radius - dz) / vz
+        t2 = (altitude_search_radius - dz) / vz
+        found &= climbing | (np.abs(dz) <= altitude_search_radius)
+        lo = np.where(climbing, np.maximum(lo, np.minimum(t1, t2)), lo)
+        hi = np.where(climbing, np.minimum(hi, np.maximum(t1, t2)), hi)
+    found &= lo <= hi
+    t = np.minimum(np.maximum(tca, lo), hi)
+    distance = np.hypot(de + ve * t, dn + vn * t)
+    return found, distance, t0 + np.round(t * 1000.0).astype(np.int64)
+
+
+def _closest_encounter(a, b, interval, search_radius, altitude_search_radius):
+    """Scalar version of :py:func:`_closest_encounters` for a single candidate, returns ``(distance, time)`` or ``None``."""
+    t0 = a[_TIME]
+    lag = (t0 - b[_TIME]) / 1000.0
+    lo = max(-lag, 0.0)
+    hi = interval / 1000.0 - max(lag, 0.0)
+    if lo > hi:
+        return None
+    sin_a = a[_SIN_LAT]
+    cos_a = a[_COS_LAT]
+    sin_b = b[_SIN_LAT]
+    cos_b = b[_COS_LAT]
+    pe, pn, sin_dlon, cos_dlon = _tangent_plane(a[_SIN_LAT:], sin_b, cos_b, b[_SIN_LON], b[_COS_LON])
+    ve = cos_dlon * b[_VE] - sin_b * sin_dlon * b[_VN]
+    vn = sin_a * sin_dlon * b[_VE] + (cos_a * cos_b + sin_a * sin_b * cos_dlon) * b[_VN]
+    de = pe + ve * lag
+    dn = pn + vn * lag
+    ve -= a[_VE]
+    vn -= a[_VN]
+    dz = b[_ALT] + b[_VZ] * lag - a[_ALT]
+    vz = b[_VZ] - a[_VZ]
+
+    qa = ve * ve + vn * vn
+    qb = 2.0 * (de * ve + dn * vn)
+    qc = de * de + dn * dn - search_radius * search_radius
+    if qa > 0.0:
+        disc = qb * qb - 4.0 * qa * qc
+        if disc < 0.0:
+            return None
+        root = math.sqrt(disc)
+        lo = max(lo, (-qb - root) / (2.0 * qa))
+        hi = min(hi, (-qb + root) / (2.0 * qa))
+        tca = -qb / (2.0 * qa)
+    elif qc > 0.0:
+        return None
+    else:
+        tca = 0.0
+    if vz != 0.0:
+        t1 = (-altitude_search_radius - dz) / vz
+        t2 = (altitude_search_radius - dz) / vz
+        lo = max(lo, min(t1, t2))
+        hi = min(hi, max(t1, t2))
+    elif abs(dz) > altitude_search_radius:
+        return None
+    if lo > hi:
+        return None
+    t = min(max(tca, lo), hi)
+    return math.hypot(de + ve * t, dn + vn * t), t0 + int(round(t * 1000.0))
@@ -0,0 +1,180 @@
+# coding=utf-8
+# Licensed Materials - Property of IBM
+# Copyright IBM Corp. 2020
+
+import math
+
+import numpy as np
+
+# mean earth radius in meters, the sphere the engines calculate on
+EARTH_RADIUS = 6371008.8
+
+# WGS84 ellipsoid
+_A = 6378137.0
+_F = 1.0 / 298.257223563
+_B = _A * (1.0 - _F)
+_E2 = _F * (2.0 - _F)
+
+# the meters per degree tables hold one row per latitude band, values are interpolated linearly between the bands
+_BAND = 0.1
+_BANDS = int(round(180.0 / _BAND))
+
+_VINCENTY_ITERATIONS = 200
+
+
+def _meters_per_degree(latitude):
+    # meridian and prime vertical radius of curvature of the ellipsoid, scaled to one degree
+    phi = np.radians(latitude)
+    w = np.sqrt(1.0 - _E2 * np.sin(phi) ** 2)
+    return math.pi / 180.0 * _A * (1.0 - _E2) / w ** 3, math.pi / 180.0 * _A * np.cos(phi) / w
+
+_NORTH_TABLE, _EAST_TABLE = _meters_per_degree(np.linspace(-90.0, 90.0, _BANDS + 1))
+_EAST_TABLE[0] = _EAST_TABLE[-1] = 0.0
+
+
+def meters_per_degree(latitude):
+    """Length of one degree of latitude and of one degree of longitude on the WGS84 ellipsoid.
+
+    The values are interpolated from tables in latitude bands of 0.1 degrees, the relative error is below 1e-6.
+
+    Args:
+        latitude: Latitude in degrees, scalar or array.
+
+    Returns:
+        tuple: Meters per degree of latitude (north) and meters per degree of longitude (east) at `latitude`.
+    """
+    x = (np.clip(latitude, -90.0, 90.0) + 90.0) / _BAND
+    band = np.minimum(np.asarray(x, dtype=np.intp), _BANDS - 1)
+    f = x - band
+    north = _NORTH_TABLE[band] + (_NORTH_TABLE[band + 1] - _NORTH_TABLE[band]) * f
+    east = _EAST_TABLE[band] + (_EAST_TABLE[band + 1] - _EAST_TABLE[band]) * f
+    return north, east
+
+
+def approximate_distance(lat1, lon1, lat2, lon2):
+    """Distance in meters between points, approximated in the plane scaled with :py:func:`meters_per_degree` at the mean latitude.
+
+    Meant for filtering near points, no trigonometric function is evaluated. The relative error is below 0.1% for points
+    less than 100 km apart away from the poles, refine the remaining points with :py:func:`vincenty_distance`.
+
+    Args:
+        lat1: Latitudes of the first points in degrees.
+        lon1: Longitudes of the first points in degrees.
+        lat2: Latitudes of the second points in degrees.
+        lon2: Longitudes of the second points in degrees.
+
+    Returns:
+        Distances in meters.
+    """
+    north, east = meters_per_degree((np.asarray(lat1) + lat2) * 0.5)
+    dlon = (np.asarray(lon2) - lon1 + 180.0) % 360.0 - 180.0
+    return np.hypot((np.asarray(lat2) - lat1) * north, dlon * east)
+
+
+def haversine_distance(lat1, lon1, lat2, lon2):
+    """Great circle distance in meters between points on the sphere with the mean earth radius.
+
+    Args:
+        lat1: Latitudes of the first points in degrees.
+        lon1: Longitudes of the first points in degrees.
+        lat2: Latitudes of the second points in degrees.
+        lon2: Longitudes of the second points in degrees.
+
+    Returns:
+        Distances in meters.
+    """
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
+    h = np.sin((phi2 - phi1) * 0.5) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(np.radians(np.asarray(lon2) - lon1) * 0.5) ** 2
+    return 2.0 * EARTH_RADIUS * np.arcsin(np.sqrt(np.minimum(h, 1.0)))
+
+
+def destination_point(latitude, longitude, azimuth, distance):
+    """Point reached from a start point along a great circle on the sphere with the mean earth radius.
+
+    Args:
+        latitude: Latitudes of the start points in degrees.
+        longitude: Longitudes of the start points in degrees.
+        azimuth: Initial directions in degrees clockwise from north.
+        distance: Distances in meters.
+
+    Returns:
+        tuple: Latitudes and longitudes of the destinations in degrees, longitudes in the range [-180, 180).
+    """
+    phi = np.radians(latitude)
+    theta = np.radians(azimuth)
+    delta = np.asarray(distance, dtype=np.float64) / EARTH_RADIUS
+    sin_phi = np.sin(phi)
+    cos_phi = np.cos(phi)
+    sin_delta = np.sin(delta)
+    cos_delta = np.cos(delta)
+    sin_phi2 = np.clip(sin_phi * cos_delta + cos_phi * sin_delta * np.cos(theta), -1.0, 1.0)
+    dlon = np.arctan2(np.sin(theta) * sin_delta * cos_phi, cos_delta - sin_phi * sin_phi2)
+    return np.degrees(np.arcsin(sin_phi2)), (np.asarray(longitude) + np.degrees(dlon) + 180.0) % 360.0 - 180.0
+
+
+def vincenty_distance(lat1, lon1, lat2, lon2):
+    """Distance in meters between points on the WGS84 ellipsoid, solved with the iteration of Vincenty's inverse formula.
+
+    The iteration runs for all points at once until all points converged. It can fail to converge for nearly antipodal points,
+    their distance is the value of the last iteration.
+
+    Args:
+        lat1: Latitudes of the first points in degrees.
+        lon1: Longitudes of the first points in degrees.
+        lat2: Latitudes of the second points in degrees.
+        lon2: Longitudes of the second points in degrees.
+
+    Returns:
+        Distances in meters.
+    """
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(*[np.asarray(v, dtype=np.float64) for v in (lat1, lon1, lat2, lon2)])
+    big_l = np.radians((lon2 - lon1 + 180.0) % 360.0 - 180.0)
+    u1 = np.arctan((1.0 - _F) * np.tan(np.radians(lat1)))
+    u2 = np.arctan((1.0 - _F) * np.tan(np.radians(lat2)))
+    sin_u1, cos_u1 = np.sin(u1), np.cos(u1)
+    sin_u2, cos_u2 = np.sin(u2), np.cos(u2)
+    lam = big_l
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for _ in range(_VINCENTY_ITERATIONS):
+            sin_lam = np.sin(lam)
+            cos_lam = np.cos(lam)
+            sin_sigma = np.hypot(cos_u2 * sin_lam, cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lam)
+            cos_sigma = sin_u1 * sin_u2 + cos_u1 * cos_u2 * cos_lam
+            sigma = np.arctan2(sin_sigma, cos_sigma)
+            sin_alpha = np.where(sin_sigma > 0.0, cos_u1 * cos_u2 * sin_lam / sin_sigma, 0.0)
+            cos2_alpha = 1.0 - sin_alpha * sin_alpha
+            # equatorial lines have cos2_alpha 0
+            cos_2sm = np.where(cos2_alpha > 0.0, cos_sigma - 2.0 * sin_u1 * sin_u2 / cos2_alpha, 0.0)
+            c = _F / 16.0 * cos2_alpha * (4.0 + _F * (4.0 - 3.0 * cos2_alpha))
+            previous = lam
+            lam = big_l + (1.0 - c) * _F * sin_alpha * (sigma + c * sin_sigma * (cos_2sm + c * cos_sigma * (-1.0 + 2.0 * cos_2sm * cos_2sm)))
+            if np.all(np.abs(lam - previous) <= 1e-12):
+                break
+    u_sq = cos2_alpha * (_A * _A - _B * _B) / (_B * _B)
+    a = 1.0 + u_sq / 16384.0 * (4096.0 + u_sq * (-768.0 + u_sq * (320.0 - 175.0 * u_sq)))
+    b = u_sq / 1024.0 * (256.0 + u_sq * (-128.0 + u_sq * (74.0 - 47.0 * u_sq)))
+    delta_sigma = b * sin_sigma * (cos_2sm + b / 4.0 * (cos_sigma * (-1.0 + 2.0 * cos_2sm * cos_2sm)
+                                                       - b / 6.0 * cos_2sm * (-3.0 + 4.0 * sin_sigma * sin_sigma) * (-3.0 + 4.0 * cos_2sm * cos_2sm)))
+    return _B * a * (sigma - delta_sigma)
+
+
+def _trig(latitude, longitude):
+    """Returns sine and cosine of a latitude and of a longitude given in degrees, for :py:func:`_tangent_plane`."""
+    phi = math.radians(latitude)
+    lam = math.radians(longitude)
+    return math.sin(phi), math.cos(phi), math.sin(lam), math.cos(lam)
+
+
+def _tangent_plane(a, sin_lat, cos_lat, sin_lon, cos_lon):
+    """Projects points of the sphere into the east/north tangent plane at point `a`, without evaluating trigonometric functions.
+
+    The points are given by the sines and cosines of their coordinates, see :py:func:`_trig`, as scalars or arrays.
+
+    Returns:
+        tuple: East and north position in meters, sine and cosine of the longitude difference to `a`.
+    """
+    sin_a, cos_a, sin_lon_a, cos_lon_a = a
+    sin_dlon = sin_lon * cos_lon_a - cos_lon * sin_lon_a
+    cos_dlon = cos_lon * cos_lon_a + sin_lon * sin_lon_a
+    return (EARTH_RADIUS * cos_lat * sin_dlon, EARTH_RADIUS * (cos_a * sin_lat - sin_a * cos_lat * cos_dlon), sin_dlon, cos_dlon)
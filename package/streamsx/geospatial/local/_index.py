@@ -0,0 +1,278 @@
+# coding=utf-8
+# Licensed Materials - Property of IBM
+# Copyright IBM Corp. 2020
+
+import math
+
+
+class _GridIndex(object):
+    """Uniform grid over bounding boxes, cells are keyed by their integer column and row.
+
+    Entries whose bounding box spans more than `max_cells` cells are kept in a separate
+    list that is returned for every query, so a few huge regions do not fill the grid.
+    """
+
+    def __init__(self, cell_size, max_cells=4096):
+        if cell_size <= 0:
+            raise ValueError('cell_size must be greater than zero')
+        self.cell_size = float(cell_size)
+        self.max_cells = max_cells
+        self._cells = {}
+        self._boxes = {}
+        self._large = set()
+        # number of cells and of keys looked at by point queries
+        self.cells_visited = 0
+        self.keys_examined = 0
+
+    def __len__(self):
+        return len(self._boxes)
+
+    def _span(self, bbox):
+        cs = self.cell_size
+        return (int(math.floor(bbox[0] / cs)), int(math.floor(bbox[1] / cs)),
+                int(math.floor(bbox[2] / cs)), int(math.floor(bbox[3] / cs)))
+
+    def insert(self, key, bbox):
+        """Adds `key` with the bounding box ``(xmin, ymin, xmax, ymax)``, replacing an existing entry."""
+        if key in self._boxes:
+            self.remove(key)
+        self._boxes[key] = bbox
+        x0, y0, x1, y1 = self._span(bbox)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > self.max_cells:
+            self._large.add(key)
+            return
+        cells = self._cells
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket is None:
+                    cells[(cx, cy)] = [key]
+                else:
+                    bucket.append(key)
+
+    def remove(self, key):
+        bbox = self._boxes.pop(key, None)
+        if bbox is None:
+            return False
+        if key in self._large:
+            self._large.discard(key)
+            return True
+        x0, y0, x1, y1 = self._span(bbox)
+        cells = self._cells
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = cells[(cx, cy)]
+                bucket.remove(key)
+                if not bucket:
+                    del cells[(cx, cy)]
+        return True
+
+    def query_cell(self, cx, cy):
+        """Returns the keys whose bounding box may overlap the cell in column `cx` and row `cy`."""
+        bucket = self._cells.get((cx, cy))
+        if bucket is None:
+            return self._large
+        if self._large:
+            return bucket + list(self._large)
+        return bucket
+
+    def query_point(self, x, y):
+        """Returns the keys whose bounding box contains the point ``(x, y)``."""
+        cs = self.cell_size
+        bucket = self._cells.get((int(math.floor(x / cs)), int(math.floor(y / cs))), ())
+        self.cells_visited += 1
+        self.keys_examined += len(bucket) + len(self._large)
+        boxes = self._boxes
+        result = []
+        for key in bucket:
+            b = boxes[key]
+            if b[0] <= x <= b[2] and b[1] <= y <= b[3]:
+                result.append(key)
+        for key in self._large:
+            b = boxes[key]
+            if b[0] <= x <= b[2] and b[1] <= y <= b[3]:
+                result.append(key)
+        return result
+
+
+    def query_box(self, bbox):
+        """Returns the keys whose bounding box overlaps the box ``(xmin, ymin, xmax, ymax)``."""
+        x0, y0, x1, y1 = self._span(bbox)
+        keys = set(self._large)
+        cells = self._cells
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                keys.update(cells.get((cx, cy), ()))
+        boxes = self._boxes
+        return [key for key in keys if _overlaps(boxes[key], bbox)]
+
+def _overlaps(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+class _CellGrid(object):
+    """Fixed grid of `rows` x `cols` cells over `bounds`, keys are registered in all cells overlapping their box.
+
+    Boxes outside of the bounds are registered in the border cells.
+    """
+
+    def __init__(self, bounds, rows, cols):
+        self.bounds = bounds
+        self.rows = rows
+        self.cols = cols
+        self._row_scale = rows / float(bounds[3] - bounds[1])
+        self._col_scale = cols / float(bounds[2] - bounds[0])
+        self._cells = [set() for _ in range(rows * cols)]
+        # number of cells looked at by queries
+        self.cells_visited = 0
+
+    def _span(self, box):
+        x0, y0 = self.bounds[0], self.bounds[1]
+        last_row = self.rows - 1
+        last_col = self.cols - 1
+        row0 = min(max(int((box[1] - y0) * self._row_scale), 0), last_row)
+        row1 = min(max(int((box[3] - y0) * self._row_scale), 0), last_row)
+        col0 = min(max(int((box[0] - x0) * self._col_scale), 0), last_col)
+        col1 = min(max(int((box[2] - x0) * self._col_scale), 0), last_col)
+        n = self.cols
+        return [row * n + col for row in range(row0, row1 + 1) for col in range(col0, col1 + 1)]
+
+    def insert(self, key, box):
+        cells = self._cells
+        for cell in self._span(box):
+            cells[cell].add(key)
+
+    def remove(self, key, box):
+        cells = self._cells
+        for cell in self._span(box):
+            cells[cell].discard(key)
+
+    def query(self, box):
+        """Returns the set of keys registered in the cells overlapping the box."""
+        cells = self._cells
+        span = self._span(box)
+        self.cells_visited += len(span)
+        return set().union(*[cells[cell] for cell in span])
+
+
+class _QuadNode(object):
+    __slots__ = ('bounds', 'depth', 'items', 'children', 'split_at')
+
+    def __init__(self, bounds, depth, split_at):
+        self.bounds = bounds
+        self.depth = depth
+        # key -> box while the node is a leaf
+        self.items = {}
+        self.children = None
+        # number of items at which the next split is attempted
+        self.split_at = split_at
+
+
+class _QuadTree(object):
+    """Quadtree over `bounds` whose leaves split when they hold more than `capacity` keys.
+
+    Dense areas get small leaves while sparse areas stay coarse. Keys are registered in all leaves
+    overlapping their box, leaves are merged again when their parent holds less than half of the capacity.
+    A leaf is not split if most of its boxes would overlap several children, as the split would only
+    duplicate entries; it is tried again when the leaf has doubled in size.
+    Boxes outside of the bounds are registered in the border leaves.
+    """
+
+    def __init__(self, bounds, capacity=32, max_depth=12):
+        self.bounds = bounds
+        self.capacity = capacity
+        self.max_depth = max_depth
+        self._root = _QuadNode(bounds, 0, capacity + 1)
+        # number of leaves looked at by queries
+        self.cells_visited = 0
+
+    def _clamp(self, box):
+        b = self.bounds
+        return (min(max(box[0], b[0]), b[2]), min(max(box[1], b[1]), b[3]),
+                min(max(box[2], b[0]), b[2]), min(max(box[3], b[1]), b[3]))
+
+    @property
+    def leaf_count(self):
+        """int: Number of leaves of the tree."""
+        count = 0
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node.children is None:
+                count += 1
+            else:
+                stack.extend(node.children)
+        return count
+
+    def insert(self, key, box):
+        self._insert(self._root, key, box, self._clamp(box))
+
+    def _insert(self, node, key, box, clamped):
+        if node.children is None:
+            node.items[key] = box
+            if len(node.items) >= node.split_at and node.depth < self.max_depth:
+                self._split(node)
+            return
+        for child in node.children:
+            if _overlaps(child.bounds, clamped):
+                self._insert(child, key, box, clamped)
+
+    def _split(self, node):
+        x0, y0, x1, y1 = node.bounds
+        xm = (x0 + x1) / 2.0
+        ym = (y0 + y1) / 2.0
+        depth = node.depth + 1
+        split_at = self.capacity + 1
+        children = [_QuadNode((x0, y0, xm, ym), depth, split_at), _QuadNode((xm, y0, x1, ym), depth, split_at),
+                    _QuadNode((x0, ym, xm, y1), depth, split_at), _QuadNode((xm, ym, x1, y1), depth, split_at)]
+        placement = []
+        entries = 0
+        for key, box in node.items.items():
+            clamped = self._clamp(box)
+            targets = [child for child in children if _overlaps(child.bounds, clamped)]
+            entries += len(targets)
+            placement.append((key, box, clamped, targets))
+        if entries > 2 * len(placement):
+            node.split_at = 2 * len(placement)
+            return
+        node.items = None
+        node.children = children
+        for key, box, clamped, targets in placement:
+            for child in targets:
+                self._insert(child, key, box, clamped)
+
+    def remove(self, key, box):
+        self._remove(self._root, key, self._clamp(box))
+
+    def _remove(self, node, key, clamped):
+        if node.children is None:
+            node.items.pop(key, None)
+            return
+        for child in node.children:
+            if _overlaps(child.bounds, clamped):
+                self._remove(child, key, clamped)
+        if all(child.children is None for child in node.children):
+            merged = {}
+            for child in node.children:
+                merged.update(child.items)
+                if len(merged) > self.capacity // 2:
+                    return
+            node.items = merged
+            node.children = None
+            node.split_at = self.capacity + 1
+
+    def query(self, box):
+        """Returns the set of keys registered in the leaves overlapping the box."""
+        clamped = self._clamp(box)
+        leaves = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node.children is None:
+                leaves.append(node.items.keys())
+            else:
+                for child in node.children:
+                    if _overlaps(child.bounds, clamped):
+                        stack.append(child)
+        self.cells_visited += len(leaves)
+        return set().union(*leaves)
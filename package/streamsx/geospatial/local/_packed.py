@@ -0,0 +1,123 @@
+# coding=utf-8
+# Licensed Materials - Property of IBM
+# Copyright IBM Corp. 2020
+
+import numpy as np
+
+# upper bound for the number of point/edge pairs tested at once by the vectorized ray casting
+_EDGES_PER_CHUNK = 1 << 21
+
+
+def _cell_keys(cx, cy):
+    return cx.astype(np.int64) * (1 << 32) + cy.astype(np.int64)
+
+
+def _pack_index(index, position):
+    """Returns the cells of a :py:class:`_GridIndex` in CSR form: sorted cell keys, start of each cell, region positions and positions of the large regions."""
+    cells = sorted(index._cells.items())
+    cell_keys = _cell_keys(np.array([c[0][0] for c in cells], dtype=np.int64), np.array([c[0][1] for c in cells], dtype=np.int64))
+    sizes = np.array([len(c[1]) for c in cells], dtype=np.int64)
+    cell_start = np.zeros(len(cells) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=cell_start[1:])
+    cell_regions = np.array([position[rid] for c in cells for rid in c[1]], dtype=np.int64)
+    large = np.array([position[rid] for rid in index._large], dtype=np.int64)
+    return cell_keys, cell_start, cell_regions, large
+
+
+class _PackedRegions(object):
+    """Regions and their grid index packed into flat arrays for the vectorized batch matching.
+
+    The edges of all regions are stored in contiguous arrays, region ``i`` owns the edges
+    ``edge_start[i]:edge_start[i] + edge_count[i]``. The grid cells are stored in CSR form,
+    the sorted cell keys point into a flat array of region positions.
+    """
+
+    def __init__(self, regions, index, cache):
+        self.ids = list(regions)
+        position = dict((rid, i) for i, rid in enumerate(self.ids))
+        polygons = [cache.get(rid, regions[rid].wkt) for rid in self.ids]
+        self.cell_size = index.cell_size
+        # polygons with a raster are tested on their own, their edges are not packed
+        self.rastered = np.array([p.raster is not None for p in polygons], dtype=bool)
+        self.polygon = dict((i, p) for i, p in enumerate(polygons) if p.raster is not None).__getitem__
+        self.edge_count = np.array([0 if p.raster is not None else p.vertex_count for p in polygons], dtype=np.int64)
+        self.edge_start = np.zeros(len(polygons), dtype=np.int64)
+        if polygons:
+            np.cumsum(self.edge_count[:-1], out=self.edge_start[1:])
+        edges = [p.edges for p in polygons if p.raster is None]
+        self.edges = np.concatenate(edges, axis=1) if edges else np.zeros((5, 0), dtype=np.float64)
+        self.x0, self.y0, self.slope, self.ylo, self.yhi = self.edges
+        self.bbox = np.array([p.bbox for p in polygons], dtype=np.float64).reshape(-1, 4)
+        self.cell_keys, self.cell_start, self.cell_regions, self.large = _pack_index(index, position)
+
+    @classmethod
+    def _from_store(cls, store):
+        """Packs the regions of a :py:class:`_RegionStore`, the arrays are the views of the store."""
+        packed = cls.__new__(cls)
+        packed.ids = store.ids
+        packed.cell_size = store.cell_size
+        packed.rastered = store.rastered
+        packed.polygon = store.polygon_at
+        # the edges of all regions are in the table, the regions with a raster have no edges to test
+        packed.edge_count = np.where(store.rastered, 0, np.diff(store.edge_offsets))
+        packed.edge_start = store.edge_offsets[:-1]
+        packed.edges = store.edges
+        packed.x0, packed.y0, packed.slope, packed.ylo, packed.yhi = store.edges
+        packed.bbox = store.bbox
+        packed.cell_keys, packed.cell_start, packed.cell_regions, packed.large = store.cell_keys, store.cell_start, store.cell_regions, store.large
+        return packed
+
+    def candidates(self, x, y):
+        """Returns the arrays ``(points, regions)`` of all point/region pairs where the point is in the region's bounding box.
+
+        The number of pairs found in the grid cells before the bounding box test is kept in ``examined``.
+        """
+        keys = _cell_keys(np.floor(x / self.cell_size), np.floor(y / self.cell_size))
+        start = np.zeros(len(keys), dtype=np.int64)
+        count = np.zeros(len(keys), dtype=np.int64)
+        if len(self.cell_keys):
+            slot = np.minimum(np.searchsorted(self.cell_keys, keys), len(self.cell_keys) - 1)
+            found = self.cell_keys[slot] == keys
+            start = np.where(found, self.cell_start[slot], 0)
+            count = np.where(found, self.cell_start[slot + 1] - self.cell_start[slot], 0)
+        points = np.repeat(np.arange(len(x), dtype=np.int64), count)
+        offsets = np.arange(len(points), dtype=np.int64) - np.repeat(np.cumsum(count) - count, count)
+        regions = self.cell_regions[np.repeat(start, count) + offsets]
+        if len(self.large):
+            points = np.concatenate((points, np.repeat(np.arange(len(x), dtype=np.int64), len(self.large))))
+            regions = np.concatenate((regions, np.tile(self.large, len(x))))
+        self.examined = len(points)
+        b = self.bbox[regions]
+        px = x[points]
+        py = y[points]
+        in_box = (px >= b[:, 0]) & (px <= b[:, 2]) & (py >= b[:, 1]) & (py <= b[:, 3])
+        return points[in_box], regions[in_box]
+
+    def contains(self, points, regions, x, y):
+        """Even-odd test for each point/region pair, returns a boolean array."""
+        result = np.zeros(len(points), dtype=bool)
+        rastered = self.rastered[regions]
+        if rastered.any():
+            pairs = np.flatnonzero(rastered)
+            for r in np.unique(regions[pairs]).tolist():
+                selected = pairs[regions[pairs] == r]
+                result[selected] = self.polygon(r).contains_many(x[points[selected]], y[points[selected]])
+            plain = np.flatnonzero(~rastered)
+            result[plain] = self.contains(points[plain], regions[plain], x, y)
+            return result
+        counts = self.edge_count[regions]
+        ends = np.cumsum(counts)
+        first = 0
+        while first < len(points):
+            # chunk boundaries so that the expanded pair x edge arrays stay bounded
+            base = ends[first - 1] if first else 0
+            last = max(first + 1, int(np.searchsorted(ends, base + _EDGES_PER_CHUNK, side='right')))
+            c = counts[first:last]
+            pair = np.repeat(np.arange(first, last, dtype=np.int64), c)
+            edge = np.repeat(self.edge_start[regions[first:last]] - (ends[first:last] - c - base), c) + np.arange(len(pair), dtype=np.int64)
+            py = y[points[pair]]
+            crossing = (self.ylo[edge] <= py) & (py < self.yhi[edge]) & (x[points[pair]] < (py - self.y0[edge]) * self.slope[edge] + self.x0[edge])
+            hits = np.bincount(pair - first, weights=crossing, minlength=last - first)
+            result[first:last] = (hits.astype(np.int64) & 1).astype(bool)
+            first = last
+        return result
@@ -0,0 +1,373 @@
+# coding=utf-8
+# Licensed Materials - Property of IBM
+# Copyright IBM Corp. 2020
+
+import collections
+
+import numpy as np
+
+from streamsx.geospatial.local._wkt import _RING, parse_polygon_wkt
+
+OUTSIDE = 0
+INSIDE = 1
+BOUNDARY = 2
+
+# rows of the edge table
+_X0, _Y0, _SLOPE, _YLO, _YHI = range(5)
+
+# average number of edges per slab of the slab index and upper bound for the number of slabs
+_EDGES_PER_SLAB = 8
+_MAX_SLABS = 1 << 16
+
+# upper bound for the number of point/edge pairs tested at once
+_PAIRS_PER_CHUNK = 1 << 20
+
+
+class CompiledPolygon(object):
+    """Polygon compiled from WKT for fast point-in-polygon tests.
+
+    The edges of all rings are stored in one contiguous float64 table with the rows
+    start longitude, start latitude, slope (longitude change per latitude), lower and upper latitude of the edge.
+    Polygons with at least `raster_threshold` vertices are prepared for repeated tests: a raster over their bounding box
+    classifies each cell as fully inside, fully outside or crossed by the boundary, so that most tests
+    are answered without looking at the edges. Points in boundary cells are tested against the edges of one horizontal
+    slab only, the edges are bucketed into slabs of equal height over the latitude range of the polygon.
+
+    Args:
+        wkt(str): Polygon or multi polygon as WKT string.
+        raster_threshold(int): Minimum number of vertices for the raster and the slab index, ``None`` disables both.
+    """
+
+    __slots__ = ('wkt', 'bbox', 'edges', 'raster', '_scale', '_slabs')
+
+    def __init__(self, wkt, raster_threshold=256):
+        rings = parse_polygon_wkt(wkt)
+        x0 = np.concatenate([np.asarray(xs, dtype=np.float64) for xs, ys in rings])
+        y0 = np.concatenate([np.asarray(ys, dtype=np.float64) for xs, ys in rings])
+        x1 = np.concatenate([np.roll(np.asarray(xs, dtype=np.float64), -1) for xs, ys in rings])
+        y1 = np.concatenate([np.roll(np.asarray(ys, dtype=np.float64), -1) for xs, ys in rings])
+        bbox = (float(x0.min()), float(y0.min()), float(x0.max()), float(y0.max()))
+        self._prepare(wkt, bbox, _edge_table(x0, y0, x1, y1), x1, raster_threshold)
+
+    def _prepare(self, wkt, bbox, edges, x1, raster_threshold):
+        self.wkt = wkt
+        self.bbox = bbox
+        self.edges = edges
+        self.raster = None
+        self._scale = None
+        self._slabs = None
+        if raster_threshold is not None and edges.shape[1] >= raster_threshold:
+            self._build_raster(x1)
+            self._build_slabs()
+
+    @property
+    def vertex_count(self):
+        """int: Number of edges (and vertices) of all rings."""
+        return self.edges.shape[1]
+
+    @property
+    def nbytes(self):
+        """int: Memory used by the arrays of the polygon."""
+        nbytes = self.edges.nbytes
+        if self.raster is not None:
+            nbytes += self.raster.nbytes + self._slabs[3].nbytes + self._slabs[4].nbytes
+        return nbytes
+
+    def _build_raster(self, x1):
+        n = int(min(256, max(8, np.sqrt(self.vertex_count))))
+        xmin, ymin, xmax, ymax = self.bbox
+        w = (xmax - xmin) / n or 1.0
+        h = (ymax - ymin) / n or 1.0
+        raster = np.empty((n, n), dtype=np.uint8)
+        # interior of the cells by scan lines through the cell centers
+        cx = xmin + (np.arange(n) + 0.5) * w
+        e = self.edges
+        for row in range(n):
+            y = ymin + (row + 0.5) * h
+            spans = (e[_YLO] <= y) & (y < e[_YHI])
+            crossings = np.sort((y - e[_Y0][spans]) * e[_SLOPE][spans] + e[_X0][spans])
+            # a cell center is inside if an odd number of crossings lies to its right
+            right = len(crossings) - np.searchsorted(crossings, cx, side='right')
+            raster[row] = right & 1
+        # cells touched by the bounding box of an edge are boundary cells
+        c0 = np.clip(((np.minimum(e[_X0], x1) - xmin) / w).astype(np.int64), 0, n - 1)
+        c1 = np.clip(((np.maximum(e[_X0], x1) - xmin) / w).astype(np.int64), 0, n - 1)
+        r0 = np.clip(((e[_YLO] - ymin) / h).astype(np.int64), 0, n - 1)
+        r1 = np.clip(((e[_YHI] - ymin) / h).astype(np.int64), 0, n - 1)
+        for a, b, c, d in zip(r0.tolist(), r1.tolist(), c0.tolist(), c1.tolist()):
+            raster[a:b + 1, c:d + 1] = BOUNDARY
+        self.raster = raster
+        self._scale = _raster_scale(self.bbox, n)
+
+    @classmethod
+    def _from_arrays(cls, wkt, bbox, edges, raster):
+        # restores a polygon compiled before, the arrays may be read-only views of a snapshot
+        polygon = cls.__new__(cls)
+        polygon.wkt = wkt
+        polygon.bbox = bbox
+        polygon.edges = edges
+        polygon.raster = raster
+        polygon._scale = None
+        polygon._slabs = None
+        if raster is not None:
+            polygon._scale = _raster_scale(bbox, raster.shape[0])
+            polygon._build_slabs()
+        return polygon
+
+    def _build_slabs(self):
+        # edge table ordered by slab, slab i owns the columns start[i]:start[i + 1]; an edge is copied
+        # into every slab its latitude range overlaps, horizontal edges are left out as they never cross the ray
+        e = self.edges
+        ymin, ymax = self.bbox[1], self.bbox[3]
+        sloped = np.flatnonzero(e[_YLO] < e[_YHI])
+        count = int(min(_MAX_SLABS, max(1, self.vertex_count // _EDGES_PER_SLAB)))
+        while True:
+            inverse = count / (ymax - ymin) if ymax > ymin else 0.0
+            first = np.minimum(((e[_YLO][sloped] - ymin) * inverse).astype(np.int64), count - 1)
+            last = np.minimum(((e[_YHI][sloped] - ymin) * inverse).astype(np.int64), count - 1)
+            spans = last - first + 1
+            # long edges are copied into many slabs, fewer slabs bound the size of the table
+            if count == 1 or spans.sum() <= 8 * len(sloped) + count:
+                break
+            count = max(1, count // 4)
+        edge = np.repeat(sloped, spans)
+        slab = np.repeat(first, spans) + np.arange(len(edge), dtype=np.int64) - np.repeat(np.cumsum(spans) - spans, spans)
+        order = np.argsort(slab, kind='stable')
+        start = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(slab, minlength=count), out=start[1:])
+        self._slabs = (ymin, inverse, count - 1, start, np.ascontiguousarray(e[:, edge[order]]))
+
+    def _slab_contains(self, x, y):
+        ymin, inverse, last, start, table = self._slabs
+        slab = min(int((y - ymin) * inverse), last)
+        e = table[:, start[slab]:start[slab + 1]]
+        crossing = (e[_YLO] <= y) & (y < e[_YHI]) & (x < (y - e[_Y0]) * e[_SLOPE] + e[_X0])
+        return bool(np.count_nonzero(crossing) & 1)
+
+    def _slab_contains_many(self, x, y):
+        ymin, inverse, last, start, table = self._slabs
+        slab = np.minimum(((y - ymin) * inverse).astype(np.int64), last)
+        first = start[slab]
+        counts = start[slab + 1] - first
+        ends = np.cumsum(counts)
+        result = np.zeros(len(x), dtype=bool)
+        done = 0
+        while done < len(x):
+            # chunks of points whose point x edge pairs stay bounded
+            base = ends[done - 1] if done else 0
+            stop = max(done + 1, int(np.searchsorted(ends, base + _PAIRS_PER_CHUNK, side='right')))
+            c = counts[done:stop]
+            pair = np.repeat(np.arange(done, stop, dtype=np.int64), c)
+            column = np.repeat(first[done:stop] - (ends[done:stop] - c - base), c) + np.arange(len(pair), dtype=np.int64)
+            e = table[:, column]
+            py = y[pair]
+            crossing = (e[_YLO] <= py) & (py < e[_YHI]) & (x[pair] < (py - e[_Y0]) * e[_SLOPE] + e[_X0])
+            hits = np.bincount(pair - done, weights=crossing, minlength=stop - done)
+            result[done:stop] = (hits.astype(np.int64) & 1).astype(bool)
+            done = stop
+        return result
+
+    def contains(self, x, y):
+        """Returns ``True`` if the point ``(x, y)`` (longitude, latitude) is inside the polygon."""
+        b = self.bbox
+        if not (b[0] <= x <= b[2] and b[1] <= y <= b[3]):
+            return False
+        if self.raster is not None:
+            xmin, ymin, sx, sy, last = self._scale
+            cell = self.raster[min(int((y - ymin) * sy), last), min(int((x - xmin) * sx), last)]
+            if cell != BOUNDARY:
+                return cell == INSIDE
+            return self._slab_contains(x, y)
+        e = self.edges
+        crossing = (e[_YLO] <= y) & (y < e[_YHI]) & (x < (y - e[_Y0]) * e[_SLOPE] + e[_X0])
+        return bool(np.count_nonzero(crossing) & 1)
+
+    def contains_many(self, x, y):
+        """Vectorized version of :py:meth:`contains` for arrays of longitudes `x` and latitudes `y`."""
+        b = self.bbox
+        result = np.zeros(len(x), dtype=bool)
+        todo = np.flatnonzero((x >= b[0]) & (x <= b[2]) & (y >= b[1]) & (y <= b[3]))
+        if self.raster is not None and len(todo):
+            xmin, ymin, sx, sy, last = self._scale
+            cells = self.raster[np.minimum(((y[todo] - ymin) * sy).astype(np.int64), last), np.minimum(((x[todo] - xmin) * sx).astype(np.int64), last)]
+            result[todo[cells == INSIDE]] = True
+            todo = todo[cells == BOUNDARY]
+            result[todo] = self._slab_contains_many(x[todo], y[todo])
+            return result
+        e = self.edges
+        chunk = max(1, (1 << 20) // self.vertex_count)
+        for start in range(0, len(todo), chunk):
+            members = todo[start:start + chunk]
+            px = x[members, None]
+            py = y[members, None]
+            crossing = (e[_YLO] <= py) & (py < e[_YHI]) & (px < (py - e[_Y0]) * e[_SLOPE] + e[_X0])
+            result[members] = (np.count_nonzero(crossing, axis=1) & 1).astype(bool)
+        return result
+
+
+def _edge_table(x0, y0, x1, y1):
+    # edges from (x0, y0) to (x1, y1) as rows of the edge table
+    dy = y1 - y0
+    flat = dy == 0
+    edges = np.empty((5, len(x0)), dtype=np.float64)
+    edges[_X0] = x0
+    edges[_Y0] = y0
+    # horizontal edges never cross the ray, their slope is never used
+    edges[_SLOPE] = np.where(flat, 0.0, (x1 - x0) / np.where(flat, 1.0, dy))
+    np.minimum(y0, y1, out=edges[_YLO])
+    np.maximum(y0, y1, out=edges[_YHI])
+    return edges
+
+
+def compile_polygons(wkts, raster_threshold=256):
+    """Compiles many polygons at once, returns a list of :py:class:`CompiledPolygon`.
+
+    The coordinates of all polygons are parsed with one array conversion and their edges are computed in one table,
+    each polygon gets a copy of its part of the table, so that a cached polygon does not keep the whole table alive. Polygons the bulk parser does not accept, like geometries with
+    more than two coordinates per vertex or invalid WKT, are compiled on their own, so invalid WKT raises the same errors.
+    """
+    wkts = list(wkts)
+    texts = []
+    counts = []
+    sizes = []
+    single = []
+    for i, wkt in enumerate(wkts):
+        rings = _RING.findall(wkt) if wkt is not None and wkt.lstrip()[:12].upper().startswith(('POLYGON', 'MULTIPOLYGON')) else ()
+        ring_counts = [ring.count(',') + 1 for ring in rings]
+        if not rings or min(ring_counts) < 3:
+            single.append(i)
+            sizes.append(0)
+            continue
+        texts.extend(rings)
+        counts.extend(ring_counts)
+        sizes.append(sum(ring_counts))
+    if single and len(single) == len(wkts):
+        return [CompiledPolygon(wkt, raster_threshold) for wkt in wkts]
+    counts = np.asarray(counts, dtype=np.int64)
+    try:
+        coords = np.array(','.join(texts).replace(',', ' ').split(), dtype=np.float64)
+    except ValueError:
+        coords = None
+    if coords is None or len(coords) != 2 * counts.sum():
+        # vertices with altitude or malformed coordinates
+        return [CompiledPolygon(wkt, raster_threshold) for wkt in wkts]
+    x0 = coords[0::2]
+    y0 = coords[1::2]
+    # the next vertex of the last vertex of a ring is its first vertex
+    following = np.arange(1, len(x0) + 1, dtype=np.int64)
+    ends = np.cumsum(counts)
+    following[ends - 1] = ends - counts
+    x1 = x0[following]
+    edges = _edge_table(x0, y0, x1, y0[following])
+    sizes = np.asarray(sizes, dtype=np.int64)
+    starts = np.cumsum(sizes) - sizes
+    compiled = starts[sizes > 0]
+    bboxes = np.column_stack((np.minimum.reduceat(x0, compiled), np.minimum.reduceat(y0, compiled),
+                              np.maximum.reduceat(x0, compiled), np.maximum.reduceat(y0, compiled))).tolist() if len(compiled) else []
+    result = []
+    boxes = iter(bboxes)
+    single = set(single)
+    for i, (wkt, start, size) in enumerate(zip(wkts, starts.tolist(), sizes.tolist())):
+        if i in single:
+            result.append(CompiledPolygon(wkt, raster_threshold))
+            continue
+        polygon = CompiledPolygon.__new__(CompiledPolygon)
+        polygon._prepare(wkt, tuple(next(boxes)), edges[:, start:start + size].copy(), x1[start:start + size], raster_threshold)
+        result.append(polygon)
+    return result
+
+
+def _raster_scale(bbox, n):
+    # origin, inverse cell sizes and last cell of an n x n raster over the bounding box
+    xmin, ymin, xmax, ymax = bbox
+    w = (xmax - xmin) / n or 1.0
+    h = (ymax - ymin) / n or 1.0
+    return (xmin, ymin, 1.0 / w, 1.0 / h, n - 1)
+
+
+class PolygonCache(object):
+    """Cache of compiled polygons keyed by region id.
+
+    A region's WKT is parsed only once, as long as the region is added again with the same WKT
+    the compiled polygon is reused. The least recently used polygons are evicted when the cache
+    holds more than `max_bytes` of polygon arrays.
+
+    Args:
+        max_bytes(int): Memory bound for the arrays of all cached polygons.
+        raster_threshold(int): Minimum number of vertices for the interior raster of a polygon, ``None`` disables rasters.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, raster_threshold=256):
+        self.max_bytes = max_bytes
+        self.raster_threshold = raster_threshold
+        self._polygons = collections.OrderedDict()
+        self._nbytes = 0
+
+    def __len__(self):
+        return len(self._polygons)
+
+    def __contains__(self, region_id):
+        return region_id in self._polygons
+
+    @property
+    def nbytes(self):
+        """int: Memory used by the arrays of all cached polygons."""
+        return self._nbytes
+
+    def get(self, region_id, wkt):
+        """Returns the compiled polygon of a region, parsing `wkt` if it is not cached or has changed.
+
+        Args:
+            region_id(str): The id of the region.
+            wkt(str): The geometry of the region as WKT string.
+
+        Returns:
+            CompiledPolygon: The compiled polygon.
+        """
+        polygons = self._polygons
+        polygon = polygons.get(region_id)
+        if polygon is not None and polygon.wkt == wkt:
+            polygons.move_to_end(region_id)
+            return polygon
+        compiled = CompiledPolygon(wkt, self.raster_threshold)
+        self.put(region_id, compiled)
+        return compiled
+
+    def lookup(self, region_id):
+        """Returns the cached polygon of a region without parsing, ``None`` if the region is not cached.
+
+        A found polygon counts as recently used.
+        """
+        polygon = self._polygons.get(region_id)
+        if polygon is not None:
+            self._polygons.move_to_end(region_id)
+        return polygon
+
+    def put(self, region_id, compiled):
+        """Adds the compiled polygon of a region, replacing a cached polygon, and evicts the least recently used polygons beyond `max_bytes`.
+
+        Args:
+            region_id(str): The id of the region.
+            compiled(CompiledPolygon): The compiled polygon.
+        """
+        polygons = self._polygons
+        polygon = polygons.get(region_id)
+        if polygon is not None:
+            self._nbytes -= polygon.nbytes
+        polygons[region_id] = compiled
+        polygons.move_to_end(region_id)
+        self._nbytes += compiled.nbytes
+        while self._nbytes > self.max_bytes and len(polygons) > 1:
+            _, evicted = polygons.popitem(last=False)
+            self._nbytes -= evicted.nbytes
+
+    def discard(self, region_id):
+        """Removes the polygon of a region from the cache."""
+        polygon = self._polygons.pop(region_id, None)
+        if polygon is not None:
+            self._nbytes -= polygon.nbytes
+
+    def clear(self):
+        """Removes all polygons from the cache."""
+        self._polygons.clear()
+        self._nbytes = 0
@@ -0,0 +1,820 @@
+# coding=utf-8
+# Licensed Materials - Property of IBM
+# Copyright IBM Corp. 2020
+
+import datetime
+import math
+
+import numpy as np
+
+from streamsx.geospatial.local._cellmap import _CellMap
+from streamsx.geospatial.local._index import _GridIndex
+from streamsx.geospatial.local._packed import _PackedRegions
+from streamsx.geospatial.local._polygon import CompiledPolygon, PolygonCache, compile_polygons, _X0, _Y0, _SLOPE, _YLO, _YHI
+from streamsx.geospatial.local._snapshot import pack_strings, read_snapshot, unpack_strings, write_snapshot
+from streamsx.geospatial.local._store import _RegionStore, write_region_store
+from streamsx.geospatial.local._wheel import _TimingWheel
+
+ENTER = 'ENTER'
+EXIT = 'EXIT'
+HANGOUT = 'HANGOUT'
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+# the cells of the unchanged position check divide the index cells into _SUBDIVISIONS x _SUBDIVISIONS cells
+_SUBDIVISIONS = 16
+# bounds for the number of classified cells and of devices with a last match, the entries are dropped when they are exceeded
+_MAX_CLASSIFIED_CELLS = 1 << 16
+_MAX_LAST_MATCHES = 1 << 20
+
+# smallest number of streamed observations matched with the vectorized batch matching
+_BATCH_MIN = 32
+
+# resolution in seconds of the timing wheel expiring device states after the timeouts of their regions
+_TIMER_RESOLUTION = 1.0
+
+
+def _to_seconds(ts):
+    """Converts an SPL timestamp, a datetime or a number of seconds to seconds since epoch."""
+    if hasattr(ts, 'nanoseconds'):
+        # streamsx.spl.types.Timestamp
+        return ts.time()
+    if isinstance(ts, datetime.datetime):
+        if ts.tzinfo is not None:
+            return ts.timestamp()
+        return (ts - _EPOCH).total_seconds()
+    return float(ts)
+
+
+def _to_seconds_array(timestamps):
+    """Converts an array of timestamps to a float64 array of seconds since epoch."""
+    ts = np.asarray(timestamps)
+    if ts.dtype.kind == 'M':
+        return ts.astype('datetime64[ns]').astype(np.int64) / 1e9
+    if ts.dtype.kind == 'O':
+        return np.fromiter((_to_seconds(t) for t in ts), dtype=np.float64, count=len(ts))
+    return ts.astype(np.float64)
+
+
+# settings of the engine saved in snapshots besides the cell size
+_SETTINGS = ('event_type_attribute', 'region_name_attribute', 'id_attribute', 'latitude_attribute', 'longitude_attribute', 'timestamp_attribute', 'skip_unchanged', 'cell_map')
+
+
+class _Region(object):
+    __slots__ = ('id', 'wkt', 'bbox', 'notify_entry', 'notify_exit', 'notify_hangout', 'dwell', 'timeout')
+
+    def __init__(self, region, polygon):
+        self.id = region['id']
+        self.wkt = region['polygonAsWKT']
+        self.bbox = polygon.bbox
+        self.notify_entry = bool(region.get('notifyOnEntry', True))
+        self.notify_exit = bool(region.get('notifyOnExit', True))
+        self.notify_hangout = bool(region.get('notifyOnHangout', True))
+        self.dwell = region.get('minimumDwellTime', 0) or 0
+        self.timeout = region.get('timeout', 0) or 0
+
+
+class _DeviceState(object):
+    __slots__ = ('last_seen', 'regions')
+
+    def __init__(self):
+        self.last_seen = None
+        # region id -> [time of entry, hangout reported]
+        self.regions = {}
+
+
+class RegionMatchEngine(object):
+    """In-process implementation of the RegionMatch operator used by :py:meth:`~streamsx.geospatial.region_match`.
+
+    Stores geographical regions (geofences) and matches device observations against them.
+    Regions are added or removed with tuples of schema :py:const:`~streamsx.geospatial.schema.RegionMatchSchema.Regions`,
+    device observations have the schema :py:const:`~streamsx.geospatial.schema.RegionMatchSchema.Devices`.
+    Each observation returns a list of events of schema :py:const:`~streamsx.geospatial.schema.RegionMatchSchema.Events`
+    if the device enters, leaves or is hanging out in a region.
+
+    The bounding boxes of the regions are stored in a uniform grid, so a lookup only tests the polygons registered for the grid cell of the device.
+    The polygons are compiled once from their WKT and kept in a :py:class:`PolygonCache`. Polygons with at least ``raster_threshold``
+    vertices of the cache (default 256) are prepared with a raster and a slab index of their edges, so that their tests do not scan all edges.
+
+    With `skip_unchanged` the engine remembers the location, the small cell (1/16 of the index cell size) and the matched regions of
+    each device's last observation. If a device reports the same location again, the matched regions are reused. If it is observed
+    again in the same cell and no region boundary crosses the cell, the regions containing the cell are taken from a cache of classified
+    cells. In both cases no polygon is tested, dwell times, HANGOUT events and timeouts are handled as for every other observation.
+    This pays off for devices reporting the same position repeatedly, like parked vehicles.
+
+    With `cell_map` every region is rasterized into cells of the index cell size down to 1/128 of it, the finest resolution at which its bounding box
+    spans at most 16 x 16 cells. Each cell is labeled as inside the region, outside or crossed by its boundary. A lookup lets the regions whose
+    cells contain the location match without a polygon test, only the regions crossing the cell of the location are tested.
+    The cells are updated when a region is added or removed. This pays off for many small regions, like urban geofences.
+    Devices located in regions with a timeout are expired in event time: a timing wheel driven by the latest observation time drops
+    the state of a device once it was not observed for the timeout of its regions, without scanning the states of all devices.
+    The regions, their compiled polygons and the device states can be saved with :py:meth:`snapshot` and loaded without parsing WKT with :py:meth:`restore`.
+    Engines in several processes can share one copy of the regions: a writer publishes the regions, their compiled polygons and the grid index
+    as region store file with :py:meth:`publish`, the other engines map it read-only with :py:meth:`attach` and pick up new versions with :py:meth:`refresh`.
+
+    Example::
+
+        from streamsx.geospatial.local import RegionMatchEngine
+        engine = RegionMatchEngine()
+        engine.process_region({'id': 'r1', 'polygonAsWKT': 'POLYGON((13.41 52.53,13.46 52.53,13.46 52.51,13.41 52.51,13.41 52.53))', 'removeRegion': False, 'notifyOnEntry': True, 'notifyOnExit': True, 'notifyOnHangout': False, 'minimumDwellTime': 0, 'timeout': 0})
+        events = engine.process({'id': 'd1', 'latitude': 52.52, 'longitude': 13.43, 'timeStamp': 1577836800.0})
+
+    .. versionadded:: 1.2
+
+    Args:
+        cell_size(float): Size of the cells of the spatial index in degrees.
+        polygon_cache(PolygonCache): Cache for the compiled polygons, by default a cache with default settings is created.
+        event_type_attribute(str): Name of the event attribute that receives the event type (ENTER, EXIT, HANGOUT).
+        region_name_attribute(str): Name of the event attribute that receives the region id.
+        id_attribute(str): Name of the device attribute that holds the unique identifier of the device.
+        latitude_attribute(str): Name of the device attribute that holds the latitude.
+        longitude_attribute(str): Name of the device attribute that holds the longitude.
+        timestamp_attribute(str): Name of the device attribute that holds the timestamp. Values can be SPL timestamps, datetimes or seconds since epoch.
+        skip_unchanged(bool): Skip the polygon tests for devices observed again in a cell not crossed by a region boundary.
+        cell_map(bool): Match locations with the cells of the rasterized regions, so that only regions whose boundary crosses the cell of a location are tested.
+    """
+
+    def __init__(self, cell_size=0.05, polygon_cache=None, event_type_attribute='matchEventType', region_name_attribute='regionName', id_attribute='id', latitude_attribute='latitude', longitude_attribute='longitude', timestamp_attribute='timeStamp', skip_unchanged=False, cell_map=False):
+        self.event_type_attribute = event_type_attribute
+        self.region_name_attribute = region_name_attribute
+        self.id_attribute = id_attribute
+        self.latitude_attribute = latitude_attribute
+        self.longitude_attribute = longitude_attribute
+        self.timestamp_attribute = timestamp_attribute
+        self.skip_unchanged = bool(skip_unchanged)
+        self.cell_map = bool(cell_map)
+        self._index = _GridIndex(cell_size)
+        self._cell_map = _CellMap(cell_size) if self.cell_map else None
+        self._subcell_scale = _SUBDIVISIONS / self._index.cell_size
+        # device id -> (latitude, longitude, cell, region ids) of the last observation,
+        # cell -> (bounds, region ids) or None if a region boundary crosses the cell
+        self._last_matches = {}
+        self._classified = {}
+        self._skipped = 0
+        self._cell_matches = 0
+        self._cache = polygon_cache if polygon_cache is not None else PolygonCache()
+        self._regions = {}
+        self._store = None
+        self._devices = {}
+        self._packed = None
+        self._observations = 0
+        self._polygon_tests = 0
+        self._batch_cells = 0
+        self._batch_candidates = 0
+        self._event_counts = {ENTER: 0, EXIT: 0, HANGOUT: 0}
+        # latest observation time and timers of the devices located in regions with a timeout
+        self._clock = None
+        self._timers = _TimingWheel(_TIMER_RESOLUTION)
+        self._timeouts = 0
+
+    @property
+    def region_count(self):
+        """int: Number of regions stored in the engine."""
+        return len(self._regions)
+
+    @property
+    def device_count(self):
+        """int: Number of devices with state, i.e. devices currently located in at least one region and not timed out."""
+        return len(self._devices)
+
+    @property
+    def stats(self):
+        """dict: Counters of the work done by the engine since it was created.
+
+        * nObservations - Device observations processed.
+        * nCellsVisited - Grid cells looked up, including the cells of the cell map.
+        * nCandidates - Regions registered in the looked up cells.
+        * nPolygonTests - Point in polygon tests after the bounding box test of the candidates.
+        * nSkippedMatches - Observations matched from a classified cell with `skip_unchanged`.
+        * nCellMapMatches - Regions matched without a polygon test as their cell map cell is inside the region.
+        * nEnterEvents, nExitEvents, nHangoutEvents - Events emitted by type.
+        * nRegions - Regions stored.
+        * nTimeouts - Locations of devices in regions dropped after the timeout of the region.
+        * nTrackedDevices - Devices with state.
+        """
+        index = self._index
+        cell_map = self._cell_map
+        return {
+            'nObservations': self._observations,
+            'nCellsVisited': index.cells_visited + self._batch_cells + (cell_map.cells_visited if cell_map is not None else 0),
+            'nCandidates': index.keys_examined + self._batch_candidates,
+            'nPolygonTests': self._polygon_tests,
+            'nSkippedMatches': self._skipped,
+            'nCellMapMatches': self._cell_matches,
+            'nEnterEvents': self._event_counts[ENTER],
+            'nExitEvents': self._event_counts[EXIT],
+            'nHangoutEvents': self._event_counts[HANGOUT],
+            'nTimeouts': self._timeouts,
+            'nRegions': len(self._regions),
+            'nTrackedDevices': len(self._devices),
+        }
+
+    def process_region(self, region):
+        """Adds or removes a region, like a tuple on the region port of the operator.
+
+        Args:
+            region(dict): Region of schema :py:const:`~streamsx.geospatial.schema.RegionMatchSchema.Regions`. If ``removeRegion`` is ``True`` the region is removed, otherwise it is added or replaced.
+        """
+        if region.get('removeRegion', False):
+            self.remove_region(region['id'])
+        else:
+            self.add_region(region)
+
+    def add_region(self, region):
+        """Adds a region or replaces the region with the same id.
+
+        Args:
+            region(dict): Region of schema :py:const:`~streamsx.geospatial.schema.RegionMatchSchema.Regions`.
+        """
+        self._check_writable()
+        polygon = self._cache.get(region['id'], region['polygonAsWKT'])
+        r = _Region(region, polygon)
+        self._regions[r.id] = r
+        self._index.insert(r.id, r.bbox)
+        if self._cell_map is not None:
+            self._cell_map.insert(r.id, polygon)
+        self._packed = None
+        self._last_matches.clear()
+        self._classified.clear()
+
+    def load_regions(self, regions):
+        """Adds or removes many regions at once, with the same result as calling :py:meth:`process_region` for each region in order.
+
+        The polygons of all added regions are parsed and compiled in one pass and the batch matching structures are rebuilt once,
+        which is much faster than adding the regions one by one.
+
+        Example, loading the regions of a GeoJSON file::
+
+            from streamsx.geospatial.local import RegionMatchEngine, read_regions
+            engine = RegionMatchEngine()
+            engine.load_regions(read_regions('regions.geojson'))
+
+        Args:
+            regions: Iterable of regions of schema :py:const:`~streamsx.geospatial.schema.RegionMatchSchema.Regions`.
+
+        Returns:
+            int: Number of regions stored in the engine.
+        """
+        self._check_writable()
+        # id -> region added last, removals of stored regions are applied immediately
+        added = {}
+        for region in regions:
+            if region.get('removeRegion', False):
+                added.pop(region['id'], None)
+                self.remove_region(region['id'])
+            else:
+                added.pop(region['id'], None)
+                added[region['id']] = region
+        cache = self._cache
+        todo = []
+        for region in added.values():
+            polygon = cache.lookup(region['id'])
+            if polygon is None or polygon.wkt != region['polygonAsWKT']:
+                todo.append(region)
+        compiled = dict(zip((r['id'] for r in todo), compile_polygons([r['polygonAsWKT'] for r in todo], cache.raster_threshold)))
+        for rid, polygon in compiled.items():
+            cache.put(rid, polygon)
+        for rid, region in added.items():
+            polygon = compiled.get(rid)
+            if polygon is None:
+                polygon = cache.get(rid, region['polygonAsWKT'])
+            r = _Region(region, polygon)
+            self._regions[rid] = r
+            self._index.insert(rid, r.bbox)
+            if self._cell_map is not None:
+                self._cell_map.insert(rid, polygon)
+        self._packed = None
+        self._last_matches.clear()
+        self._classified.clear()
+        return len(self._regions)
+
+    def remove_region(self, region_id):
+        """Removes a region. Devices located in the region do not get an EXIT event.
+
+        Args:
+            region_id(str): The id of the region.
+
+        Returns:
+            bool: ``True`` if the region was stored in the engine.
+        """
+        self._check_writable()
+        self._cache.discard(region_id)
+        if self._regions.pop(region_id, None) is None:
+            return False
+        self._index.remove(region_id)
+        if self._cell_map is not None:
+            self._cell_map.remove(region_id)
+        self._packed = None
+        self._last_matches.clear()
+        self._classified.clear()
+        return True
+
+    def snapshot(self, path):
+        """Writes the regions with their compiled polygons and the state of the devices to a snapshot file.
+
+        The snapshot is a binary file that :py:meth:`restore` maps into memory, so that an engine with many regions
+        is ready without parsing the WKT of the regions again. The file is replaced atomically.
+        The counters of :py:attr:`stats` are not saved.
+
+        Args:
+            path(str): Path of the snapshot file.
+        """
+        ids, arrays = self._region_arrays()
+        position = dict((rid, i) for i, rid in enumerate(ids))
+        devices = list(self._devices)
+        entries = [(d, position[rid], entry[0], entry[1]) for d, device_id in enumerate(devices)
+                   for rid, entry in self._devices[device_id].regions.items() if rid in position]
+        meta = {
+            'cell_size': self._index.cell_size,
+            'settings': self._settings(),
+        }
+        # ids are packed into arrays, so the header stays small with many devices
+        arrays['region_ids'], arrays['region_id_offsets'] = pack_strings(ids)
+        arrays['device_ids'], arrays['device_id_offsets'] = pack_strings(devices)
+        arrays.update({
+            'last_seen': np.array([self._devices[device_id].last_seen for device_id in devices], dtype=np.float64),
+            'entry_device': np.array([e[0] for e in entries], dtype=np.int64),
+            'entry_region': np.array([e[1] for e in entries], dtype=np.int64),
+            'entry_time': np.array([e[2] for e in entries], dtype=np.float64),
+            'entry_hangout': np.array([e[3] for e in entries], dtype=np.uint8),
+        })
+        write_snapshot(path, 'RegionMatchEngine', meta, arrays)
+
+    def publish(self, path):
+        """Publishes the regions with their compiled polygons and the grid index as region store file for engines attached with :py:meth:`attach`.
+
+        The region store is a snapshot of the regions without device states, laid out in flat arrays with offsets, so that
+        the engines of many processes can map it into memory read-only and share one copy of the polygons and the index.
+        The file is replaced atomically: engines attached to the previous version keep using it until they :py:meth:`refresh`.
+        Only one process should publish to a path. On Linux, a path on a memory file system such as ``/dev/shm`` keeps the store in shared memory.
+
+        Example, one writer process and any number of worker processes::
+
+            writer.load_regions(regions)
+            writer.publish('/dev/shm/regions.store')
+
+            worker = RegionMatchEngine.attach('/dev/shm/regions.store')
+            ...
+            worker.refresh()
+
+        Args:
+            path(str): Path of the region store file.
+        """
+        ids, arrays = self._region_arrays()
+        write_region_store(path, {'cell_size': self._index.cell_size, 'settings': self._settings()}, ids, arrays, self._index)
+
+    def _settings(self):
+        return dict((name, getattr(self, name)) for name in _SETTINGS)
+
+    def _region_arrays(self):
+        """Returns the region ids and the arrays of the regions and their compiled polygons, with the regions in the order of the ids."""
+        regions = self._regions
+        ids = list(regions)
+        polygons = [self._polygon(rid) for rid in ids]
+        wkt, wkt_offsets = pack_strings([p.wkt for p in polygons])
+        edge_offsets = np.zeros(len(ids) + 1, dtype=np.int64)
+        np.cumsum([p.vertex_count for p in polygons], out=edge_offsets[1:])
+        rasters = [p.raster.ravel() if p.raster is not None else np.zeros(0, dtype=np.uint8) for p in polygons]
+        raster_offsets = np.zeros(len(ids) + 1, dtype=np.int64)
+        np.cumsum([len(r) for r in rasters], out=raster_offsets[1:])
+        arrays = {
+            'wkt': wkt,
+            'wkt_offsets': wkt_offsets,
+            'flags': np.array([(r.notify_entry, r.notify_exit, r.notify_hangout) for r in (regions[rid] for rid in ids)], dtype=np.uint8).reshape(-1, 3),
+            'dwell': np.array([regions[rid].dwell for rid in ids], dtype=np.float64),
+            'timeout': np.array([regions[rid].timeout for rid in ids], dtype=np.float64),
+            'bbox': np.array([p.bbox for p in polygons], dtype=np.float64).reshape(-1, 4),
+            'edges': np.concatenate([p.edges for p in polygons], axis=1) if polygons else np.zeros((5, 0), dtype=np.float64),
+            'edge_offsets': edge_offsets,
+            'raster': np.concatenate(rasters) if rasters else np.zeros(0, dtype=np.uint8),
+            'raster_offsets': raster_offsets,
+        }
+        return ids, arrays
+
+    @classmethod
+    def restore(cls, path, polygon_cache=None, mmap=True):
+        """Creates an engine from a snapshot written by :py:meth:`snapshot`.
+
+        The cell size and the attribute names are taken from the snapshot. The edges and rasters of the compiled polygons
+        are used directly from the memory mapped file.
+
+        Args:
+            path(str): Path of the snapshot file.
+            polygon_cache(PolygonCache): Cache the restored polygons are added to, by default a cache with default settings is created.
+            mmap(bool): Map the snapshot into memory, otherwise it is read at once.
+
+        Returns:
+            RegionMatchEngine: The engine with the regions and device states of the snapshot.
+        """
+        meta, arrays = read_snapshot(path, 'RegionMatchEngine', mmap)
+        engine = cls(cell_size=meta['cell_size'], polygon_cache=polygon_cache, **meta['settings'])
+        ids = unpack_strings(arrays['region_ids'], arrays['region_id_offsets'])
+        wkts = unpack_strings(arrays['wkt'], arrays['wkt_offsets'])
+        flags = arrays['flags'].tolist()
+        dwell = arrays['dwell'].tolist()
+        timeout = arrays['timeout'].tolist()
+        bboxes = arrays['bbox'].tolist()
+        edges = arrays['edges']
+        edge_offsets = arrays['edge_offsets'].tolist()
+        raster = arrays['raster']
+        raster_offsets = arrays['raster_offsets'].tolist()
+        for i, rid in enumerate(ids):
+            size = raster_offsets[i + 1] - raster_offsets[i]
+            n = int(round(size ** 0.5))
+            polygon_edges = edges[:, edge_offsets[i]:edge_offsets[i + 1]]
+            polygon_raster = raster[raster_offsets[i]:raster_offsets[i + 1]].reshape(n, n) if size else None
+            if not mmap:
+                # a read snapshot is one buffer, the copies let evicted polygons release their memory
+                polygon_edges = polygon_edges.copy()
+                polygon_raster = polygon_raster.copy() if size else None
+            polygon = CompiledPolygon._from_arrays(wkts[i], tuple(bboxes[i]), polygon_edges, polygon_raster)
+            engine._cache.put(rid, polygon)
+            region = _Region({'id': rid, 'polygonAsWKT': wkts[i], 'notifyOnEntry': flags[i][0], 'notifyOnExit': flags[i][1],
+                              'notifyOnHangout': flags[i][2], 'minimumDwellTime': dwell[i], 'timeout': timeout[i]}, polygon)
+            engine._regions[rid] = region
+            engine._index.insert(rid, region.bbox)
+            if engine._cell_map is not None:
+                engine._cell_map.insert(rid, polygon)
+
+        devices = unpack_strings(arrays['device_ids'], arrays['device_id_offsets'])
+        states = []
+        for device_id, last_seen in zip(devices, arrays['last_seen'].tolist()):
+            state = _DeviceState()
+            state.last_seen = last_seen
+            engine._devices[device_id] = state
+            states.append(state)
+        for d, r, entered, hangout in zip(arrays['entry_device'].tolist(), arrays['entry_region'].tolist(),
+                                          arrays['entry_time'].tolist(), arrays['entry_hangout'].tolist()):
+            states[d].regions[ids[r]] = [entered, bool(hangout)]
+        for device_id, state in zip(devices, states):
+            engine._schedule(device_id, state)
+        return engine
+
+    @classmethod
+    def attach(cls, path, polygon_cache=None):
+        """Creates an engine matching against the regions of a region store written by :py:meth:`publish`.
+
+        The store is mapped into memory read-only: the grid index is searched in the mapped arrays and the polygons are created
+        from the mapped edges on first use, so the memory of the engine does not grow with the number of regions.
+        The regions of an attached engine cannot be changed, they are replaced by the next published version with :py:meth:`refresh`.
+        The cell size and the attribute names are taken from the store, the device states are kept by each engine.
+        Attached engines do not use a cell map.
+
+        Args:
+            path(str): Path of the region store file.
+            polygon_cache(PolygonCache): Cache for the polygons created from the store, by default a cache with default settings is created.
+
+        Returns:
+            RegionMatchEngine: The attached engine.
+        """
+        store = _RegionStore(path, polygon_cache if polygon_cache is not None else PolygonCache())
+        settings = dict(store.settings)
+        settings['cell_map'] = False
+        engine = cls(cell_size=store.cell_size, polygon_cache=store.cache, **settings)
+        engine._attach(store)
+        return engine
+
+    def refresh(self):
+        """Attaches the engine to the latest version of its region store, if a new version was published since it was attached.
+
+        Devices located in regions that are no longer stored do not get an EXIT event, like with :py:meth:`remove_region`.
+
+        Returns:
+            bool: ``True`` if a new version was attached.
+        """
+        if self._store is None:
+            raise ValueError('The engine is not attached to a region store')
+        if not self._store.replaced():
+            return False
+        self._cache.clear()
+        self._attach(_RegionStore(self._store.path, self._cache))
+        return True
+
+    def _attach(self, store):
+        if self._store is not None:
+            # counters of the index continue over the versions
+            store.cells_visited = self._store.cells_visited
+            store.keys_examined = self._store.keys_examined
+        self._store = store
+        self._regions = store
+        self._index = store
+        self._packed = None
+        self._last_matches.clear()
+        self._classified.clear()
+
+    def _check_writable(self):
+        if self._store is not None:
+            raise ValueError('The regions of an attached engine are changed by publishing a new version of the region store: ' + self._store.path)
+
+    def _polygon(self, region_id):
+        """Returns the compiled polygon of a stored region."""
+        if self._store is not None:
+            return self._store.polygon(region_id)
+        return self._cache.get(region_id, self._regions[region_id].wkt)
+
+    def match(self, latitude, longitude):
+        """Returns the ids of all regions containing a location.
+
+        Args:
+            latitude(float): Latitude in degrees.
+            longitude(float): Longitude in degrees.
+
+        Returns:
+            list: Region ids.
+        """
+        if self._cell_map is not None:
+            return self._match_cells(latitude, longitude)
+        polygon = self._polygon
+        candidates = self._index.query_point(longitude, latitude)
+        self._polygon_tests += len(candidates)
+        return [rid for rid in candidates if polygon(rid).contains(longitude, latitude)]
+
+    def _match_cells(self, latitude, longitude):
+        regions = self._regions
+        inside, boundary = self._cell_map.query_point(longitude, latitude)
+        self._cell_matches += len(inside)
+        for rid in boundary:
+            b = regions[rid].bbox
+            if b[0] <= longitude <= b[2] and b[1] <= latitude <= b[3]:
+                self._polygon_tests += 1
+                if self._polygon(rid).contains(longitude, latitude):
+                    inside.append(rid)
+        if len(inside) > 1:
+            # same order as the regions returned by the index
+            cs = self._index.cell_size
+            order = dict((rid, i) for i, rid in enumerate(self._index.query_cell(int(math.floor(longitude / cs)), int(math.floor(latitude / cs)))))
+            inside.sort(key=order.get)
+        return inside
+
+    def _match_unchanged(self, device_id, latitude, longitude):
+        last_matches = self._last_matches
+        last = last_matches.get(device_id)
+        if last is not None and last[0] == latitude and last[1] == longitude:
+            self._skipped += 1
+            return last[3]
+        scale = self._subcell_scale
+        cell = (int(math.floor(longitude * scale)), int(math.floor(latitude * scale)))
+        inside = None
+        if last is not None and last[2] == cell:
+            # the classification of a cell is only looked up when the device stays in its cell
+            classified = self._classified
+            if cell in classified:
+                entry = classified[cell]
+            else:
+                if len(classified) >= _MAX_CLASSIFIED_CELLS:
+                    classified.clear()
+                entry = classified[cell] = self._classify(cell)
+            # rounding may put a location on the border next to the cell
+            if entry is not None and entry[0][0] <= longitude <= entry[0][2] and entry[0][1] <= latitude <= entry[0][3]:
+                self._skipped += 1
+                inside = entry[1]
+        if inside is None:
+            inside = self.match(latitude, longitude)
+        if last is None and len(last_matches) >= _MAX_LAST_MATCHES:
+            last_matches.clear()
+        last_matches[device_id] = (latitude, longitude, cell, inside)
+        return inside
+
+    def _classify(self, cell):
+        """Returns the bounds of a cell and the ids of the regions containing it, ``None`` if the boundary of a region crosses the cell."""
+        size = 1.0 / self._subcell_scale
+        x0, y0 = cell[0] * size, cell[1] * size
+        x1, y1 = x0 + size, y0 + size
+        inside = []
+        for rid in self._index.query_box((x0, y0, x1, y1)):
+            polygon = self._polygon(rid)
+            e = polygon.edges
+            # edges crossing the latitude range of the cell, horizontal edges in the range count as crossing the cell
+            lo = np.maximum(e[_YLO], y0)
+            hi = np.minimum(e[_YHI], y1)
+            spans = lo <= hi
+            xa = e[_X0] + (lo - e[_Y0]) * e[_SLOPE]
+            xb = e[_X0] + (hi - e[_Y0]) * e[_SLOPE]
+            crossing = spans & ((e[_YLO] == e[_YHI]) | ((np.minimum(xa, xb) <= x1) & (np.maximum(xa, xb) >= x0)))
+            if crossing.any():
+                return None
+            if polygon.contains((x0 + x1) / 2.0, (y0 + y1) / 2.0):
+                inside.append(rid)
+        if len(inside) > 1:
+            # same order as the regions returned by match
+            cs = self._index.cell_size
+            order = dict((rid, i) for i, rid in enumerate(self._index.query_cell(int(math.floor((x0 + x1) / 2.0 / cs)), int(math.floor((y0 + y1) / 2.0 / cs)))))
+            inside.sort(key=order.get)
+        return (x0, y0, x1, y1), inside
+
+    def process(self, device):
+        """Matches a device observation against the regions.
+
+        Args:
+            device(dict): Observation of schema :py:const:`~streamsx.geospatial.schema.RegionMatchSchema.Devices`.
+
+        Returns:
+            list: Events of schema :py:const:`~streamsx.geospatial.schema.RegionMatchSchema.Events`, empty if nothing happened.
+        """
+        self._observations += 1
+        if self.skip_unchanged:
+            inside = self._match_unchanged(device[self.id_attribute], device[self.latitude_attribute], device[self.longitude_attribute])
+        else:
+            inside = self.match(device[self.latitude_attribute], device[self.longitude_attribute])
+        changes = self._update(device[self.id_attribute], _to_seconds(device[self.timestamp_attribute]), inside)
+        return [self._event(device, event_type, rid) for event_type, rid in changes]
+
+    def stream(self, devices, batch_size=None, batch_timeout=None, queue_size=1024, executor=None):
+        """Matches the device observations of an async iterable, returns an async generator of the events.
+
+        Without batching the next observation is read when the events of the previous one are consumed, so a slow consumer
+        slows down the producer. With `batch_size` or `batch_timeout` the observations are read into a queue of at most
+        `queue_size` observations and matched in micro-batches with :py:meth:`region_match_batch`; a batch ends when it holds
+        `batch_size` observations or `batch_timeout` seconds after its first observation arrived.
+        Requires Python 3.6 or later.
+
+        Example::
+
+            async def handle(device_source):
+                async for event in engine.stream(device_source, batch_size=500, batch_timeout=0.01):
+                    await publish(event)
+
+        Args:
+            devices: Async iterable or iterable of observations of schema :py:const:`~streamsx.geospatial.schema.RegionMatchSchema.Devices`.
+            batch_size(int): Maximum number of observations per batch.
+            batch_timeout(float): Maximum time in seconds a batch waits for more observations. With `batch_size` only, a batch waits until it is full.
+            queue_size(int): Maximum number of observations read ahead when batching.
+            executor(concurrent.futures.Executor): Executor the observations are matched in, so the event loop is not blocked. If not set, they are matched in the event loop.
+
+        Returns:
+            Async generator of the events of schema :py:const:`~streamsx.geospatial.schema.RegionMatchSchema.Events`, in the order of the observations.
+        """
+        # the async code is not imported on Python versions without async generators
+        from streamsx.geospatial.local._async import stream
+        return stream(self._process_many, devices, batch_size, batch_timeout, queue_size, executor)
+
+    def _process_many(self, devices):
+        """Processes a list of device observations, returns the events of all observations."""
+        if self.skip_unchanged or len(devices) < _BATCH_MIN:
+            return [event for device in devices for event in self.process(device)]
+        lats = np.fromiter((d[self.latitude_attribute] for d in devices), dtype=np.float64, count=len(devices))
+        lons = np.fromiter((d[self.longitude_attribute] for d in devices), dtype=np.float64, count=len(devices))
+        seconds = np.fromiter((_to_seconds(d[self.timestamp_attribute]) for d in devices), dtype=np.float64, count=len(devices))
+        ids = np.empty(len(devices), dtype=object)
+        ids[:] = [d[self.id_attribute] for d in devices]
+        rows, types, names = self._process_batch(lats, lons, ids, seconds)
+        return [self._event(devices[row], event_type, rid) for row, event_type, rid in zip(rows.tolist(), types, names)]
+
+    def region_match_batch(self, lats, lons, ids, timestamps):
+        """Matches a micro-batch of device observations against the regions.
+
+        The observations are processed in array order with the same semantics as :py:meth:`process`,
+        but the containment tests run vectorized over all observations of the batch located in the bounding box of a region.
+
+        Args:
+            lats: Array of latitudes.
+            lons: Array of longitudes.
+            ids: Array of device ids.
+            timestamps: Array of timestamps, given as ``datetime64`` or as seconds since epoch.
+
+        Returns:
+            dict: Event arrays keyed by the attribute names of :py:const:`~streamsx.geospatial.schema.RegionMatchSchema.Events`. All arrays have one element per event, events are ordered by observation.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        ids = np.asarray(ids)
+        timestamps = np.asarray(timestamps)
+        rows, types, names = self._process_batch(lats, lons, ids, _to_seconds_array(timestamps))
+        return {
+            self.id_attribute: ids[rows],
+            self.latitude_attribute: lats[rows],
+            self.longitude_attribute: lons[rows],
+            self.timestamp_attribute: timestamps[rows],
+            self.event_type_attribute: np.asarray(types, dtype=object),
+            self.region_name_attribute: np.asarray(names, dtype=object),
+        }
+
+    def _process_batch(self, lats, lons, ids, seconds):
+        """Applies a batch of observations, returns the observation index, event type and region id of all events."""
+        matched = self._match_batch(lons, lats)
+        devices = self._devices
+        update = self._update
+        seconds = seconds.tolist()
+        rows = []
+        types = []
+        names = []
+        for i, device_id in enumerate(ids.tolist()):
+            inside = matched.get(i)
+            if inside is None:
+                if device_id not in devices:
+                    # the observation is not applied but advances the clock, like with process
+                    if self._clock is None or seconds[i] > self._clock:
+                        self._advance(seconds[i])
+                    continue
+                inside = ()
+            for event_type, rid in update(device_id, seconds[i], inside):
+                rows.append(i)
+                types.append(event_type)
+                names.append(rid)
+        return np.asarray(rows, dtype=np.intp), types, names
+
+    def _match_batch(self, x, y):
+        # returns observation index -> list of region ids containing the observation
+        if self._packed is None:
+            self._packed = _PackedRegions._from_store(self._store) if self._store is not None else _PackedRegions(self._regions, self._index, self._cache)
+        packed = self._packed
+        points, regions = packed.candidates(x, y)
+        self._observations += len(x)
+        self._batch_cells += len(x)
+        self._batch_candidates += packed.examined
+        self._polygon_tests += len(points)
+        inside = packed.contains(points, regions, x, y)
+        matched = {}
+        ids = packed.ids
+        for i, r in zip(points[inside].tolist(), regions[inside].tolist()):
+            rids = matched.get(i)
+            if rids is None:
+                matched[i] = [ids[r]]
+            else:
+                rids.append(ids[r])
+        return matched
+
+    def _update(self, device_id, now, inside):
+        """Applies an observation of a device located in the regions `inside`, returns a list of ``(event type, region id)``."""
+        if self._clock is None or now > self._clock:
+            self._advance(now)
+        state = self._devices.get(device_id)
+        if state is None:
+            if not inside:
+                return []
+            state = _DeviceState()
+            self._devices[device_id] = state
+        changes = []
+        regions = self._regions
+        current = state.regions
+        for rid in list(current):
+            region = regions.get(rid)
+            if region is None:
+                # removed region, no event
+                del current[rid]
+            elif region.timeout > 0 and now - state.last_seen > region.timeout:
+                # stale device of an observation older than the latest one, no event
+                del current[rid]
+                self._timeouts += 1
+            elif rid not in inside:
+                del current[rid]
+                if region.notify_exit:
+                    changes.append((EXIT, rid))
+                    self._event_counts[EXIT] += 1
+        timeout = 0
+        for rid in inside:
+            entry = current.get(rid)
+            region = regions[rid]
+            if region.timeout > 0 and (not timeout or region.timeout < timeout):
+                timeout = region.timeout
+            if entry is None:
+                current[rid] = [now, False]
+                if region.notify_entry:
+                    changes.append((ENTER, rid))
+                    self._event_counts[ENTER] += 1
+            elif region.notify_hangout and not entry[1] and now - entry[0] >= region.dwell:
+                entry[1] = True
+                changes.append((HANGOUT, rid))
+                self._event_counts[HANGOUT] += 1
+        if current:
+            state.last_seen = now
+            if timeout:
+                self._timers.schedule(device_id, now + timeout)
+        else:
+            del self._devices[device_id]
+        return changes
+
+    def _advance(self, now):
+        """Advances the clock to the observation time `now` and drops the locations of the devices that timed out."""
+        self._clock = now
+        devices = self._devices
+        regions = self._regions
+        for device_id in self._timers.advance(now):
+            state = devices.get(device_id)
+            if state is None:
+                continue
+            current = state.regions
+            for rid in list(current):
+                region = regions.get(rid)
+                if region is None:
+                    del current[rid]
+                elif region.timeout > 0 and now - state.last_seen > region.timeout:
+                    del current[rid]
+                    self._timeouts += 1
+            if current:
+                self._schedule(device_id, state)
+            else:
+                del devices[device_id]
+
+    def _schedule(self, device_id, state):
+        """Schedules the timer of a device for the earliest timeout of its regions."""
+        regions = self._regions
+        timeouts = [region.timeout for region in (regions.get(rid) for rid in state.regions) if region is not None and region.timeout > 0]
+        if timeouts:
+            self._timers.schedule(device_id, state.last_seen + min(timeouts))
+
+    def _event(self, device, event_type, region_id):
+        event = dict(device)
+        event[self.event_type_attribute] = event_type
+        event[self.region_name_attribute] = region_id
+        return event
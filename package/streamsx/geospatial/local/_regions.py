@@ -0,0 +1,83 @@
+# coding=utf-8
+# Licensed Materials - Property of IBM
+# Copyright IBM Corp. 2020
+
+import csv
+import json
+
+from streamsx.geospatial.local._snapshot import _MAGIC, snapshot_regions
+
+_REGION_BOOLS = ('removeRegion', 'notifyOnEntry', 'notifyOnExit', 'notifyOnHangout')
+_REGION_INTS = ('minimumDwellTime', 'timeout')
+
+
+def _region(row):
+    """Converts the text values of a region read from CSV, other values are kept."""
+    row = dict(row)
+    for name in _REGION_BOOLS:
+        if isinstance(row.get(name), str):
+            row[name] = row[name].strip().lower() in ('true', '1', 'yes')
+    for name in _REGION_INTS:
+        if isinstance(row.get(name), str):
+            row[name] = int(row[name] or 0)
+    return row
+
+
+def _ring(coordinates):
+    return '(' + ','.join('%r %r' % (float(c[0]), float(c[1])) for c in coordinates) + ')'
+
+
+def _wkt(geometry):
+    """Converts a GeoJSON Polygon or MultiPolygon geometry to WKT."""
+    kind = geometry.get('type')
+    if kind == 'Polygon':
+        return 'POLYGON(' + ','.join(_ring(ring) for ring in geometry['coordinates']) + ')'
+    if kind == 'MultiPolygon':
+        return 'MULTIPOLYGON(' + ','.join('(' + ','.join(_ring(ring) for ring in polygon) + ')' for polygon in geometry['coordinates']) + ')'
+    raise ValueError('Unsupported GeoJSON geometry, Polygon or MultiPolygon expected: ' + str(kind))
+
+
+def _geojson_regions(document):
+    features = document['features'] if document.get('type') == 'FeatureCollection' else [document]
+    for feature in features:
+        properties = dict(feature.get('properties') or {})
+        region = {'id': properties.pop('id', feature.get('id')), 'polygonAsWKT': _wkt(feature['geometry']), 'removeRegion': False,
+                  'notifyOnEntry': True, 'notifyOnExit': True, 'notifyOnHangout': True, 'minimumDwellTime': 0, 'timeout': 0}
+        if region['id'] is None:
+            raise ValueError('GeoJSON feature without id')
+        for name in region:
+            if name in properties:
+                region[name] = properties[name]
+        yield region
+
+
+def read_regions(path):
+    """Reads regions from a file, as tuples of schema :py:const:`~streamsx.geospatial.schema.RegionMatchSchema.Regions`.
+
+    The format is detected from the file:
+
+    * Snapshots written by :py:meth:`RegionMatchEngine.snapshot`.
+    * GeoJSON files (``.json`` or ``.geojson``) with a FeatureCollection or a single Feature of Polygon or MultiPolygon geometries.
+      The region id is the ``id`` property or the id of the feature, the other region attributes can be given as properties.
+    * CSV files with a header line naming the attributes of the region schema, at least ``id`` and ``polygonAsWKT``.
+
+    Args:
+        path(str): Path of the file.
+
+    Returns:
+        iterator: The region dicts, in file order.
+    """
+    with open(path, 'rb') as f:
+        magic = f.read(len(_MAGIC))
+    if magic == _MAGIC:
+        return snapshot_regions(path)
+    if path.endswith('.json') or path.endswith('.geojson'):
+        with open(path) as f:
+            return _geojson_regions(json.load(f))
+    return _csv_regions(path)
+
+
+def _csv_regions(path):
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            yield _region(row)
@@ -0,0 +1,220 @@
+# coding=utf-8
+# Licensed Materials - Property of IBM
+# Copyright IBM Corp. 2020
+
+import csv
+import datetime
+import json
+import re
+import time
+
+from streamsx.geospatial.local._encounter import FlightPathEncounterEngine
+from streamsx.geospatial.local._regionmatch import RegionMatchEngine, _to_seconds
+from streamsx.geospatial.local._regions import _region, read_regions
+from streamsx.geospatial.local._sharded import ShardedRegionMatchEngine
+from streamsx.geospatial.local._tiled import TiledFlightPathEncounterEngine
+
+_OBSERVATION3D_FLOATS = ('latitude', 'longitude', 'altitude', 'azimuth', 'groundSpeed', 'altitudeChangeRate')
+
+# date and time, fraction of the second and UTC offset of an ISO 8601 time
+_ISO_TIME = re.compile(r'(\d{4}-\d\d-\d\d)[T ](\d\d:\d\d:\d\d)(?:[.,](\d+))?(Z|[+-]\d\d:?\d\d)?$')
+
+# number of observations matched per batch by a ShardedRegionMatchEngine
+_SHARDED_BATCH = 1024
+
+
+def _parse_time(value):
+    """Parses a time given as number or as ISO 8601 string, returns a number or a datetime."""
+    if not isinstance(value, str):
+        return value
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    match = _ISO_TIME.match(value.strip())
+    if match is None:
+        raise ValueError('Invalid time: ' + value)
+    date, time_, fraction, zone = match.groups()
+    result = datetime.datetime.strptime(date + 'T' + time_, '%Y-%m-%dT%H:%M:%S')
+    if fraction:
+        result = result.replace(microsecond=int(fraction[:6].ljust(6, '0')))
+    if zone:
+        # strptime of Python 3.6 and earlier does not parse Z and offsets with colon
+        minutes = 0 if zone == 'Z' else int(zone[1:3]) * 60 + int(zone[-2:])
+        offset = datetime.timedelta(minutes=-minutes if zone[0] == '-' else minutes)
+        result = result.replace(tzinfo=datetime.timezone(offset))
+    return result
+
+
+def _read(source):
+    """Yields the rows of a CSV or Parquet file as dicts, other sources are iterated as they are."""
+    if not isinstance(source, str):
+        for row in source:
+            yield row
+        return
+    if source.endswith('.parquet') or source.endswith('.parq'):
+        try:
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError('Reading Parquet files requires the pyarrow package')
+        for batch in pyarrow.parquet.ParquetFile(source).iter_batches():
+            columns = batch.to_pydict()
+            names = list(columns)
+            for values in zip(*[columns[name] for name in names]):
+                yield dict(zip(names, values))
+        return
+    with open(source, newline='') as f:
+        for row in csv.DictReader(f):
+            yield row
+
+
+def _device(row, attributes):
+    # attributes is the engine holding the attribute names
+    row = dict(row)
+    for name in (attributes.latitude_attribute, attributes.longitude_attribute):
+        row[name] = float(row[name])
+    row[attributes.timestamp_attribute] = _parse_time(row[attributes.timestamp_attribute])
+    return row
+
+
+def _observation(row):
+    row = dict(row)
+    for name in _OBSERVATION3D_FLOATS:
+        row[name] = float(row[name])
+    observed = _parse_time(row['observationTime'])
+    if isinstance(observed, datetime.datetime):
+        observed = _to_seconds(observed) * 1000.0
+    row['observationTime'] = int(observed)
+    return row
+
+
+def _flatten(event, prefix=''):
+    result = {}
+    for name, value in event.items():
+        if isinstance(value, dict):
+            result.update(_flatten(value, prefix + name + '.'))
+        else:
+            result[prefix + name] = value
+    return result
+
+
+def _match(process, observations, writer):
+    """Matches a list of observations with `process`, writes the events and returns their number."""
+    if not observations:
+        return 0
+    result = process(observations)
+    if writer is not None:
+        for event in result:
+            writer.write(event)
+    return len(result)
+
+
+class _EventWriter(object):
+    """Writes events as JSON lines, or as CSV with nested tuples flattened to dotted column names if the file name ends with .csv."""
+
+    def __init__(self, path):
+        self._csv = path.endswith('.csv')
+        self._file = open(path, 'w', newline='' if self._csv else None)
+        self._writer = None
+
+    def write(self, event):
+        if not self._csv:
+            self._file.write(json.dumps(event, default=str) + '\n')
+            return
+        row = _flatten(event)
+        if self._writer is None:
+            self._writer = csv.DictWriter(self._file, fieldnames=list(row), extrasaction='ignore')
+            self._writer.writeheader()
+        self._writer.writerow(row)
+
+    def close(self):
+        self._file.close()
+
+
+def replay(source, engine, output=None, speedup=None, regions=None):
+    """Replays recorded observations through a local engine in event time.
+
+    The observations are read from a CSV or Parquet file and processed in file order. With `speedup` the replay is paced
+    by the event time of the observations: an observation recorded `t` seconds after the first one is processed `t / speedup`
+    seconds after the start. Without `speedup` the observations are processed as fast as possible.
+
+    For a :py:class:`RegionMatchEngine` or :py:class:`ShardedRegionMatchEngine` the rows are device observations of schema :py:const:`~streamsx.geospatial.schema.RegionMatchSchema.Devices`
+    with the attribute names configured in the engine, timestamps are given as seconds since epoch or as ISO 8601 strings.
+    A :py:class:`ShardedRegionMatchEngine` matches the observations in batches like :py:meth:`~ShardedRegionMatchEngine.region_match_batch`.
+    For a :py:class:`FlightPathEncounterEngine` or :py:class:`TiledFlightPathEncounterEngine` the rows have the fields of :py:const:`~streamsx.geospatial.schema.FlighPathEncounterSchema.Observation3D`,
+    observation times are given as milliseconds since epoch or as ISO 8601 strings.
+
+    Example, replaying a day of recorded traffic at 1000 times the recorded speed::
+
+        from streamsx.geospatial.local import FlightPathEncounterEngine, replay
+        engine = FlightPathEncounterEngine(north_latitude=55, south_latitude=47, west_longitude=5, east_longitude=15, num_latitude_divs=40, num_longitude_divs=40, search_radius=5000, altitude_search_radius=300, time_search_interval=120000)
+        summary = replay('adsb-2020-01-01.parquet', engine, output='encounters.jsonl', speedup=1000)
+
+    Reading Parquet files requires the ``pyarrow`` package.
+
+    .. versionadded:: 1.2
+
+    Args:
+        source: Path of a CSV file with header line or of a Parquet file (``.parquet``), or an iterable of observation dicts.
+        engine: The region match or encounter engine processing the observations.
+        output(str): Path of the file the events are written to, as CSV if it ends with ``.csv`` and as JSON lines otherwise. Events are not written if not set.
+        speedup(float): Factor the replay runs faster than the recorded event time, ``None`` for an unthrottled replay.
+        regions: Regions of schema :py:const:`~streamsx.geospatial.schema.RegionMatchSchema.Regions` loaded into a region match engine before the observations, as path of a file read with :py:func:`read_regions` or as iterable.
+
+    Returns:
+        dict: Summary with the number of ``observations`` and ``events`` and the wall clock ``seconds`` of the replay.
+    """
+    if isinstance(engine, (RegionMatchEngine, ShardedRegionMatchEngine)):
+        attributes = engine._template if isinstance(engine, ShardedRegionMatchEngine) else engine
+        convert = lambda row: _device(row, attributes)
+        event_time = lambda observation: _to_seconds(observation[attributes.timestamp_attribute])
+    elif isinstance(engine, (FlightPathEncounterEngine, TiledFlightPathEncounterEngine)):
+        convert = _observation
+        event_time = lambda observation: observation['observationTime'] / 1000.0
+    else:
+        raise TypeError('Unsupported engine: ' + type(engine).__name__)
+    if speedup is not None and speedup <= 0:
+        raise ValueError('speedup must be greater than zero')
+    if regions is not None:
+        if not isinstance(engine, (RegionMatchEngine, ShardedRegionMatchEngine)):
+            raise ValueError('regions can only be replayed to a RegionMatchEngine')
+        engine.load_regions(read_regions(regions) if isinstance(regions, str) else (_region(region) for region in regions))
+
+    if isinstance(engine, ShardedRegionMatchEngine):
+        # one round trip to the shards per batch instead of per observation
+        batch_size = _SHARDED_BATCH
+        process = engine._process_many
+    else:
+        batch_size = 1
+        process = lambda observations: engine.process(observations[0])
+
+    writer = _EventWriter(output) if output is not None else None
+    observations = 0
+    events = 0
+    pending = []
+    start = time.monotonic()
+    first = None
+    try:
+        for row in _read(source):
+            observation = convert(row)
+            if speedup is not None:
+                now = event_time(observation)
+                if first is None:
+                    first = now
+                if (now - first) / speedup > time.monotonic() - start:
+                    # the observations due before the pause are matched first
+                    events += _match(process, pending, writer)
+                    pending = []
+                    delay = (now - first) / speedup - (time.monotonic() - start)
+                    if delay > 0:
+                        time.sleep(delay)
+            pending.append(observation)
+            observations += 1
+            if len(pending) >= batch_size:
+                events += _match(process, pending, writer)
+                pending = []
+        events += _match(process, pending, writer)
+    finally:
+        if writer is not None:
+            writer.close()
+    return {'observations': observations, 'events': events, 'seconds': time.monotonic() - start}
@@ -0,0 +1,293 @@
+# coding=utf-8
+# Licensed Materials - Property of IBM
+# Copyright IBM Corp. 2020
+
+import multiprocessing
+import os
+import zlib
+
+import numpy as np
+
+from streamsx.geospatial.local._regionmatch import RegionMatchEngine, _to_seconds, _to_seconds_array
+
+# commands sent to the shard processes
+_REGIONS = 'regions'
+_BATCH = 'batch'
+_PROCESS = 'process'
+_DEVICE_COUNT = 'device_count'
+_STATS = 'stats'
+_REFRESH = 'refresh'
+
+
+def _shard_of(device_id, width):
+    # crc32 is stable across processes, unlike hash() of strings
+    return zlib.crc32(str(device_id).encode('utf-8')) % width
+
+
+def _serve(connection, engine_args, region_store=None):
+    """Main loop of a shard process, owns one :py:class:`RegionMatchEngine` with the state of the devices of the shard."""
+    engine = RegionMatchEngine.attach(region_store) if region_store is not None else RegionMatchEngine(**engine_args)
+    error = None
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+        command, args = message
+        if command == _REGIONS:
+            # region updates are not answered, a failure is reported with the next reply
+            try:
+                engine.load_regions(args)
+            except Exception as e:
+                error = error or e
+            continue
+        if command == _REFRESH:
+            try:
+                engine.refresh()
+            except Exception as e:
+                error = error or e
+            continue
+        if error is not None:
+            connection.send((False, error))
+            error = None
+            continue
+        try:
+            if command == _BATCH:
+                result = engine._process_batch(*args)
+            elif command == _PROCESS:
+                result = engine.process(args)
+            elif command == _DEVICE_COUNT:
+                result = engine.device_count
+            elif command == _STATS:
+                result = engine.stats
+            else:
+                raise ValueError('Unknown command: ' + str(command))
+        except Exception as e:
+            connection.send((False, e))
+        else:
+            connection.send((True, result))
+    connection.close()
+
+
+class ShardedRegionMatchEngine(object):
+    """Region matching on several processes with the device state sharded by device id.
+
+    Local equivalent of :py:meth:`~streamsx.geospatial.region_match` with `parallel_width`.
+    Each of the `width` shard processes owns a :py:class:`RegionMatchEngine`. The regions are broadcast to all shards,
+    a device observation is routed to the shard selected by a CRC-32 hash of the device id.
+    Since the dwell state of a device is kept per id, the events are the same as with a single engine.
+
+    Region updates are buffered and sent to the shards with the next observations.
+    With `region_store` the shards do not keep their own copy of the regions: the regions are compiled once in this process and
+    published to the region store file with :py:meth:`RegionMatchEngine.publish`, the shards attach to it read-only and switch
+    to the new version with the next observations after an update.
+    The engine must be closed to stop the shard processes, preferably by using it as context manager::
+
+        from streamsx.geospatial.local import ShardedRegionMatchEngine
+        with ShardedRegionMatchEngine(width=4) as engine:
+            for region in regions:
+                engine.process_region(region)
+            events = engine.region_match_batch(lats, lons, ids, timestamps)
+
+    .. versionadded:: 1.2
+
+    Args:
+        width(int): Number of shard processes, defaults to the number of CPUs.
+        mp_context(str): Start method of the processes (``'fork'``, ``'spawn'``, ``'forkserver'``), defaults to the platform default.
+        region_store(str): Path of a region store file shared by the shards, for example on ``/dev/shm``. The file is created or replaced.
+        **engine_args: Keyword arguments of :py:class:`RegionMatchEngine` for the engines of the shards. A `polygon_cache` is not shared between the shards.
+    """
+
+    def __init__(self, width=None, mp_context=None, region_store=None, **engine_args):
+        self.width = width if width is not None else (os.cpu_count() or 1)
+        if self.width < 1:
+            raise ValueError('width must be at least 1: ' + str(self.width))
+        # attribute names as used by the engines of the shards
+        self._template = RegionMatchEngine(**dict((k, v) for k, v in engine_args.items() if k.endswith('_attribute')))
+        # the engine in this process holding the regions published to the region store
+        self._writer = None
+        self.region_store = region_store
+        if region_store is not None:
+            self._writer = RegionMatchEngine(**dict((k, v) for k, v in engine_args.items() if k != 'polygon_cache'))
+            self._writer.publish(region_store)
+        context = multiprocessing.get_context(mp_context)
+        self._processes = []
+        self._connections = []
+        for _ in range(self.width):
+            parent, child = context.Pipe()
+            process = context.Process(target=_serve, args=(child, engine_args, region_store), daemon=True)
+            process.start()
+            child.close()
+            self._processes.append(process)
+            self._connections.append(parent)
+        self._region_ids = set()
+        self._pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Stops the shard processes."""
+        for connection in self._connections:
+            try:
+                connection.send(None)
+                connection.close()
+            except (OSError, EOFError):
+                pass
+        for process in self._processes:
+            process.join()
+        self._connections = []
+        self._processes = []
+
+    @property
+    def region_count(self):
+        """int: Number of regions stored in the engine."""
+        return len(self._region_ids)
+
+    @property
+    def device_count(self):
+        """int: Number of devices with state over all shards."""
+        self._flush()
+        for connection in self._connections:
+            connection.send((_DEVICE_COUNT, None))
+        return sum([self._receive(connection) for connection in self._connections])
+
+    @property
+    def stats(self):
+        """dict: Counters of :py:attr:`RegionMatchEngine.stats` summed over the shards."""
+        self._flush()
+        for connection in self._connections:
+            connection.send((_STATS, None))
+        result = {}
+        for shard in [self._receive(connection) for connection in self._connections]:
+            for name, value in shard.items():
+                result[name] = result.get(name, 0) + value
+        # every shard stores all regions
+        result['nRegions'] = self.region_count
+        return result
+
+    def process_region(self, region):
+        """Adds or removes a region on all shards, see :py:meth:`RegionMatchEngine.process_region`."""
+        if region.get('removeRegion', False):
+            self.remove_region(region['id'])
+        else:
+            self.add_region(region)
+
+    def load_regions(self, regions):
+        """Adds or removes many regions at once on all shards, see :py:meth:`RegionMatchEngine.load_regions`.
+
+        Returns:
+            int: Number of regions stored in the engine.
+        """
+        for region in regions:
+            self.process_region(region)
+        return self.region_count
+
+    def add_region(self, region):
+        """Adds a region or replaces the region with the same id on all shards, see :py:meth:`RegionMatchEngine.add_region`."""
+        self._region_ids.add(region['id'])
+        self._pending.append(region)
+
+    def remove_region(self, region_id):
+        """Removes a region from all shards, see :py:meth:`RegionMatchEngine.remove_region`.
+
+        Returns:
+            bool: ``True`` if the region was stored in the engine.
+        """
+        if region_id not in self._region_ids:
+            return False
+        self._region_ids.discard(region_id)
+        self._pending.append({'id': region_id, 'removeRegion': True})
+        return True
+
+    def process(self, device):
+        """Matches a device observation on the shard of the device, see :py:meth:`RegionMatchEngine.process`.
+
+        Each call is a round trip to a shard process, use :py:meth:`region_match_batch` for throughput.
+        """
+        self._flush()
+        connection = self._connections[_shard_of(device[self._template.id_attribute], self.width)]
+        connection.send((_PROCESS, device))
+        return self._receive(connection)
+
+    def region_match_batch(self, lats, lons, ids, timestamps):
+        """Matches a micro-batch of device observations, the shards process their part of the batch in parallel.
+
+        Same arguments and result as :py:meth:`RegionMatchEngine.region_match_batch`, the events are ordered by observation.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        ids = np.asarray(ids)
+        timestamps = np.asarray(timestamps)
+        rows, types, names = self._process_batch(lats, lons, ids, _to_seconds_array(timestamps))
+        t = self._template
+        return {
+            t.id_attribute: ids[rows],
+            t.latitude_attribute: lats[rows],
+            t.longitude_attribute: lons[rows],
+            t.timestamp_attribute: timestamps[rows],
+            t.event_type_attribute: np.asarray(types, dtype=object),
+            t.region_name_attribute: np.asarray(names, dtype=object),
+        }
+
+    def _process_many(self, devices):
+        """Processes a list of device observations as one batch, returns the events of all observations."""
+        t = self._template
+        lats = np.fromiter((d[t.latitude_attribute] for d in devices), dtype=np.float64, count=len(devices))
+        lons = np.fromiter((d[t.longitude_attribute] for d in devices), dtype=np.float64, count=len(devices))
+        seconds = np.fromiter((_to_seconds(d[t.timestamp_attribute]) for d in devices), dtype=np.float64, count=len(devices))
+        ids = np.empty(len(devices), dtype=object)
+        ids[:] = [d[t.id_attribute] for d in devices]
+        rows, types, names = self._process_batch(lats, lons, ids, seconds)
+        return [t._event(devices[row], event_type, rid) for row, event_type, rid in zip(rows.tolist(), types, names)]
+
+    def _process_batch(self, lats, lons, ids, seconds):
+        """Applies a batch of observations on the shards, returns the observation index, event type and region id of all events."""
+        width = self.width
+        shards = np.fromiter((_shard_of(i, width) for i in ids.tolist()), dtype=np.int64, count=len(ids))
+        self._flush()
+        sent = []
+        for shard in range(width):
+            members = np.flatnonzero(shards == shard)
+            if len(members):
+                self._connections[shard].send((_BATCH, (lats[members], lons[members], ids[members], seconds[members])))
+                sent.append((shard, members))
+        rows = [np.zeros(0, dtype=np.intp)]
+        types = []
+        names = []
+        # read all replies before raising a failure, so that no reply is left in a pipe
+        replies = [(members, self._connections[shard].recv()) for shard, members in sent]
+        for members, (ok, result) in replies:
+            if not ok:
+                raise result
+        for members, (ok, (shard_rows, shard_types, shard_names)) in replies:
+            rows.append(members[shard_rows])
+            types.extend(shard_types)
+            names.extend(shard_names)
+        rows = np.concatenate(rows)
+        # all events of an observation come from the same shard, a stable sort keeps their order
+        order = np.argsort(rows, kind='stable')
+        return rows[order], [types[i] for i in order.tolist()], [names[i] for i in order.tolist()]
+
+    def _flush(self):
+        if not self._connections:
+            raise ValueError('The engine is closed.')
+        if self._pending:
+            pending = self._pending
+            self._pending = []
+            if self._writer is not None:
+                self._writer.load_regions(pending)
+                self._writer.publish(self.region_store)
+                message = (_REFRESH, None)
+            else:
+                message = (_REGIONS, pending)
+            for connection in self._connections:
+                connection.send(message)
+
+    def _receive(self, connection):
+        ok, result = connection.recv()
+        if not ok:
+            raise result
+        return result
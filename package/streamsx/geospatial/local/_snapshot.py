@@ -0,0 +1,104 @@
+# coding=utf-8
+# Licensed Materials - Property of IBM
+# Copyright IBM Corp. 2020
+
+import json
+import os
+import struct
+
+import numpy as np
+
+# file layout: magic, length of the JSON header, header, arrays aligned to _ALIGNMENT bytes
+_MAGIC = b'STXGEO\x00\x01'
+_ALIGNMENT = 64
+
+
+def _aligned(offset):
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def write_snapshot(path, kind, meta, arrays):
+    """Writes a snapshot file, the file is replaced atomically.
+
+    Args:
+        path(str): Path of the snapshot file.
+        kind(str): Type of the snapshot, checked by :py:func:`read_snapshot`.
+        meta(dict): JSON serializable settings and small values.
+        arrays(dict): Name to NumPy array, stored in native byte order so that they can be mapped into memory when read.
+    """
+    arrays = dict((name, np.ascontiguousarray(array)) for name, array in arrays.items())
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset = _aligned(offset + array.nbytes)
+    header = json.dumps({'kind': kind, 'meta': meta, 'arrays': layout}).encode('utf-8')
+    start = _aligned(len(_MAGIC) + 8 + len(header))
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(_MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(start + layout[name]['offset'])
+            array.tofile(f)
+        f.truncate(start + offset)
+    os.replace(tmp, path)
+
+
+def read_snapshot(path, kind, mmap=True):
+    """Reads a snapshot file written by :py:func:`write_snapshot`.
+
+    Args:
+        path(str): Path of the snapshot file.
+        kind(str): Expected type of the snapshot.
+        mmap(bool): Map the file into memory, the arrays are read-only views of the mapping. Otherwise the file is read at once.
+
+    Returns:
+        tuple: The meta dict and the dict of arrays.
+    """
+    with open(path, 'rb') as f:
+        magic = f.read(len(_MAGIC))
+        if magic != _MAGIC:
+            raise ValueError('Not a geospatial snapshot: ' + path)
+        size = struct.unpack('<Q', f.read(8))[0]
+        header = json.loads(f.read(size).decode('utf-8'))
+        if header['kind'] != kind:
+            raise ValueError('Snapshot of ' + header['kind'] + ' found, ' + kind + ' expected: ' + path)
+        # the data is read from the open file, so that it belongs to the header even if the file is replaced meanwhile;
+        # the arrays are plain views of the mapping, slices of memmap objects are much slower to create
+        f.seek(0)
+        data = np.memmap(f, dtype=np.uint8, mode='r').view(np.ndarray) if mmap else np.fromfile(f, dtype=np.uint8)
+    start = _aligned(len(_MAGIC) + 8 + size)
+    arrays = {}
+    for name, layout in header['arrays'].items():
+        dtype = np.dtype(layout['dtype'])
+        count = int(np.prod(layout['shape'], dtype=np.int64))
+        first = start + layout['offset']
+        arrays[name] = data[first:first + count * dtype.itemsize].view(dtype).reshape(layout['shape'])
+    return header['meta'], arrays
+
+
+def pack_strings(strings):
+    """Returns the UTF-8 encoded strings as byte array and array of the start offsets, with the end offset appended."""
+    encoded = [s.encode('utf-8') for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def unpack_strings(data, offsets):
+    """Inverse of :py:func:`pack_strings`."""
+    blob = data.tobytes()
+    bounds = offsets.tolist()
+    return [blob[a:b].decode('utf-8') for a, b in zip(bounds[:-1], bounds[1:])]
+
+
+def snapshot_regions(path):
+    """Yields the regions stored in a snapshot of a :py:class:`RegionMatchEngine` as tuples of schema :py:const:`~streamsx.geospatial.schema.RegionMatchSchema.Regions`."""
+    arrays = read_snapshot(path, 'RegionMatchEngine')[1]
+    wkts = unpack_strings(arrays['wkt'], arrays['wkt_offsets'])
+    flags = arrays['flags'].tolist()
+    for rid, wkt, (entry, exit_, hangout), dwell, timeout in zip(unpack_strings(arrays['region_ids'], arrays['region_id_offsets']), wkts, flags, arrays['dwell'].tolist(), arrays['timeout'].tolist()):
+        yield {'id': rid, 'polygonAsWKT': wkt, 'removeRegion': False, 'notifyOnEntry': bool(entry), 'notifyOnExit': bool(exit_),
+               'notifyOnHangout': bool(hangout), 'minimumDwellTime': int(dwell), 'timeout': int(timeout)}
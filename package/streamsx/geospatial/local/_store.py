@@ -0,0 +1,234 @@
+# coding=utf-8
+# Licensed Materials - Property of IBM
+# Copyright IBM Corp. 2020
+
+import math
+import os
+
+import numpy as np
+
+from streamsx.geospatial.local._packed import _pack_index
+from streamsx.geospatial.local._polygon import CompiledPolygon
+from streamsx.geospatial.local._snapshot import pack_strings, read_snapshot, write_snapshot
+
+KIND = 'RegionStore'
+
+# bound for the number of region objects kept by an attached engine, they are dropped when it is exceeded
+_MAX_REGIONS = 1 << 16
+
+
+def _version(path):
+    # a published file replaces the previous version, so a new version has a new inode
+    s = os.stat(path)
+    return (s.st_ino, s.st_mtime_ns if hasattr(s, 'st_mtime_ns') else s.st_mtime, s.st_size)
+
+
+def write_region_store(path, meta, ids, arrays, index):
+    """Writes the region arrays of a :py:class:`RegionMatchEngine` snapshot together with the grid index as region store file.
+
+    Args:
+        path(str): Path of the region store file, the file is replaced atomically.
+        meta(dict): Cell size and settings of the engine.
+        ids(list): Ids of the regions in the order of the arrays.
+        arrays(dict): Region arrays of the snapshot.
+        index(_GridIndex): Grid index of the regions.
+    """
+    position = dict((rid, i) for i, rid in enumerate(ids))
+    arrays = dict(arrays)
+    arrays['ids'], arrays['id_offsets'] = pack_strings(ids)
+    # sorted ids with the position of the region for the lookup by id
+    keys = np.array([rid.encode('utf-8') for rid in ids], dtype=np.bytes_) if ids else np.zeros(0, dtype='S1')
+    order = np.argsort(keys, kind='stable')
+    arrays['id_keys'] = keys[order]
+    arrays['id_positions'] = order.astype(np.int64)
+    arrays['cell_keys'], arrays['cell_start'], arrays['cell_regions'], arrays['large'] = _pack_index(index, position)
+    write_snapshot(path, KIND, meta, arrays)
+
+
+class _Strings(object):
+    """Read-only sequence of the strings packed with :py:func:`pack_strings`, decoded on access."""
+
+    def __init__(self, data, offsets):
+        self._data = data
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        return self._data[self._offsets[i]:self._offsets[i + 1]].tobytes().decode('utf-8')
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class _StoredRegion(object):
+    """Region of a region store with the attributes of a region of :py:class:`RegionMatchEngine`, the WKT is decoded on access."""
+
+    __slots__ = ('id', 'bbox', 'notify_entry', 'notify_exit', 'notify_hangout', 'dwell', 'timeout', '_store', '_position')
+
+    def __init__(self, store, position):
+        self.id = store.ids[position]
+        self.bbox = tuple(store.bbox[position].tolist())
+        self.notify_entry, self.notify_exit, self.notify_hangout = [bool(flag) for flag in store.flags[position].tolist()]
+        self.dwell = float(store.dwell[position])
+        self.timeout = float(store.timeout[position])
+        self._store = store
+        self._position = position
+
+    @property
+    def wkt(self):
+        return self._store.wkts[self._position]
+
+
+class _RegionStore(object):
+    """Regions, compiled polygons and grid index of a region store file, mapped into memory read-only.
+
+    All arrays are views of the mapping, so the processes attached to the same file share one copy in the page cache.
+    The store is used by an attached :py:class:`RegionMatchEngine` both as the mapping of region ids to regions and
+    as grid index: the cells are stored in CSR form and looked up by binary search, the regions are found by id in the sorted ids.
+    Compiled polygons are created from the mapped edges on first use and kept in the `polygon_cache` of the engine.
+    """
+
+    def __init__(self, path, polygon_cache):
+        self.path = path
+        self.version = _version(path)
+        meta, arrays = read_snapshot(path, KIND)
+        self.cell_size = meta['cell_size']
+        self.settings = meta['settings']
+        self.cache = polygon_cache
+        self.ids = _Strings(arrays['ids'], arrays['id_offsets'])
+        self.wkts = _Strings(arrays['wkt'], arrays['wkt_offsets'])
+        self.flags = arrays['flags']
+        self.dwell = arrays['dwell']
+        self.timeout = arrays['timeout']
+        self.bbox = arrays['bbox']
+        self.edges = arrays['edges']
+        self.edge_offsets = arrays['edge_offsets']
+        self.raster = arrays['raster']
+        self.raster_offsets = arrays['raster_offsets']
+        self.rastered = np.diff(self.raster_offsets) > 0
+        self.cell_keys = arrays['cell_keys']
+        self.cell_start = arrays['cell_start']
+        self.cell_regions = arrays['cell_regions']
+        self.large = arrays['large']
+        self._id_keys = arrays['id_keys']
+        self._id_positions = arrays['id_positions']
+        self._large = self.large.tolist()
+        self._regions = {}
+        # number of cells and of keys looked at by point queries, like _GridIndex
+        self.cells_visited = 0
+        self.keys_examined = 0
+
+    def replaced(self):
+        """Returns ``True`` if a new version of the store was published since the store was mapped."""
+        try:
+            return _version(self.path) != self.version
+        except OSError:
+            return False
+
+    def position(self, region_id):
+        """Returns the position of a region in the arrays, ``None`` if the store does not hold the region."""
+        key = region_id.encode('utf-8') if hasattr(region_id, 'encode') else None
+        keys = self._id_keys
+        if key is None or not len(keys):
+            return None
+        i = int(np.searchsorted(keys, key))
+        if i < len(keys) and keys[i] == key:
+            return int(self._id_positions[i])
+        return None
+
+    # read-only mapping of region ids to regions
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __contains__(self, region_id):
+        return self.get(region_id) is not None
+
+    def __getitem__(self, region_id):
+        region = self.get(region_id)
+        if region is None:
+            raise KeyError(region_id)
+        return region
+
+    def get(self, region_id, default=None):
+        region = self._regions.get(region_id)
+        if region is not None:
+            return region
+        position = self.position(region_id)
+        if position is None:
+            return default
+        if len(self._regions) >= _MAX_REGIONS:
+            self._regions.clear()
+        region = self._regions[region_id] = _StoredRegion(self, position)
+        return region
+
+    def polygon(self, region_id):
+        """Returns the compiled polygon of a region."""
+        polygon = self.cache.lookup(region_id)
+        if polygon is not None:
+            return polygon
+        return self.polygon_at(self.position(region_id))
+
+    def polygon_at(self, position):
+        """Returns the compiled polygon of the region at `position`."""
+        region_id = self.ids[position]
+        polygon = self.cache.lookup(region_id)
+        if polygon is not None:
+            return polygon
+        r0, r1 = self.raster_offsets[position:position + 2].tolist()
+        e0, e1 = self.edge_offsets[position:position + 2].tolist()
+        n = int(round((r1 - r0) ** 0.5))
+        polygon = CompiledPolygon._from_arrays(self.wkts[position], tuple(self.bbox[position].tolist()), self.edges[:, e0:e1],
+                                               self.raster[r0:r1].reshape(n, n) if r1 > r0 else None)
+        self.cache.put(region_id, polygon)
+        return polygon
+
+    # grid index
+
+    def _cell(self, cx, cy):
+        # positions of the regions in the cell in the order of the index they were published from
+        keys = self.cell_keys
+        key = cx * (1 << 32) + cy
+        slot = int(np.searchsorted(keys, key))
+        if slot < len(keys) and keys[slot] == key:
+            return self.cell_regions[self.cell_start[slot]:self.cell_start[slot + 1]].tolist()
+        return []
+
+    def query_cell(self, cx, cy):
+        """Returns the ids of the regions whose bounding box may overlap the cell in column `cx` and row `cy`."""
+        ids = self.ids
+        return [ids[i] for i in self._cell(cx, cy) + self._large]
+
+    def query_point(self, x, y):
+        """Returns the ids of the regions whose bounding box contains the point ``(x, y)``."""
+        cs = self.cell_size
+        positions = self._cell(int(math.floor(x / cs)), int(math.floor(y / cs))) + self._large
+        self.cells_visited += 1
+        self.keys_examined += len(positions)
+        if not positions:
+            return []
+        b = self.bbox[positions]
+        inside = (b[:, 0] <= x) & (x <= b[:, 2]) & (b[:, 1] <= y) & (y <= b[:, 3])
+        ids = self.ids
+        return [ids[positions[i]] for i in np.flatnonzero(inside).tolist()]
+
+    def query_box(self, bbox):
+        """Returns the ids of the regions whose bounding box overlaps the box ``(xmin, ymin, xmax, ymax)``."""
+        cs = self.cell_size
+        positions = set(self._large)
+        for cx in range(int(math.floor(bbox[0] / cs)), int(math.floor(bbox[2] / cs)) + 1):
+            for cy in range(int(math.floor(bbox[1] / cs)), int(math.floor(bbox[3] / cs)) + 1):
+                positions.update(self._cell(cx, cy))
+        positions = sorted(positions)
+        if not positions:
+            return []
+        b = self.bbox[positions]
+        overlaps = (b[:, 0] <= bbox[2]) & (bbox[0] <= b[:, 2]) & (b[:, 1] <= bbox[3]) & (bbox[1] <= b[:, 3])
+        ids = self.ids
+        return [ids[positions[i]] for i in np.flatnonzero(overlaps).tolist()]
@@ -0,0 +1,137 @@
+# coding=utf-8
+# Licensed Materials - Property of IBM
+# Copyright IBM Corp. 2020
+
+from streamsx.geospatial._reports import _pack
+from streamsx.geospatial._tiling import _Members, _Tiling
+from streamsx.geospatial.local._encounter import FlightPathEncounterEngine
+
+
+class TiledFlightPathEncounterEngine(object):
+    """Local equivalent of a :py:class:`~streamsx.geospatial.FlightPathEncounter` split into tiles.
+
+    The bounding box is split into `num_latitude_tiles` x `num_longitude_tiles` tiles, each with its own
+    :py:class:`FlightPathEncounterEngine` covering the tile and a halo of `search_radius` plus the distance two objects
+    flying at `max_ground_speed` cover within `time_search_interval`. An observation is stored in all tiles whose
+    halo contains it, encounters are searched in its home tile only, so the events are the same as with a single engine
+    and no encounter is reported twice. The first observation of an object after it left the halo of a tile is still stored in the tile
+    to replace its flight path until it expires, so that no outdated flight path is extrapolated, later observations are not.
+    The `report_interval` and `pack_encounters` settings are applied to the events of all tiles, so a pair is reported
+    once per interval even if its objects have different home tiles.
+
+    .. versionadded:: 1.2
+
+    Args:
+        num_latitude_tiles(int): Number of latitude tiles (rows).
+        num_longitude_tiles(int): Number of longitude tiles (columns).
+        max_ground_speed(float): Upper bound of the ground speed of the objects in meters per second.
+        **engine_args: Arguments of :py:class:`FlightPathEncounterEngine`, the grid divisions are divided among the tiles.
+    """
+
+    def __init__(self, num_latitude_tiles, num_longitude_tiles, max_ground_speed=300.0, **engine_args):
+        template = FlightPathEncounterEngine(**engine_args)
+        self.filter_by_bounding_box = template.filter_by_bounding_box
+        self.observation_attribute = template.observation_attribute
+        self.pack_encounters = template.pack_encounters
+        self._template = template
+        self._reports = template._reports
+        halo = template.search_radius + 2.0 * max_ground_speed * template.time_search_interval / 1000.0
+        self._tiling = _Tiling(template.north_latitude, template.south_latitude, template.west_longitude, template.east_longitude,
+                               num_latitude_tiles, num_longitude_tiles, halo)
+        self.engines = []
+        # the same grid of each tile as the operators of the composite
+        divisions = self._tiling.divisions(template.num_latitude_divs, template.num_longitude_divs)
+        for tile in range(len(self._tiling)):
+            args = dict(engine_args)
+            args['north_latitude'], args['south_latitude'], args['west_longitude'], args['east_longitude'] = self._tiling.bounds(tile)
+            args['num_latitude_divs'], args['num_longitude_divs'] = divisions
+            args['filter_by_bounding_box'] = False
+            for name in ('report_interval', 'report_time_threshold', 'report_distance_threshold', 'pack_encounters'):
+                args.pop(name, None)
+            self.engines.append(FlightPathEncounterEngine(**args))
+        # per tile the objects within its halo, like _TileRouter
+        self._members = [_Members(template.cleanup_interval) for _ in self.engines]
+        self._observations = 0
+
+    @classmethod
+    def from_composite(cls, composite):
+        """Creates an engine with the settings and the tiling of a :py:class:`~streamsx.geospatial.FlightPathEncounter` composite.
+
+        Args:
+            composite(streamsx.geospatial.FlightPathEncounter): The configured composite.
+
+        Returns:
+            TiledFlightPathEncounterEngine: The engine.
+        """
+        engine = FlightPathEncounterEngine.from_composite(composite)
+        return cls(composite.num_latitude_tiles or 1, composite.num_longitude_tiles or 1,
+                   max_ground_speed=composite.max_ground_speed if composite.max_ground_speed is not None else 300.0,
+                   north_latitude=engine.north_latitude, south_latitude=engine.south_latitude, west_longitude=engine.west_longitude, east_longitude=engine.east_longitude,
+                   num_latitude_divs=engine.num_latitude_divs, num_longitude_divs=engine.num_longitude_divs, altitude_search_radius=engine.altitude_search_radius,
+                   search_radius=engine.search_radius, time_search_interval=engine.time_search_interval, cleanup_interval=engine.cleanup_interval,
+                   filter_by_bounding_box=engine.filter_by_bounding_box, index_type=engine.index_type, observation_attribute=engine.observation_attribute,
+                   encounter_attribute=engine.encounter_attribute, encounter_distance_attribute=engine.encounter_distance_attribute,
+                   encounter_time_attribute=engine.encounter_time_attribute, report_interval=engine.report_interval,
+                   report_time_threshold=engine.report_time_threshold, report_distance_threshold=engine.report_distance_threshold,
+                   pack_encounters=engine.pack_encounters)
+
+    @property
+    def tile_count(self):
+        """int: Number of tiles."""
+        return len(self.engines)
+
+    @property
+    def object_count(self):
+        """int: Number of tracked objects."""
+        return len(set().union(*[engine._slots for engine in self.engines]))
+
+    @property
+    def stats(self):
+        """dict: Counters of :py:attr:`FlightPathEncounterEngine.stats` summed over the tiles, observations and objects are counted once."""
+        result = {}
+        for engine in self.engines:
+            for name, value in engine.stats.items():
+                result[name] = result.get(name, 0) + value
+        result['nObservations'] = self._observations
+        if self._reports is not None:
+            result['nEncounters'] -= self._reports.suppressed
+            result['nSuppressedEncounters'] = self._reports.suppressed
+        result['nTrackedObjects'] = self.object_count
+        return result
+
+    def process(self, tuple_):
+        """Processes the observation of a flying object, see :py:meth:`FlightPathEncounterEngine.process`.
+
+        Returns:
+            list: Encounter events found in the home tile of the observation.
+        """
+        observation = self.engines[0]._observation(tuple_)
+        latitude = observation['latitude']
+        longitude = observation['longitude']
+        tiling = self._tiling
+        if self.filter_by_bounding_box and not tiling.contains(latitude, longitude):
+            return []
+        self._observations += 1
+        entity_id = observation['entityId']
+        home = tiling.home(latitude, longitude)
+        now = observation['observationTime']
+        tiles = set(tiling.tiles(latitude, longitude))
+        events = []
+        for tile, members in enumerate(self._members):
+            members.expire(now)
+            if tile in tiles:
+                members.add(entity_id, now)
+            elif entity_id in members:
+                # the tile the object has left gets the observation once to replace the outdated flight path
+                members.discard(entity_id)
+            else:
+                continue
+            found = self.engines[tile]._process(tuple_, tile == home)
+            if tile == home:
+                events = found
+        if self._reports is not None:
+            events = [event for event in events if self._reports(event)]
+        if self.pack_encounters and events:
+            template = self._template
+            return [_pack(events, template.encounter_attribute, template.encounter_distance_attribute, template.encounter_time_attribute)]
+        return events
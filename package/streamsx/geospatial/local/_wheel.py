@@ -0,0 +1,128 @@
+# coding=utf-8
+# Licensed Materials - Property of IBM
+# Copyright IBM Corp. 2020
+
+import math
+
+
+class _TimingWheel(object):
+    """Hierarchical timing wheel of timers keyed on event time.
+
+    Time is divided into ticks of `resolution` seconds. Level ``l`` of the wheel has ``2 ** bits`` slots of ``2 ** (bits * l)`` ticks,
+    a timer is put into the slot of the lowest level whose range holds it and moves down one level each time the slot
+    of its level comes up, timers beyond the range of the top level wait in an overflow list. Advancing the wheel skips
+    the slots of empty levels, so the cost is amortized constant per timer and per tick.
+
+    Each key has at most one live timer: scheduling a key that has an earlier timer keeps the earlier one, a later timer
+    replaces it. Replaced timers stay in their slots and are ignored when they come up.
+    """
+
+    def __init__(self, resolution=1.0, bits=8, levels=4):
+        if resolution <= 0:
+            raise ValueError('The resolution must be positive')
+        self.resolution = float(resolution)
+        self._bits = bits
+        self._mask = (1 << bits) - 1
+        self._wheels = [[[] for _ in range(1 << bits)] for _ in range(levels)]
+        # number of entries per level, replaced timers included
+        self._counts = [0] * levels
+        self._overflow = []
+        # key -> tick of its live timer
+        self._ticks = {}
+        self._tick = None
+
+    def __len__(self):
+        return len(self._ticks)
+
+    def tick(self, when):
+        """Returns the tick of the time `when` in seconds."""
+        return int(math.floor(when / self.resolution))
+
+    def schedule(self, key, when):
+        """Schedules a timer of `key` at time `when`, timers at a time that has passed come up with the next tick."""
+        tick = self.tick(when)
+        if self._tick is not None and tick <= self._tick:
+            tick = self._tick + 1
+        pending = self._ticks.get(key)
+        if pending is not None and pending <= tick:
+            return
+        self._ticks[key] = tick
+        self._insert(key, tick)
+
+    def _insert(self, key, tick):
+        if self._tick is None:
+            self._tick = tick - 1
+        delta = tick - self._tick
+        bits = self._bits
+        for level, wheel in enumerate(self._wheels):
+            if delta < (1 << (bits * (level + 1))):
+                wheel[(tick >> (bits * level)) & self._mask].append((key, tick))
+                self._counts[level] += 1
+                return
+        self._overflow.append((key, tick))
+
+    def advance(self, when):
+        """Advances the wheel to the time `when`, returns the keys whose timers came up in order of their ticks."""
+        target = self.tick(when)
+        if self._tick is None or target <= self._tick:
+            if self._tick is None:
+                self._tick = target
+            return []
+        fired = []
+        bits = self._bits
+        mask = self._mask
+        counts = self._counts
+        wheels = self._wheels
+        ticks = self._ticks
+        while self._tick < target:
+            if not ticks:
+                # no live timers, the remaining entries are replaced timers
+                self._clear()
+                self._tick = target
+                break
+            # the slots of empty levels are skipped up to the end of the revolution of the lowest level with entries
+            span = 1
+            for level in range(len(wheels)):
+                if counts[level]:
+                    break
+                span = 1 << (bits * (level + 1))
+            tick = min(target, (self._tick | (span - 1)) + 1) if span > 1 else self._tick + 1
+            self._tick = tick
+            # timers of the higher levels whose slot comes up move down, the top level takes the overflow
+            for level in range(1, len(wheels)):
+                if tick & ((1 << (bits * level)) - 1):
+                    break
+                self._cascade(level, (tick >> (bits * level)) & mask)
+                if level == len(wheels) - 1 and self._overflow:
+                    overflow = self._overflow
+                    self._overflow = []
+                    for key, due in overflow:
+                        self._insert(key, due)
+            slot = wheels[0][tick & mask]
+            if slot:
+                counts[0] -= len(slot)
+                wheels[0][tick & mask] = []
+                for key, due in slot:
+                    if ticks.get(key) == due:
+                        del ticks[key]
+                        fired.append(key)
+        return fired
+
+    def _cascade(self, level, index):
+        entries = self._wheels[level][index]
+        if not entries:
+            return
+        self._wheels[level][index] = []
+        self._counts[level] -= len(entries)
+        ticks = self._ticks
+        for key, due in entries:
+            if ticks.get(key) == due:
+                self._insert(key, due)
+
+    def _clear(self):
+        for level, wheel in enumerate(self._wheels):
+            if self._counts[level]:
+                for i in range(len(wheel)):
+                    wheel[i] = []
+                self._counts[level] = 0
+        self._overflow = []
@@ -0,0 +1,43 @@
+# coding=utf-8
+# Licensed Materials - Property of IBM
+# Copyright IBM Corp. 2020
+
+import re
+
+_RING = re.compile(r'\(([^()]+)\)')
+
+
+def parse_polygon_wkt(wkt):
+    """Parses a ``POLYGON`` or ``MULTIPOLYGON`` WKT string into its rings.
+
+    Holes and the parts of a multi polygon are returned as plain rings, because
+    the even-odd containment test used by the local engines does not need to
+    distinguish them.
+
+    Args:
+        wkt(str): Geometry as WKT string, coordinates are given as ``longitude latitude``.
+
+    Returns:
+        list: List of rings, each ring is a tuple ``(xs, ys)`` of two lists with the longitudes and latitudes of the vertices.
+    """
+    if wkt is None:
+        raise ValueError('Missing polygon WKT')
+    kind = wkt.lstrip()[:12].upper()
+    if not (kind.startswith('POLYGON') or kind.startswith('MULTIPOLYGON')):
+        raise ValueError('Unsupported geometry, POLYGON or MULTIPOLYGON expected: ' + wkt[:40])
+    rings = []
+    for ring in _RING.findall(wkt):
+        xs = []
+        ys = []
+        for vertex in ring.split(','):
+            coords = vertex.split()
+            if len(coords) < 2:
+                raise ValueError('Invalid vertex in polygon WKT: ' + vertex.strip())
+            xs.append(float(coords[0]))
+            ys.append(float(coords[1]))
+        if len(xs) < 3:
+            raise ValueError('Polygon ring with less than three vertices')
+        rings.append((xs, ys))
+    if not rings:
+        raise ValueError('Empty polygon WKT: ' + wkt[:40])
+    return rings
@@ -3,7 +3,22 @@
 # Copyright IBM Corp. 2019, 2020
 
 
-from streamsx.topology.schema import StreamSchema
+
+class _LazySchema(object):
+    """Class attribute creating the `StreamSchema` on first access, the topology stack is not imported before."""
+
+    def __init__(self, schema):
+        self._schema = schema
+
+    def __get__(self, instance, owner):
+        from streamsx.topology.schema import StreamSchema
+        value = StreamSchema(self._schema)
+        # replaces the descriptor, later lookups get the schema directly
+        for name, attribute in list(vars(owner).items()):
+            if attribute is self:
+                setattr(owner, name, value)
+        return value
+
 #
 # Defines Message types with default attribute names and types.
 _SPL_SCHEMA_EVENTS = 'tuple<rstring id, float64 latitude, float64 longitude, timestamp timeStamp, rstring matchEventType, rstring regionName>'
@@ -12,6 +27,9 @@ _SPL_SCHEMA_REGIONS = 'com.ibm.streams.geospatial::RegionMatchTypes.RegionInfo'
 
 _SPL_SCHEMA_FLIGHTPATH_ENCOUNTER_EVENT = 'com.ibm.streams.geospatial::FlightPathEncounterTypes.EncounterEvent'
 _SPL_SCHEMA_FLIGHTPATH_OBSERVATION3D = 'com.ibm.streams.geospatial::FlightPathEncounterTypes.Observation3D'
+# attributes of FlightPathEncounterTypes.Observation3D, named types cannot be nested in a schema string
+_SPL_TUPLE_OBSERVATION3D = 'tuple<rstring entityId, float64 latitude, float64 longitude, float64 altitude, int64 observationTime, float64 azimuth, float64 groundSpeed, float64 altitudeChangeRate>'
+_SPL_SCHEMA_FLIGHTPATH_ENCOUNTER_LIST = 'tuple<' + _SPL_TUPLE_OBSERVATION3D + ' observation, list<tuple<' + _SPL_TUPLE_OBSERVATION3D + ' encounter, float64 encounterDistance, int64 encounterTime>> encounters>'
 
 class RegionMatchSchema:
     """
@@ -31,7 +49,7 @@ class RegionMatchSchema:
     """
 
 
-    Devices = StreamSchema (_SPL_SCHEMA_DEVICES)
+    Devices = _LazySchema (_SPL_SCHEMA_DEVICES)
     """
     This schema can be used as input for :py:meth:`~streamsx.geospatial.region_match`.
     
@@ -46,7 +64,7 @@ class RegionMatchSchema:
 
     """
 
-    Regions = StreamSchema (_SPL_SCHEMA_REGIONS)
+    Regions = _LazySchema (_SPL_SCHEMA_REGIONS)
     """
     This schema can be used for :py:meth:`~streamsx.geospatial.region_match` to configure a region.
     
@@ -63,7 +81,7 @@ class RegionMatchSchema:
     
     """
 
-    Events = StreamSchema (_SPL_SCHEMA_EVENTS)
+    Events = _LazySchema (_SPL_SCHEMA_EVENTS)
     """
     This schema can be used as output for :py:meth:`~streamsx.geospatial.region_match`.
     
@@ -78,7 +96,7 @@ class RegionMatchSchema:
 
     """
 
-    EncounterEvents = StreamSchema (_SPL_SCHEMA_FLIGHTPATH_ENCOUNTER_EVENT)
+    EncounterEvents = _LazySchema (_SPL_SCHEMA_FLIGHTPATH_ENCOUNTER_EVENT)
     """
     This schema can be used as output for :py:meth:`~streamsx.geospatial.FlightPathEncounter`.
     
@@ -93,7 +111,7 @@ class RegionMatchSchema:
 
     """
 
-    Observation3D = StreamSchema (_SPL_SCHEMA_FLIGHTPATH_OBSERVATION3D)
+    Observation3D = _LazySchema (_SPL_SCHEMA_FLIGHTPATH_OBSERVATION3D)
     """
     This schema can be used as output for :py:meth:`~streamsx.geospatial.FlightPathEncounter`.
     
@@ -119,7 +137,7 @@ class FlighPathEncounterSchema:
     
     """
 
-    EncounterEvents = StreamSchema (_SPL_SCHEMA_FLIGHTPATH_ENCOUNTER_EVENT)
+    EncounterEvents = _LazySchema (_SPL_SCHEMA_FLIGHTPATH_ENCOUNTER_EVENT)
     """
     The :py:meth:`~streamsx.geospatial.FlightPathEncounter` creates encounter events as output.
     An encounter consists of the original observation, the data for the encountered object and the distances in time and space between the colliding objects.
@@ -134,7 +152,7 @@ class FlighPathEncounterSchema:
 
     """
 
-    Observation3D = StreamSchema (_SPL_SCHEMA_FLIGHTPATH_OBSERVATION3D)
+    Observation3D = _LazySchema (_SPL_SCHEMA_FLIGHTPATH_OBSERVATION3D)
     """
     The :py:meth:`~streamsx.geospatial.FlightPathEncounter` processes observations of flying objects.
 
@@ -149,5 +167,17 @@ class FlighPathEncounterSchema:
     * groundSpeed(float64) - The groundSpeed of the object in meters per second. There is a dependency between this value and the timeSearchInterval parameter of the operator. At the given speed the object must not travel more than 20000 kilometers within the given timeSearchInterval. For example with a time search interval of 15 minutes (900000 ms) the object speed must not be faster than 80000 km/h (~22000 m/s). For all practical purposes this should not be a serious limitation. If you need to convert from knots to meters/second multiply the knots by 0.514444.
     * altitudeChangeRate(float64) - The altitudeChangeRate of the object in meters per second. Positive values denote increasing altitude.
 
+    """
+
+    EncounterLists = _LazySchema (_SPL_SCHEMA_FLIGHTPATH_ENCOUNTER_LIST)
+    """
+    The :py:meth:`~streamsx.geospatial.FlightPathEncounter` emits tuples of this schema if its 'pack_interval' is set, one tuple holds all encounters of an observation.
+
+    The schema defines following attributes
+
+    * observation(StreamSchema) - The input observation encounters are calculated for. This is a tuple attribute of type :py:meth:`~streamsx.geospatial.schema.FlighPathEncounterSchema.Observation3D`.
+    * encounters(list) - The encounters of the observation, a list of tuples with the attributes encounter, encounterDistance and encounterTime as defined in :py:meth:`~streamsx.geospatial.schema.FlighPathEncounterSchema.EncounterEvents`.
+
+    .. versionadded:: 1.2
     """
     pass
@@ -10,6 +10,7 @@ import streamsx.rest as sr
 import unittest
 import datetime
 import os
+import tempfile
 import json
 from subprocess import call, Popen, PIPE
 from streamsx.geospatial.schema import RegionMatchSchema, FlighPathEncounterSchema
@@ -75,6 +76,77 @@ class Test(unittest.TestCase):
             self._build_only(name, topo)
 
 
+    def test_region_match_parallel(self):
+        print ('\n---------'+str(self))
+        name = 'test_region_match_parallel'
+        topo = Topology(name)
+        toolkit.add_toolkit(topo, self.geospatial_toolkit_home)
+        self._index_toolkit(_get_test_tk_path())
+        toolkit.add_toolkit(topo, _get_test_tk_path())
+        datagen = op.Invoke(topo, kind='test::GenRegionData', schemas=[RegionMatchSchema.Devices,RegionMatchSchema.Regions])
+        device_stream = datagen.outputs[0]
+        region_stream = datagen.outputs[1]
+        res = geo.region_match(stream=device_stream, region_stream=region_stream, parallel_width=3)
+        res.print()
+
+        if (("TestDistributed" in str(self)) or ("TestStreamingAnalytics" in str(self))):
+            tester = Tester(topo)
+            tester.tuple_count(res, 4, exact=True)
+            tester.test(self.test_ctxtype, self.test_config, always_collect_logs=True)
+        else:
+            # build only
+            self._build_only(name, topo)
+
+
+    def test_region_match_skip_unchanged(self):
+        print ('\n---------'+str(self))
+        name = 'test_region_match_skip_unchanged'
+        topo = Topology(name)
+        toolkit.add_toolkit(topo, self.geospatial_toolkit_home)
+        self._index_toolkit(_get_test_tk_path())
+        toolkit.add_toolkit(topo, _get_test_tk_path())
+        datagen = op.Invoke(topo, kind='test::GenRegionData', schemas=[RegionMatchSchema.Devices,RegionMatchSchema.Regions])
+        device_stream = datagen.outputs[0]
+        region_stream = datagen.outputs[1]
+        res = geo.region_match(stream=device_stream, region_stream=region_stream, skip_unchanged=30)
+        res.print()
+
+        if (("TestDistributed" in str(self)) or ("TestStreamingAnalytics" in str(self))):
+            tester = Tester(topo)
+            tester.tuple_count(res, 4, exact=True)
+            tester.test(self.test_ctxtype, self.test_config, always_collect_logs=True)
+        else:
+            # build only
+            self._build_only(name, topo)
+
+
+    def test_region_match_initial_regions(self):
+        print ('\n---------'+str(self))
+        name = 'test_region_match_initial_regions'
+        topo = Topology(name)
+        toolkit.add_toolkit(topo, self.geospatial_toolkit_home)
+        self._index_toolkit(_get_test_tk_path())
+        toolkit.add_toolkit(topo, _get_test_tk_path())
+        datagen = op.Invoke(topo, kind='test::GenRegionData', schemas=[RegionMatchSchema.Devices,RegionMatchSchema.Regions])
+        device_stream = datagen.outputs[0]
+        region_stream = datagen.outputs[1]
+        from streamsx.geospatial.local import RegionMatchEngine
+        engine = RegionMatchEngine()
+        engine.load_regions([{'id': 'r1', 'polygonAsWKT': 'POLYGON((13.41 52.53,13.46 52.53,13.46 52.51,13.41 52.51,13.41 52.53))', 'notifyOnEntry': True, 'notifyOnExit': True, 'notifyOnHangout': False, 'minimumDwellTime': 0, 'timeout': 0}])
+        snapshot = os.path.join(tempfile.mkdtemp(), 'regions.snapshot')
+        engine.snapshot(snapshot)
+        res = geo.region_match(stream=device_stream, region_stream=region_stream, initial_regions=snapshot)
+        res.print()
+
+        if (("TestDistributed" in str(self)) or ("TestStreamingAnalytics" in str(self))):
+            tester = Tester(topo)
+            tester.tuple_count(res, 4, exact=False)
+            tester.test(self.test_ctxtype, self.test_config, always_collect_logs=True)
+        else:
+            # build only
+            self._build_only(name, topo)
+
+
     def test_flight_path_encounter(self):
         print ('\n---------'+str(self))
         name = 'test_flight_path_encounter'
@@ -101,6 +173,63 @@ class Test(unittest.TestCase):
             self._build_only(name, topo)
 
 
+    def test_flight_path_encounter_tiles(self):
+        print ('\n---------'+str(self))
+        name = 'test_flight_path_encounter_tiles'
+        topo = Topology(name)
+        toolkit.add_toolkit(topo, self.geospatial_toolkit_home)
+        self._index_toolkit(_get_test_tk_path())
+        toolkit.add_toolkit(topo, _get_test_tk_path())
+        
+        datagen = op.Invoke(topo, kind='test::GenFlightPathData', schemas=[FlighPathEncounterSchema.EncounterEvents])
+        planes_stream = datagen.outputs[0]
+        
+        fpe = geo.FlightPathEncounter(north_latitude=52.6,south_latitude=52.4,west_longitude=13.3,east_longitude=13.5,num_latitude_divs=5,num_longitude_divs=5,search_radius=10000,altitude_search_radius=400,time_search_interval=600000)
+        fpe.num_latitude_tiles = 2
+        fpe.num_longitude_tiles = 2
+        events = planes_stream.map(fpe, schema=FlighPathEncounterSchema.EncounterEvents)
+        
+        dump = op.Invoke(topo, inputs=[events], kind='test::DumpData', schemas=CommonSchema.String)
+        res = dump.outputs[0]
+        res.print()
+
+        if (("TestDistributed" in str(self)) or ("TestStreamingAnalytics" in str(self))):
+            tester = Tester(topo)
+            tester.tuple_count(res, 1, exact=True)
+            tester.test(self.test_ctxtype, self.test_config, always_collect_logs=True)
+        else:
+            # build only
+            self._build_only(name, topo)
+
+
+    def test_flight_path_encounter_reports(self):
+        print ('\n---------'+str(self))
+        name = 'test_flight_path_encounter_reports'
+        topo = Topology(name)
+        toolkit.add_toolkit(topo, self.geospatial_toolkit_home)
+        self._index_toolkit(_get_test_tk_path())
+        toolkit.add_toolkit(topo, _get_test_tk_path())
+        
+        datagen = op.Invoke(topo, kind='test::GenFlightPathData', schemas=[FlighPathEncounterSchema.EncounterEvents])
+        planes_stream = datagen.outputs[0]
+        
+        fpe = geo.FlightPathEncounter(north_latitude=52.6,south_latitude=52.4,west_longitude=13.3,east_longitude=13.5,num_latitude_divs=5,num_longitude_divs=5,search_radius=10000,altitude_search_radius=400,time_search_interval=600000)
+        fpe.report_interval = 60000
+        fpe.report_time_threshold = 10000
+        fpe.pack_interval = 1000
+        events = planes_stream.map(fpe, schema=FlighPathEncounterSchema.EncounterLists)
+        res = events.map(lambda t: len(t['encounters']))
+        res.print()
+
+        if (("TestDistributed" in str(self)) or ("TestStreamingAnalytics" in str(self))):
+            tester = Tester(topo)
+            tester.tuple_count(res, 1, exact=True)
+            tester.test(self.test_ctxtype, self.test_config, always_collect_logs=True)
+        else:
+            # build only
+            self._build_only(name, topo)
+
+
 class TestDistributed(Test):
     def setUp(self):
         Tester.setup_distributed(self)
@@ -0,0 +1,926 @@
+import asyncio
+import csv
+import datetime
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+from streamsx.geospatial.local import RegionMatchEngine, ShardedRegionMatchEngine, FlightPathEncounterEngine, TiledFlightPathEncounterEngine, PolygonCache, CompiledPolygon, observation_columns, replay, read_regions
+from streamsx.geospatial.local import meters_per_degree, approximate_distance, haversine_distance, destination_point, vincenty_distance
+
+_BERLIN_CENTER = 'POLYGON((13.413140166512107 52.53577235025506,13.468071807137107 52.53577235025506,13.468071807137107 52.51279486997035,13.413140166512107 52.51279486997035,13.413140166512107 52.53577235025506))'
+
+
+def _region(id, wkt=_BERLIN_CENTER, remove=False, dwell=0, timeout=0):
+    return {'id': id, 'polygonAsWKT': wkt, 'removeRegion': remove, 'notifyOnEntry': True, 'notifyOnExit': True, 'notifyOnHangout': True, 'minimumDwellTime': dwell, 'timeout': timeout}
+
+def _device(id, latitude, longitude, ts):
+    return {'id': id, 'latitude': latitude, 'longitude': longitude, 'timeStamp': ts, 'matchEventType': '', 'regionName': ''}
+
+
+class TestRegionMatchEngine(unittest.TestCase):
+
+    def _events(self, engine, device):
+        return [(e['matchEventType'], e['regionName']) for e in engine.process(device)]
+
+    def test_enter_hangout_exit(self):
+        engine = RegionMatchEngine()
+        engine.process_region(_region('center', dwell=10))
+        self.assertEqual([], self._events(engine, _device('d1', 52.50, 13.40, 0)))
+        self.assertEqual([('ENTER', 'center')], self._events(engine, _device('d1', 52.52, 13.44, 1)))
+        self.assertEqual([], self._events(engine, _device('d1', 52.52, 13.45, 5)))
+        self.assertEqual([('HANGOUT', 'center')], self._events(engine, _device('d1', 52.52, 13.45, 11)))
+        self.assertEqual([], self._events(engine, _device('d1', 52.52, 13.45, 20)))
+        self.assertEqual([('EXIT', 'center')], self._events(engine, _device('d1', 52.50, 13.45, 21)))
+        self.assertEqual(0, engine.device_count)
+
+    def test_timeout_and_remove(self):
+        engine = RegionMatchEngine()
+        engine.process_region(_region('center', timeout=60))
+        self.assertEqual([('ENTER', 'center')], self._events(engine, _device('d1', 52.52, 13.44, 0)))
+        # stale device is removed before the observation is processed
+        self.assertEqual([('ENTER', 'center')], self._events(engine, _device('d1', 52.52, 13.44, 120)))
+        engine.process_region(_region('center', remove=True))
+        self.assertEqual(0, engine.region_count)
+        self.assertEqual([], self._events(engine, _device('d1', 52.50, 13.44, 121)))
+
+    def test_stats(self):
+        engine = RegionMatchEngine()
+        engine.process_region(_region('center'))
+        engine.process_region(_region('other', wkt='POLYGON((13.5 52.6,13.6 52.6,13.6 52.7,13.5 52.6))'))
+        engine.process(_device('d1', 52.52, 13.44, 0))
+        engine.process(_device('d1', 52.50, 13.44, 1))
+        engine.region_match_batch(np.array([52.52]), np.array([13.44]), np.array(['d2']), np.array([2.0]))
+        stats = engine.stats
+        self.assertEqual(3, stats['nObservations'])
+        self.assertEqual(3, stats['nCellsVisited'])
+        self.assertEqual(2, stats['nPolygonTests'])
+        self.assertEqual(2, stats['nEnterEvents'])
+        self.assertEqual(1, stats['nExitEvents'])
+        self.assertEqual(0, stats['nHangoutEvents'])
+        self.assertEqual(2, stats['nRegions'])
+        self.assertEqual(1, stats['nTrackedDevices'])
+
+    def test_polygon_with_hole(self):
+        engine = RegionMatchEngine(cell_size=0.5)
+        engine.add_region(_region('ring', wkt='POLYGON((0 0,10 0,10 10,0 10,0 0),(4 4,6 4,6 6,4 6,4 4))'))
+        self.assertEqual(['ring'], engine.match(2, 2))
+        self.assertEqual([], engine.match(5, 5))
+        self.assertEqual([], engine.match(11, 5))
+
+    def test_region_match_batch(self):
+        rnd = random.Random(4711)
+        regions = []
+        for i in range(50):
+            x = rnd.uniform(13.0, 13.8)
+            y = rnd.uniform(52.2, 52.8)
+            r = rnd.uniform(0.01, 0.2)
+            wkt = 'POLYGON((' + ','.join('%f %f' % (x + r * np.cos(a), y + 0.6 * r * np.sin(a)) for a in np.linspace(0, 2 * np.pi, 12)) + '))'
+            regions.append(_region('r%d' % i, wkt=wkt, dwell=rnd.choice([0, 30])))
+        n = 2000
+        lats = np.array([rnd.uniform(52.2, 52.8) for _ in range(n)])
+        lons = np.array([rnd.uniform(13.0, 13.8) for _ in range(n)])
+        ids = np.array(['d%d' % rnd.randrange(40) for _ in range(n)])
+        ts = np.arange(n, dtype=np.float64)
+        single = RegionMatchEngine(cell_size=0.1)
+        batch = RegionMatchEngine(cell_size=0.1)
+        for region in regions:
+            single.process_region(region)
+            batch.process_region(region)
+        expected = []
+        for i in range(n):
+            expected.extend(sorted((i, e['matchEventType'], e['regionName']) for e in single.process(_device(ids[i], lats[i], lons[i], ts[i]))))
+        events = batch.region_match_batch(lats, lons, ids, ts)
+        rows = np.searchsorted(ts, events['timeStamp'])
+        actual = sorted(zip(rows.tolist(), events['matchEventType'], events['regionName']))
+        self.assertTrue(len(expected) > 100)
+        self.assertEqual(sorted(expected), actual)
+
+    def test_stream(self):
+        rnd = random.Random(17)
+        regions = [_region('center'), _region('big', wkt='POLYGON((13.3 52.45,13.6 52.45,13.6 52.6,13.3 52.6,13.3 52.45))', dwell=20)]
+        devices = [_device('d%d' % rnd.randrange(20), rnd.uniform(52.4, 52.65), rnd.uniform(13.25, 13.65), i) for i in range(1000)]
+        single = RegionMatchEngine(cell_size=0.1)
+        single.load_regions(regions)
+        expected = sorted((e['timeStamp'], e['matchEventType'], e['regionName']) for d in devices for e in single.process(d))
+        self.assertGreater(len(expected), 100)
+
+        async def source():
+            for device in devices:
+                yield device
+
+        async def collect(engine, observations, **kwargs):
+            return [(e['timeStamp'], e['matchEventType'], e['regionName']) async for e in engine.stream(observations, **kwargs)]
+
+        for kwargs in ({}, {'batch_size': 100}, {'batch_timeout': 0.01, 'queue_size': 10}, {'batch_size': 64, 'batch_timeout': 0.01}):
+            engine = RegionMatchEngine(cell_size=0.1)
+            engine.load_regions(regions)
+            self.assertEqual(expected, sorted(asyncio.run(collect(engine, source(), **kwargs))))
+            self.assertEqual(1000, engine.stats['nObservations'])
+        # plain iterables are accepted as well
+        engine = RegionMatchEngine(cell_size=0.1)
+        engine.load_regions(regions)
+        self.assertEqual(expected, sorted(asyncio.run(collect(engine, devices, batch_size=50))))
+
+    def test_sharded_engine(self):
+        rnd = random.Random(11)
+        regions = [_region('r%d' % i, wkt='POLYGON((%f %f,%f %f,%f %f,%f %f))' % (x, y, x + 0.2, y, x + 0.2, y + 0.1, x, y), dwell=20) for i, (x, y) in enumerate((rnd.uniform(13.0, 13.6), rnd.uniform(52.2, 52.7)) for _ in range(20))]
+        n = 3000
+        lats = np.array([rnd.uniform(52.2, 52.8) for _ in range(n)])
+        lons = np.array([rnd.uniform(13.0, 13.8) for _ in range(n)])
+        ids = np.array(['d%d' % rnd.randrange(60) for _ in range(n)])
+        ts = np.arange(n, dtype=np.float64)
+        # regions copied to each shard or shared in a region store file
+        for region_store in (None, os.path.join(tempfile.mkdtemp(), 'regions.store')):
+            single = RegionMatchEngine(cell_size=0.1)
+            for region in regions:
+                single.process_region(region)
+            with ShardedRegionMatchEngine(width=3, cell_size=0.1, region_store=region_store) as sharded:
+                for region in regions:
+                    sharded.process_region(region)
+                self.assertEqual(20, sharded.region_count)
+                for start in range(0, n, 1000):
+                    part = slice(start, start + 1000)
+                    expected = single.region_match_batch(lats[part], lons[part], ids[part], ts[part])
+                    actual = sharded.region_match_batch(lats[part], lons[part], ids[part], ts[part])
+                    for name in ('id', 'timeStamp', 'matchEventType', 'regionName'):
+                        self.assertEqual(expected[name].tolist(), actual[name].tolist())
+                self.assertEqual(single.device_count, sharded.device_count)
+                self.assertEqual(single.stats, sharded.stats)
+                self.assertTrue(sharded.remove_region('r0'))
+                self.assertFalse(sharded.remove_region('r0'))
+                self.assertEqual([], sharded.process(_device('x', 52.0, 12.0, n)))
+                sharded.add_region(_region('bad', wkt='POINT(1 2)'))
+                self.assertRaises(ValueError, sharded.process, _device('x', 52.0, 12.0, n))
+
+    def test_replay(self):
+        directory = tempfile.mkdtemp()
+        regions = os.path.join(directory, 'regions.csv')
+        devices = os.path.join(directory, 'devices.csv')
+        output = os.path.join(directory, 'events.jsonl')
+        with open(regions, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(_region('center')))
+            writer.writeheader()
+            writer.writerow(_region('center', dwell=10))
+        with open(devices, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['id', 'latitude', 'longitude', 'timeStamp'])
+            writer.writerow(['d1', 52.50, 13.40, '2020-01-01T00:00:00Z'])
+            writer.writerow(['d1', 52.52, 13.44, '2020-01-01T00:00:01Z'])
+            writer.writerow(['d1', 52.52, 13.45, '2020-01-01T00:00:12Z'])
+            writer.writerow(['d1', 52.50, 13.45, '2020-01-01T00:00:13Z'])
+        summary = replay(devices, RegionMatchEngine(), output=output, regions=regions)
+        self.assertEqual(4, summary['observations'])
+        self.assertEqual(3, summary['events'])
+        with open(output) as f:
+            events = [json.loads(line) for line in f]
+        self.assertEqual([('ENTER', 'center'), ('HANGOUT', 'center'), ('EXIT', 'center')], [(e['matchEventType'], e['regionName']) for e in events])
+        # 13 seconds of event time at 100 times the recorded speed
+        summary = replay(devices, RegionMatchEngine(), speedup=100, regions=regions)
+        self.assertGreaterEqual(summary['seconds'], 0.13)
+        self.assertRaises(ValueError, replay, devices, RegionMatchEngine(), speedup=0)
+        # a sharded engine matches the rows in batches with the same events
+        sharded_output = os.path.join(directory, 'sharded.jsonl')
+        with ShardedRegionMatchEngine(width=2) as sharded:
+            summary = replay(devices, sharded, output=sharded_output, regions=regions)
+        self.assertEqual(3, summary['events'])
+        with open(sharded_output) as f:
+            self.assertEqual(events, [json.loads(line) for line in f])
+
+    def test_parse_time(self):
+        from streamsx.geospatial.local._replay import _parse_time
+        utc = datetime.timezone.utc
+        self.assertEqual(12.5, _parse_time('12.5'))
+        self.assertEqual(datetime.datetime(2020, 1, 1, 0, 0, 1, tzinfo=utc), _parse_time('2020-01-01T00:00:01Z'))
+        self.assertEqual(datetime.datetime(2020, 1, 1, 0, 0, 1, 250000, tzinfo=utc), _parse_time('2020-01-01T01:30:01.25+01:30'))
+        self.assertEqual(datetime.datetime(2020, 1, 1, 5, 0, 1, tzinfo=utc), _parse_time('2020-01-01 00:00:01-0500'))
+        self.assertEqual(datetime.datetime(2020, 1, 1, 0, 0, 1), _parse_time('2020-01-01T00:00:01'))
+        self.assertRaises(ValueError, _parse_time, 'yesterday')
+
+    def test_skip_unchanged(self):
+        rnd = random.Random(5)
+        regions = [_region('center', dwell=20, timeout=300), _region('star', wkt=_star_wkt(13.45, 52.52, 0.03, 400), dwell=10)]
+        positions = dict(('d%d' % i, (rnd.uniform(52.48, 52.56), rnd.uniform(13.38, 13.50))) for i in range(200))
+        devices = []
+        for ts in range(0, 4000, 10):
+            device_id = 'd%d' % rnd.randrange(200)
+            if rnd.random() < 0.3:
+                # moving devices
+                positions[device_id] = (rnd.uniform(52.48, 52.56), rnd.uniform(13.38, 13.50))
+            latitude, longitude = positions[device_id]
+            if rnd.random() < 0.5:
+                # jitter of parked devices
+                latitude += rnd.uniform(-0.00001, 0.00001)
+            devices.append(_device(device_id, latitude, longitude, ts))
+        plain = RegionMatchEngine(cell_size=0.02)
+        skipping = RegionMatchEngine(cell_size=0.02, skip_unchanged=True)
+        for region in regions:
+            plain.process_region(region)
+            skipping.process_region(region)
+        for device in devices:
+            self.assertEqual(plain.process(device), skipping.process(device))
+        stats = skipping.stats
+        self.assertGreater(stats['nSkippedMatches'], 50)
+        self.assertLess(stats['nPolygonTests'], plain.stats['nPolygonTests'])
+        self.assertTrue(any(entry is not None for entry in skipping._classified.values()))
+        # classified cells are dropped when the regions change
+        skipping.remove_region('star')
+        self.assertEqual(0, len(skipping._classified))
+        self.assertEqual(0, len(skipping._last_matches))
+
+    def test_skip_unchanged_filter(self):
+        from streamsx.geospatial._unchanged import _SkipUnchanged
+        skip = _SkipUnchanged(30, 'id', 'latitude', 'longitude', 'timeStamp')
+        self.assertEqual([True, False, True, True, False, True], [skip(_device('d1', lat, 13.4, ts)) for lat, ts in ((52.5, 0), (52.5, 10), (52.6, 20), (52.6, 50), (52.6, 60), (52.5, 61))])
+        # devices not forwarded within the interval are forgotten
+        self.assertTrue(skip(_device('d2', 52.5, 13.4, 100)))
+        self.assertEqual(['d2'], list(skip._forwarded))
+
+    def test_timeout_expiry(self):
+        engine = RegionMatchEngine()
+        engine.process_region(_region('center', dwell=20, timeout=60))
+        engine.process_region(_region('other', wkt='POLYGON((13.5 52.6,13.6 52.6,13.6 52.7,13.5 52.6))'))
+        for i in range(100):
+            engine.process(_device('d%d' % i, 52.52, 13.44, i * 0.5))
+        engine.process(_device('parked', 52.65, 13.58, 10))
+        self.assertEqual(101, engine.device_count)
+        # devices in a region without timeout are kept, the others are dropped when the clock passes their timeout
+        self.assertEqual([], self._events(engine, _device('x', 52.0, 13.0, 80)))
+        self.assertEqual(61, engine.device_count)
+        self.assertEqual([], self._events(engine, _device('x', 52.0, 13.0, 111)))
+        self.assertEqual(1, engine.device_count)
+        self.assertEqual(100, engine.stats['nTimeouts'])
+        # a device observed again is entered again, like a device timed out on its next observation
+        self.assertEqual([('ENTER', 'center')], self._events(engine, _device('d1', 52.52, 13.44, 112)))
+        self.assertEqual([('HANGOUT', 'center')], self._events(engine, _device('d1', 52.52, 13.44, 150)))
+        self.assertEqual([], self._events(engine, _device('d1', 52.52, 13.44, 200)))
+        self.assertEqual([], self._events(engine, _device('x', 52.0, 13.0, 250)))
+        self.assertEqual(2, engine.device_count)
+        self.assertEqual([('ENTER', 'center')], self._events(engine, _device('d1', 52.52, 13.44, 261)))
+        self.assertEqual(101, engine.stats['nTimeouts'])
+        # observations of untracked devices outside of the regions advance the clock of a batch as well
+        batch = RegionMatchEngine()
+        batch.process_region(_region('center', timeout=60))
+        batch.region_match_batch([52.52], [13.44], ['d1'], [0.0])
+        batch.region_match_batch([52.0, 52.0], [13.0, 13.0], ['x', 'y'], [30.0, 61.0])
+        self.assertEqual(0, batch.device_count)
+        self.assertEqual(1, batch.stats['nTimeouts'])
+
+    def test_timing_wheel(self):
+        from streamsx.geospatial.local._wheel import _TimingWheel
+        rnd = random.Random(3)
+        # few slots and levels, so that timers cascade through all levels and the overflow
+        wheel = _TimingWheel(resolution=0.5, bits=2, levels=3)
+        due = {}
+        now = 0.0
+        self.assertEqual([], wheel.advance(now))
+        for step in range(400):
+            for _ in range(rnd.randrange(4)):
+                key = rnd.randrange(200)
+                when = now + rnd.choice([0.1, 1.0, 5.0, 30.0, 100.0]) * rnd.random()
+                wheel.schedule(key, when)
+                # the earliest timer of a key is kept, timers in the past come up with the next tick
+                tick = max(int(when // 0.5), int(now // 0.5) + 1)
+                due[key] = min(due.get(key, tick), tick)
+            now += rnd.choice([0.2, 1.0, 3.0, 40.0])
+            fired = wheel.advance(now)
+            # in order of the ticks
+            self.assertEqual(sorted(key for key, tick in due.items() if tick <= int(now // 0.5)), sorted(fired))
+            self.assertEqual(sorted(due[key] for key in fired), [due[key] for key in fired])
+            for key in fired:
+                del due[key]
+            self.assertEqual(len(due), len(wheel))
+        self.assertEqual([], wheel.advance(now))
+
+    def test_load_regions(self):
+        rnd = random.Random(8)
+        regions = [_region('r%d' % i, wkt=_star_wkt(rnd.uniform(13.0, 13.6), rnd.uniform(52.2, 52.7), 0.05, rnd.choice([5, 40, 300]), hole=i % 3 == 0)) for i in range(60)]
+        regions.append(_region('multi', wkt='MULTIPOLYGON(((13.1 52.3,13.2 52.3,13.2 52.4,13.1 52.3)),((13.3 52.3,13.4 52.3,13.4 52.4,13.3 52.3)))'))
+        regions.append(_region('3d', wkt='POLYGON((13.0 52.0 100,13.9 52.0 100,13.9 52.9 100,13.0 52.0 100))'))
+        regions.append(_region('r1', wkt=_BERLIN_CENTER))
+        regions.append(_region('r2', remove=True))
+        single = RegionMatchEngine(cell_size=0.1)
+        for region in regions:
+            single.process_region(region)
+        bulk = RegionMatchEngine(cell_size=0.1)
+        bulk.add_region(_region('r2'))
+        self.assertEqual(single.region_count, bulk.load_regions(regions))
+        for _ in range(500):
+            latitude, longitude = rnd.uniform(52.1, 52.9), rnd.uniform(12.9, 13.8)
+            self.assertEqual(sorted(single.match(latitude, longitude)), sorted(bulk.match(latitude, longitude)))
+        self.assertRaises(ValueError, bulk.load_regions, [_region('bad', wkt='POLYGON((1 2,3 4))')])
+
+    def test_cell_map(self):
+        rnd = random.Random(11)
+        # small urban regions, a few larger ones, a region spanning more cells than the cell map holds and overlapping regions
+        regions = [_region('r%d' % i, wkt=_star_wkt(rnd.uniform(13.3, 13.5), rnd.uniform(52.45, 52.55), rnd.choice([0.002, 0.01, 0.08]), rnd.choice([4, 12, 300]), hole=i % 4 == 0)) for i in range(80)]
+        regions.append(_region('center'))
+        regions.append(_region('huge', wkt='POLYGON((9.0 50.0,17.0 50.0,17.0 55.0,9.0 50.0))'))
+        plain = RegionMatchEngine(cell_size=0.02)
+        mapped = RegionMatchEngine(cell_size=0.02, cell_map=True)
+        plain.load_regions(regions[:40])
+        mapped.load_regions(regions[:40])
+        for region in regions[40:]:
+            plain.add_region(region)
+            mapped.add_region(region)
+        for i in range(0, 80, 3):
+            plain.remove_region('r%d' % i)
+            mapped.remove_region('r%d' % i)
+        points = [(rnd.uniform(52.43, 52.57), rnd.uniform(13.28, 13.52)) for _ in range(3000)]
+        # points on cell borders and on the vertices of a region
+        points += [(52.52, 13.44), (52.5, 13.4), (52.53577235025506, 13.413140166512107), (52.51279486997035, 13.468071807137107)]
+        for latitude, longitude in points:
+            self.assertEqual(plain.match(latitude, longitude), mapped.match(latitude, longitude))
+        stats = mapped.stats
+        self.assertGreater(stats['nCellMapMatches'], 0)
+        self.assertLess(stats['nPolygonTests'], plain.stats['nPolygonTests'])
+        # all cells of removed regions are dropped
+        for region in regions:
+            mapped.remove_region(region['id'])
+        self.assertEqual(0, len(mapped._cell_map))
+        self.assertFalse(any(mapped._cell_map._cells))
+        self.assertEqual([], mapped.match(52.52, 13.44))
+
+    def test_read_regions(self):
+        directory = tempfile.mkdtemp()
+        geojson = os.path.join(directory, 'regions.geojson')
+        with open(geojson, 'w') as f:
+            json.dump({'type': 'FeatureCollection', 'features': [
+                {'type': 'Feature', 'id': 'square', 'properties': {'minimumDwellTime': 30}, 'geometry': {'type': 'Polygon', 'coordinates': [[[13.41, 52.51], [13.46, 52.51], [13.46, 52.53], [13.41, 52.53], [13.41, 52.51]]]}},
+                {'type': 'Feature', 'properties': {'id': 'two', 'notifyOnExit': False}, 'geometry': {'type': 'MultiPolygon', 'coordinates': [[[[13.1, 52.3], [13.2, 52.3], [13.2, 52.4], [13.1, 52.3]]], [[[13.3, 52.3], [13.4, 52.3], [13.4, 52.4], [13.3, 52.3]]]]}}]}, f)
+        regions = list(read_regions(geojson))
+        self.assertEqual(['square', 'two'], [r['id'] for r in regions])
+        self.assertEqual(30, regions[0]['minimumDwellTime'])
+        self.assertFalse(regions[1]['notifyOnExit'])
+        engine = RegionMatchEngine()
+        engine.load_regions(regions)
+        self.assertEqual(['square'], engine.match(52.52, 13.44))
+        self.assertEqual(['two'], engine.match(52.32, 13.35))
+        path = os.path.join(directory, 'regions.csv')
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(regions[0]))
+            writer.writeheader()
+            writer.writerows(regions)
+        self.assertEqual(regions, list(read_regions(path)))
+        engine.snapshot(os.path.join(directory, 'regions.snapshot'))
+        self.assertEqual(regions, list(read_regions(os.path.join(directory, 'regions.snapshot'))))
+
+    def test_snapshot_restore(self):
+        engine = RegionMatchEngine(cell_size=0.02, id_attribute='deviceId')
+        engine.add_region(_region('center', dwell=10))
+        engine.add_region(_region('star', wkt=_star_wkt(13.3, 52.45, 0.05, 400), dwell=5))
+        engine.add_region(_region('gone'))
+        engine.remove_region('gone')
+        self.assertIsNotNone(engine._cache.get('star', engine._regions['star'].wkt).raster)
+        device = lambda latitude, longitude, ts: {'deviceId': 'd1', 'latitude': latitude, 'longitude': longitude, 'timeStamp': ts}
+        engine.process(device(52.52, 13.44, 0))
+        path = os.path.join(tempfile.mkdtemp(), 'regions.snapshot')
+        engine.snapshot(path)
+        for mmap in (True, False):
+            restored = RegionMatchEngine.restore(path, mmap=mmap)
+            self.assertEqual(2, restored.region_count)
+            self.assertEqual(1, restored.device_count)
+            self.assertEqual('deviceId', restored.id_attribute)
+            for latitude in np.linspace(52.38, 52.56, 40).tolist():
+                self.assertEqual(sorted(engine.match(latitude, 13.3)), sorted(restored.match(latitude, 13.3)))
+                self.assertEqual(sorted(engine.match(latitude, 13.44)), sorted(restored.match(latitude, 13.44)))
+            # the dwell time of the device continues in the restored engine
+            self.assertEqual(['HANGOUT'], [e['matchEventType'] for e in restored.process(device(52.52, 13.44, 10))])
+        from streamsx.geospatial.local._snapshot import read_snapshot, snapshot_regions
+        self.assertEqual(['center', 'star'], [r['id'] for r in snapshot_regions(path)])
+        # the ids are stored in mapped arrays, not in the header
+        meta, arrays = read_snapshot(path, 'RegionMatchEngine')
+        self.assertEqual(['cell_size', 'settings'], sorted(meta))
+        self.assertEqual(b'd1', arrays['device_ids'].tobytes())
+        self.assertRaises(ValueError, FlightPathEncounterEngine.restore, path)
+
+    def test_region_store(self):
+        rnd = random.Random(23)
+        regions = [_region('r%d' % i, wkt=_star_wkt(rnd.uniform(13.3, 13.5), rnd.uniform(52.45, 52.55), rnd.choice([0.005, 0.03]), rnd.choice([6, 400]), hole=i % 5 == 0), dwell=10, timeout=100) for i in range(40)]
+        regions.append(_region('huge', wkt='POLYGON((9.0 50.0,17.0 50.0,17.0 55.0,9.0 50.0))'))
+        writer = RegionMatchEngine(cell_size=0.02, skip_unchanged=True)
+        writer.load_regions(regions)
+        path = os.path.join(tempfile.mkdtemp(), 'regions.store')
+        writer.publish(path)
+        attached = RegionMatchEngine.attach(path)
+        self.assertEqual(41, attached.region_count)
+        self.assertTrue(attached.skip_unchanged)
+        self.assertIn('r7', attached._regions)
+        self.assertNotIn('r99', attached._regions)
+        # the polygons and the index are views of the read-only mapping
+        self.assertFalse(attached._store.edges.flags.writeable)
+        self.assertFalse(attached._store.cell_regions.flags.writeable)
+        devices = [_device('d%d' % rnd.randrange(30), rnd.uniform(52.43, 52.57), rnd.uniform(13.28, 13.52), ts) for ts in range(0, 3000, 2)]
+        for device in devices:
+            self.assertEqual(writer.process(device), attached.process(device))
+        batch = [np.array([d[name] for d in devices]) for name in ('latitude', 'longitude', 'id', 'timeStamp')]
+        expected = writer.region_match_batch(*batch)
+        actual = attached.region_match_batch(*batch)
+        self.assertEqual(expected['regionName'].tolist(), actual['regionName'].tolist())
+        self.assertRaises(ValueError, attached.add_region, _region('other'))
+        self.assertRaises(ValueError, attached.remove_region, 'r1')
+        self.assertFalse(attached.refresh())
+        # a new version is attached on refresh, the device states are kept
+        writer.add_region(_region('center', dwell=10))
+        writer.remove_region('r3')
+        self.assertNotIn('center', attached.match(52.52, 13.44))
+        self.assertEqual([('ENTER', 'center')], [(e['matchEventType'], e['regionName']) for e in writer.process(_device('c1', 52.52, 13.44, 5000)) if e['regionName'] == 'center'])
+        writer.publish(path)
+        self.assertTrue(attached.refresh())
+        self.assertFalse(attached.refresh())
+        self.assertEqual(41, attached.region_count)
+        self.assertEqual(writer.match(52.52, 13.44), attached.match(52.52, 13.44))
+        self.assertIn('center', attached.match(52.52, 13.44))
+        for device in devices:
+            device = dict(device, timeStamp=device['timeStamp'] + 5000)
+            self.assertEqual(writer.process(device), attached.process(device))
+        # attached engines can be saved with their device states
+        snapshot = os.path.join(tempfile.mkdtemp(), 'regions.snapshot')
+        attached.snapshot(snapshot)
+        self.assertEqual(sorted(writer._regions), sorted(RegionMatchEngine.restore(snapshot)._regions))
+        self.assertRaises(ValueError, writer.refresh)
+        self.assertRaises(ValueError, RegionMatchEngine.attach, snapshot)
+
+
+def _star_wkt(x, y, r, n, hole=False):
+    a = np.linspace(0, 2 * np.pi, n, endpoint=False)
+    radius = r * (1 + 0.3 * np.sin(7 * a))
+    ring = ','.join('%f %f' % p for p in zip(x + radius * np.cos(a), y + radius * np.sin(a)))
+    ring += ',%f %f' % (x + radius[0], y)
+    wkt = 'POLYGON((' + ring + ')'
+    if hole:
+        wkt += ',(%f %f,%f %f,%f %f,%f %f,%f %f)' % (x - r / 4, y - r / 4, x + r / 4, y - r / 4, x + r / 4, y + r / 4, x - r / 4, y + r / 4, x - r / 4, y - r / 4)
+    return wkt + ')'
+
+
+class TestPolygonCache(unittest.TestCase):
+
+    def test_raster_matches_edges(self):
+        wkt = _star_wkt(10.0, 50.0, 1.0, 2000, hole=True)
+        rastered = CompiledPolygon(wkt, raster_threshold=256)
+        plain = CompiledPolygon(wkt, raster_threshold=None)
+        self.assertIsNotNone(rastered.raster)
+        self.assertIsNone(plain.raster)
+        rnd = np.random.RandomState(42)
+        x = rnd.uniform(8.5, 11.5, 5000)
+        y = rnd.uniform(48.5, 51.5, 5000)
+        expected = plain.contains_many(x, y)
+        self.assertTrue(0 < expected.sum() < 5000)
+        np.testing.assert_array_equal(expected, rastered.contains_many(x, y))
+        self.assertEqual(expected[:200].tolist(), [rastered.contains(a, b) for a, b in zip(x[:200], y[:200])])
+
+    def test_slabs_match_edges(self):
+        wkt = _star_wkt(10.0, 50.0, 1.0, 20000)
+        prepared = CompiledPolygon(wkt, raster_threshold=256)
+        plain = CompiledPolygon(wkt, raster_threshold=None)
+        # points close to the boundary fall into boundary cells of the raster
+        rnd = np.random.RandomState(7)
+        a = rnd.uniform(0, 2 * np.pi, 5000)
+        radius = 1.0 + 0.3 * np.sin(7 * a) + rnd.uniform(-0.002, 0.002, 5000)
+        x = 10.0 + radius * np.cos(a)
+        y = 50.0 + radius * np.sin(a)
+        expected = plain.contains_many(x, y)
+        np.testing.assert_array_equal(expected, prepared.contains_many(x, y))
+        self.assertEqual(expected[:500].tolist(), [prepared.contains(p, q) for p, q in zip(x[:500], y[:500])])
+        # a polygon of long edges gets fewer slabs
+        zigzag = 'POLYGON((0 0,' + ','.join('%d %d' % (i, 100 * (i % 2)) for i in range(1, 1000)) + ',999 -1,0 -1,0 0))'
+        prepared = CompiledPolygon(zigzag, raster_threshold=256)
+        plain = CompiledPolygon(zigzag, raster_threshold=None)
+        self.assertLessEqual(prepared._slabs[4].shape[1], 8 * prepared.vertex_count + 1 + prepared._slabs[2])
+        x = rnd.uniform(0, 999, 2000)
+        y = rnd.uniform(-1, 100, 2000)
+        np.testing.assert_array_equal(plain.contains_many(x, y), prepared.contains_many(x, y))
+
+    def test_parse_once_and_evict(self):
+        cache = PolygonCache()
+        engine = RegionMatchEngine(polygon_cache=cache)
+        engine.process_region(_region('center'))
+        polygon = cache.get('center', _BERLIN_CENTER)
+        engine.process_region(_region('center', dwell=30))
+        self.assertIs(polygon, cache.get('center', _BERLIN_CENTER))
+        engine.process_region(_region('center', remove=True))
+        self.assertNotIn('center', cache)
+        self.assertEqual(0, cache.nbytes)
+
+    def test_lru_bound(self):
+        cache = PolygonCache(max_bytes=3 * CompiledPolygon(_BERLIN_CENTER).nbytes)
+        for i in range(5):
+            cache.get('r%d' % i, _BERLIN_CENTER)
+        self.assertEqual(3, len(cache))
+        self.assertNotIn('r0', cache)
+        self.assertIn('r4', cache)
+        self.assertIsNone(cache.lookup('r0'))
+        # a looked up polygon is recently used, a put polygon is accounted and evicts the oldest
+        self.assertIsNotNone(cache.lookup('r2'))
+        cache.put('r5', CompiledPolygon(_BERLIN_CENTER))
+        self.assertEqual(['r2', 'r4', 'r5'], sorted(r for r in ('r2', 'r3', 'r4', 'r5') if r in cache))
+        self.assertEqual(3 * CompiledPolygon(_BERLIN_CENTER).nbytes, cache.nbytes)
+        # evicted polygons are compiled again on use
+        engine = RegionMatchEngine(polygon_cache=cache)
+        for i in range(5):
+            engine.add_region(_region('r%d' % i))
+        self.assertEqual(5, len(engine.match(52.52, 13.44)))
+
+    def test_bulk_compiled_eviction(self):
+        # the polygons compiled by load_regions do not share memory, so evicting them releases it
+        cache = PolygonCache(max_bytes=3 * CompiledPolygon(_BERLIN_CENTER).nbytes)
+        engine = RegionMatchEngine(polygon_cache=cache)
+        engine.load_regions([_region('r%d' % i) for i in range(1000)])
+        self.assertEqual(3, len(cache))
+        held = {}
+        for region_id in ('r997', 'r998', 'r999'):
+            edges = cache.lookup(region_id).edges
+            base = edges if edges.base is None else edges.base
+            held[id(base)] = base.nbytes
+        self.assertEqual(cache.nbytes, sum(held.values()))
+
+
+def _plane(id, latitude, longitude, time, altitude=3000.0, azimuth=0.0, speed=200.0, climb=0.0):
+    return {'entityId': id, 'latitude': latitude, 'longitude': longitude, 'altitude': altitude, 'observationTime': time, 'azimuth': azimuth, 'groundSpeed': speed, 'altitudeChangeRate': climb}
+
+def _engine(**kwargs):
+    args = dict(north_latitude=53.0, south_latitude=52.0, west_longitude=13.0, east_longitude=14.0, num_latitude_divs=5, num_longitude_divs=5, search_radius=1000, altitude_search_radius=300, time_search_interval=600000)
+    args.update(kwargs)
+    return FlightPathEncounterEngine(**args)
+
+def _random_traffic(n, objects, seed=1):
+    rnd = random.Random(seed)
+    result = []
+    for i in range(n):
+        result.append(_plane('p%d' % rnd.randrange(objects), rnd.uniform(52.0, 53.0), rnd.uniform(13.0, 14.0), 1000 * i, altitude=rnd.uniform(1000, 2000), azimuth=rnd.uniform(0, 360), speed=rnd.uniform(50, 250), climb=rnd.uniform(-5, 5)))
+    return result
+
+
+class TestFlightPathEncounterEngine(unittest.TestCase):
+
+    def test_head_on(self):
+        engine = _engine()
+        # 20 km apart on the same meridian, flying towards each other
+        self.assertEqual([], engine.process(_plane('a', 52.3, 13.5, 0, azimuth=0.0)))
+        events = engine.process({'observation': _plane('b', 52.48, 13.5, 0, azimuth=180.0)})
+        self.assertEqual(1, len(events))
+        event = events[0]
+        self.assertEqual('b', event['observation']['entityId'])
+        self.assertEqual('a', event['encounter']['entityId'])
+        self.assertLess(event['encounterDistance'], 1.0)
+        # 20 km at a closing speed of 400 m/s
+        self.assertAlmostEqual(50000, event['encounterTime'], delta=100)
+
+    def test_altitude_and_time_window(self):
+        engine = _engine()
+        engine.process(_plane('a', 52.3, 13.5, 0, azimuth=0.0))
+        self.assertEqual([], engine.process(_plane('b', 52.48, 13.5, 0, azimuth=180.0, altitude=4000.0)))
+        # climbing into the altitude of a before they meet
+        self.assertEqual(1, len(engine.process(_plane('b', 52.48, 13.5, 0, azimuth=180.0, altitude=4000.0, climb=-20.0))))
+        # the paths are extrapolated for 100 seconds, 66 km at a closing speed of 400 m/s take longer
+        engine = _engine(time_search_interval=100000)
+        engine.process(_plane('a', 52.3, 13.5, 0, azimuth=0.0))
+        self.assertEqual([], engine.process(_plane('c', 52.9, 13.5, 0, azimuth=180.0)))
+
+    def test_grid_matches_single_cell(self):
+        grid = _engine(num_latitude_divs=20, num_longitude_divs=20, search_radius=5000)
+        single = _engine(num_latitude_divs=1, num_longitude_divs=1, search_radius=5000)
+        total = 0
+        for observation in _random_traffic(1000, 300):
+            expected = sorted((e['encounter']['entityId'], e['encounterTime']) for e in single.process(observation))
+            self.assertEqual(expected, sorted((e['encounter']['entityId'], e['encounterTime']) for e in grid.process(observation)))
+            total += len(expected)
+        self.assertGreater(total, 50)
+
+    def test_quadtree_matches_grid(self):
+        grid = _engine(search_radius=1000, time_search_interval=30000)
+        quadtree = _engine(search_radius=1000, time_search_interval=30000, index_type='quadtree')
+        # dense traffic around one point and sparse traffic elsewhere
+        traffic = _random_traffic(1500, 500, seed=3)
+        for i, observation in enumerate(traffic):
+            if i % 3:
+                observation['latitude'] = 52.5 + (observation['latitude'] - 52.5) * 0.2
+                observation['longitude'] = 13.5 + (observation['longitude'] - 13.5) * 0.2
+        for observation in traffic:
+            expected = sorted((e['encounter']['entityId'], e['encounterTime']) for e in grid.process(observation))
+            self.assertEqual(expected, sorted((e['encounter']['entityId'], e['encounterTime']) for e in quadtree.process(observation)))
+        self.assertGreater(quadtree._index.leaf_count, 1)
+
+    def test_composite_settings(self):
+        import streamsx.geospatial as geo
+        composite = geo.FlightPathEncounter(north_latitude=52.6, south_latitude=52.4, west_longitude=13.3, east_longitude=13.5, num_latitude_divs=5, num_longitude_divs=5, search_radius=10000, altitude_search_radius=400, time_search_interval=600000)
+        composite.index_type = 'quadtree'
+        composite.cleanup_interval = 900000
+        engine = FlightPathEncounterEngine.from_composite(composite)
+        self.assertEqual('quadtree', engine.index_type)
+        self.assertEqual(900000, engine.cleanup_interval)
+        # the tiles of the local engine have the bounds and grids of the tile operators of the composite
+        composite.index_type = None
+        composite.num_latitude_tiles = 2
+        composite.num_longitude_tiles = 4
+        tiling = composite._tiling()
+        tiled = TiledFlightPathEncounterEngine.from_composite(composite)
+        self.assertEqual((3, 2), tiling.divisions(composite.num_latitude_divs, composite.num_longitude_divs))
+        for tile, tile_engine in enumerate(tiled.engines):
+            self.assertEqual(tiling.bounds(tile), (tile_engine.north_latitude, tile_engine.south_latitude, tile_engine.west_longitude, tile_engine.east_longitude))
+            self.assertEqual((3, 2), (tile_engine.num_latitude_divs, tile_engine.num_longitude_divs))
+
+    def test_vectorized_solver(self):
+        from streamsx.geospatial.local._encounter import _motion, _closest_encounter, _closest_encounters
+        observations = _random_traffic(400, 400, seed=7)
+        traffic = [_motion(o['latitude'], o['longitude'], o['altitude'], o['observationTime'], o['azimuth'], o['groundSpeed'], o['altitudeChangeRate']) for o in observations]
+        a = traffic[-1]
+        found, distance, time = _closest_encounters(a, np.array(traffic[:-1]), 600000, 20000, 500)
+        self.assertTrue(found.any())
+        for i, b in enumerate(traffic[:-1]):
+            expected = _closest_encounter(a, b, 600000, 20000, 500)
+            self.assertEqual(expected is not None, bool(found[i]))
+            if expected is not None:
+                self.assertAlmostEqual(expected[0], distance[i], places=3)
+                self.assertEqual(expected[1], time[i])
+        # the engine stores the same motion rows
+        engine = _engine()
+        engine.process(observations[0])
+        self.assertEqual(traffic[0], tuple(engine._table[engine._slots[observations[0]['entityId']], :len(a)].tolist()))
+
+    def test_stats(self):
+        engine = _engine(time_search_interval=60000, cleanup_interval=60000)
+        engine.process(_plane('a', 52.3, 13.5, 0, azimuth=0.0))
+        engine.process(_plane('b', 52.48, 13.5, 0, azimuth=180.0))
+        engine.process(_plane('c', 52.9, 13.9, 200000))
+        stats = engine.stats
+        self.assertEqual(3, stats['nObservations'])
+        self.assertEqual(1, stats['nEncounterTests'])
+        self.assertEqual(1, stats['nEncounters'])
+        self.assertEqual(2, stats['nExpiredObjects'])
+        self.assertEqual(1, stats['nTrackedObjects'])
+        self.assertGreaterEqual(stats['nCellsVisited'], 3)
+        self.assertGreaterEqual(stats['cleanupTimeMillis'], 0.0)
+
+    def test_process_columns(self):
+        traffic = _random_traffic(2000, 300, seed=9)
+        dtype = [('entityId', 'U8'), ('latitude', 'f8'), ('longitude', 'f8'), ('altitude', 'f8'), ('observationTime', 'i8'), ('azimuth', 'f8'), ('groundSpeed', 'f8'), ('altitudeChangeRate', 'f8')]
+        data = np.array([tuple(o[name] for name, _ in dtype) for o in traffic], dtype=dtype)
+        columns = observation_columns(data)
+        # numeric fields are views of the structured array
+        self.assertTrue(np.shares_memory(columns['latitude'], data))
+        single = _engine(time_search_interval=60000)
+        expected = []
+        for i, observation in enumerate(traffic):
+            expected.extend((i, e['encounter']['entityId'], e['encounterTime']) for e in single.process(observation))
+        engine = _engine(time_search_interval=60000)
+        events = engine.process_columns(data[:1000])
+        events2 = engine.process_columns(dict((name, data[name][1000:]) for name, _ in dtype))
+        rows = np.concatenate((events['observation'], events2['observation'] + 1000))
+        actual = list(zip(rows.tolist(), np.concatenate((events['encounter'], events2['encounter'])).tolist(), np.concatenate((events['encounterTime'], events2['encounterTime'])).tolist()))
+        self.assertTrue(len(expected) > 50)
+        self.assertEqual(sorted(expected), sorted(actual))
+        self.assertEqual(single.object_count, engine.object_count)
+        # stored columnar observations are returned as dicts by the per-tuple processing
+        event = engine.process(_plane('p0', traffic[-1]['latitude'], traffic[-1]['longitude'], traffic[-1]['observationTime'], altitude=traffic[-1]['altitude']))
+        for e in event:
+            self.assertEqual(sorted(_plane('x', 0, 0, 0)), sorted(e['encounter']))
+
+    def test_replay_csv_output(self):
+        traffic = _random_traffic(500, 50, seed=4)
+        single = _engine(time_search_interval=60000)
+        expected = sum(len(single.process(o)) for o in traffic)
+        output = os.path.join(tempfile.mkdtemp(), 'encounters.csv')
+        summary = replay(traffic, _engine(time_search_interval=60000), output=output)
+        self.assertEqual(expected, summary['events'])
+        with open(output, newline='') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(expected, len(rows))
+        self.assertIn('encounter.entityId', rows[0])
+
+    def test_snapshot_restore(self):
+        traffic = _random_traffic(2000, 300, seed=6)
+        engine = _engine(time_search_interval=60000)
+        for observation in traffic[:1000]:
+            engine.process(observation)
+        path = os.path.join(tempfile.mkdtemp(), 'objects.snapshot')
+        engine.snapshot(path)
+        restored = FlightPathEncounterEngine.restore(path)
+        self.assertEqual(engine.object_count, restored.object_count)
+        for observation in traffic[1000:]:
+            expected = [(e['encounter']['entityId'], e['encounterTime']) for e in engine.process(observation)]
+            self.assertEqual(sorted(expected), sorted((e['encounter']['entityId'], e['encounterTime']) for e in restored.process(observation)))
+        self.assertEqual(engine.object_count, restored.object_count)
+
+    def test_stream(self):
+        traffic = _random_traffic(1000, 100, seed=8)
+        single = _engine(time_search_interval=60000)
+        expected = sorted((e['observation']['entityId'], e['encounter']['entityId'], e['encounterTime']) for o in traffic for e in single.process(o))
+
+        async def source():
+            for observation in traffic:
+                yield observation
+
+        async def collect(engine, **kwargs):
+            return [(e['observation']['entityId'], e['encounter']['entityId'], e['encounterTime']) async for e in engine.stream(source(), **kwargs)]
+
+        self.assertGreater(len(expected), 10)
+        self.assertEqual(expected, sorted(asyncio.run(collect(_engine(time_search_interval=60000)))))
+        self.assertEqual(expected, sorted(asyncio.run(collect(_engine(time_search_interval=60000), batch_size=32, batch_timeout=0.01))))
+
+    def test_observation_columns_datetime(self):
+        columns = observation_columns({'entityId': ['a'], 'latitude': [52.0], 'longitude': [13.0], 'altitude': [1000.0], 'observationTime': np.array(['2020-01-01T00:00:01'], dtype='datetime64[s]'), 'azimuth': [0.0], 'groundSpeed': [100.0], 'altitudeChangeRate': [0.0]})
+        self.assertEqual([1577836801000], columns['observationTime'].tolist())
+        self.assertRaises(TypeError, observation_columns, np.zeros(3))
+
+    def test_cleanup_and_filter(self):
+        engine = _engine(time_search_interval=60000, filter_by_bounding_box=True)
+        engine.process(_plane('a', 52.3, 13.5, 0))
+        self.assertEqual([], engine.process(_plane('x', 51.0, 13.5, 0)))
+        self.assertEqual(1, engine.object_count)
+        engine.process(_plane('b', 52.5, 13.5, 200000))
+        self.assertEqual(1, engine.object_count)
+
+    def test_incremental_cleanup(self):
+        engine = _engine(time_search_interval=10000, cleanup_interval=30000, cleanup_batch_size=2)
+        for i in range(10):
+            engine.process(_plane('old%d' % i, 52.1 + i * 0.05, 13.1, i))
+        self.assertEqual(10, engine.object_count)
+        # each observation expires at most two stale objects
+        engine.process(_plane('new0', 52.5, 13.9, 40000))
+        self.assertEqual(9, engine.object_count)
+        for i in range(1, 5):
+            engine.process(_plane('new0', 52.5, 13.9, 40000 + i))
+        self.assertEqual(1, engine.object_count)
+        # expiry entries of updated objects do not pile up
+        for i in range(1000):
+            engine.process(_plane('new0', 52.5, 13.9, 50000 + 100 * i))
+        self.assertLess(len(engine._expiry), 400)
+
+    def test_report_interval(self):
+        traffic = _random_traffic(3000, 100, seed=9)
+        single = _engine(time_search_interval=60000, search_radius=20000)
+        found = [[(e['encounter']['entityId'], e['encounterTime'], e['encounterDistance']) for e in single.process(o)] for o in traffic]
+        counts = []
+        for interval, time_threshold in ((300000, None), (300000, 5000)):
+            # each pair is reported on its first encounter and again after the interval or if the encounter time moved
+            reported = {}
+            expected = []
+            for observation, encounters in zip(traffic, found):
+                now = observation['observationTime']
+                for other, when, distance in encounters:
+                    pair = tuple(sorted((observation['entityId'], other)))
+                    last = reported.get(pair)
+                    if last is None or now - last[0] >= interval or (time_threshold is not None and abs(when - last[1]) > time_threshold):
+                        reported[pair] = (now, when)
+                        expected.append((now, other))
+            engine = _engine(time_search_interval=60000, search_radius=20000, report_interval=interval, report_time_threshold=time_threshold)
+            actual = [(o['observationTime'], e['encounter']['entityId']) for o in traffic for e in engine.process(o)]
+            self.assertEqual(expected, actual)
+            counts.append(len(actual))
+            self.assertEqual(single.stats['nEncounters'], engine.stats['nEncounters'] + engine.stats['nSuppressedEncounters'])
+        # the threshold reports some of the suppressed encounters
+        self.assertLess(counts[0], counts[1])
+        self.assertLess(counts[1], single.stats['nEncounters'])
+        self.assertRaises(ValueError, _engine, report_time_threshold=1000)
+
+    def test_pack_encounters(self):
+        traffic = _random_traffic(2000, 100, seed=10)
+        single = _engine(time_search_interval=60000, report_interval=20000)
+        packed = _engine(time_search_interval=60000, report_interval=20000, pack_encounters=True)
+        tiled = TiledFlightPathEncounterEngine(2, 2, max_ground_speed=250.0, north_latitude=53.0, south_latitude=52.0, west_longitude=13.0, east_longitude=14.0,
+                                               num_latitude_divs=6, num_longitude_divs=6, search_radius=1000, altitude_search_radius=300, time_search_interval=60000,
+                                               report_interval=20000, pack_encounters=True)
+        total = 0
+        for observation in traffic:
+            expected = sorted((e['encounter']['entityId'], e['encounterTime']) for e in single.process(observation))
+            for engine in (packed, tiled):
+                events = engine.process(observation)
+                self.assertEqual(1 if expected else 0, len(events))
+                if events:
+                    self.assertIs(observation, events[0]['observation'])
+                    self.assertEqual(expected, sorted((e['encounter']['entityId'], e['encounterTime']) for e in events[0]['encounters']))
+            total += len(expected)
+        self.assertGreater(total, 20)
+        self.assertEqual(single.stats['nSuppressedEncounters'], tiled.stats['nSuppressedEncounters'])
+
+    def test_report_filters(self):
+        from streamsx.geospatial._reports import _EncounterReports, _PackEncounters
+        def event(a, b, now, when, distance):
+            return {'observation': _plane(a, 52.0, 13.0, now), 'encounter': _plane(b, 52.0, 13.0, now), 'encounterTime': when, 'encounterDistance': distance}
+        reports = _EncounterReports(10000, distance_threshold=100.0)
+        self.assertTrue(reports(event('a', 'b', 0, 50000, 500.0)))
+        self.assertFalse(reports(event('b', 'a', 1000, 50000, 450.0)))
+        self.assertTrue(reports(event('b', 'a', 2000, 50000, 350.0)))
+        self.assertFalse(reports(event('a', 'b', 11000, 50000, 350.0)))
+        self.assertTrue(reports(event('a', 'b', 12000, 50000, 350.0)))
+        self.assertEqual(2, reports.suppressed)
+        events = [event('a', 'b', 0, 5, 1.0), event('a', 'c', 0, 6, 2.0), event('b', 'c', 0, 7, 3.0)]
+        packed = _PackEncounters()(events)
+        self.assertEqual(['a', 'b'], [p['observation']['entityId'] for p in packed])
+        self.assertEqual([[5, 6], [7]], [[e['encounterTime'] for e in p['encounters']] for p in packed])
+        self.assertEqual(['encounters', 'observation'], sorted(packed[0]))
+
+    def test_tiles_match_single_engine(self):
+        args = dict(north_latitude=53.0, south_latitude=52.0, west_longitude=13.0, east_longitude=14.0, num_latitude_divs=6, num_longitude_divs=6, search_radius=1000, altitude_search_radius=300, time_search_interval=30000)
+        single = FlightPathEncounterEngine(**args)
+        tiled = TiledFlightPathEncounterEngine(2, 3, max_ground_speed=250.0, **args)
+        self.assertEqual(6, tiled.tile_count)
+        total = 0
+        for observation in _random_traffic(3000, 300, seed=5):
+            expected = sorted((e['encounter']['entityId'], e['encounterTime']) for e in single.process(observation))
+            self.assertEqual(expected, sorted((e['encounter']['entityId'], e['encounterTime']) for e in tiled.process(observation)))
+            total += len(expected)
+        self.assertGreater(total, 20)
+        self.assertGreaterEqual(tiled.object_count, single.object_count)
+
+    def test_tiles_drop_objects_that_left(self):
+        args = dict(north_latitude=52.5, south_latitude=51.5, west_longitude=13.0, east_longitude=21.0, num_latitude_divs=2, num_longitude_divs=16, search_radius=1000, altitude_search_radius=300, time_search_interval=30000)
+        tiled = TiledFlightPathEncounterEngine(1, 8, max_ground_speed=250.0, **args)
+        tiling = tiled._tiling
+        # one object flies east across all tiles, each tile holds a parked object so that its flight paths expire
+        tiled.process(_plane('gone', 51.6, 13.2, 0, speed=0.0))
+        self.assertIn('gone', tiled._members[0])
+        for i in range(230):
+            now = i * 10000
+            longitude = 13.05 + i * 0.034
+            tiled.process(_plane('a', 52.0, longitude, now, azimuth=90.0, speed=250.0))
+            for tile in range(8):
+                tiled.process(_plane('p%d' % tile, 51.6, 13.5 + tile, now, speed=0.0))
+        self.assertEqual(7, tiling.home(52.0, longitude))
+        holding = [tile for tile, engine in enumerate(tiled.engines) if 'a' in engine._slots]
+        self.assertEqual(sorted(tiling.tiles(52.0, longitude)), holding)
+        self.assertEqual(9, tiled.object_count)
+        # the memberships of the tiles hold the objects observed within their halo during the cleanup interval only
+        self.assertEqual([[], [], [], [], [], [], [], ['a']], [sorted(m for m in members._observed if m == 'a') for members in tiled._members])
+        self.assertEqual(9, sum(len(members) for members in tiled._members))
+        self.assertNotIn('gone', tiled._members[0])
+
+    def test_tile_routing(self):
+        from streamsx.geospatial._tiling import _Tiling, _TileRouter, _HomeTile
+        # 1 degree of latitude halo
+        tiling = _Tiling(60.0, 40.0, 350.0, 10.0, 2, 2, 111195.0)
+        self.assertEqual(0, tiling.home(45.0, 355.0))
+        self.assertEqual(3, tiling.home(55.0, 5.0))
+        self.assertEqual(3, tiling.home(70.0, 20.0))
+        self.assertEqual([0], tiling.tiles(42.0, 352.0))
+        self.assertEqual([0, 1, 2, 3], tiling.tiles(50.2, 0.5))
+        north, south, west, east = tiling.bounds(0)
+        self.assertAlmostEqual(51.0, north, places=4)
+        self.assertAlmostEqual(39.0, south, places=4)
+        self.assertTrue(348.0 < west < 349.0 and 1.0 < east < 2.0)
+        router = _TileRouter(tiling, 1, 1000)
+        self.assertTrue(router(_plane('a', 45.0, 0.5, 0)))
+        # the first observation outside of the halo replaces the flight path in the tile
+        self.assertTrue(router({'observation': _plane('a', 45.0, 355.0, 1)}))
+        self.assertFalse(router(_plane('a', 45.0, 355.0, 2)))
+        # objects that stop reporting within the halo are forgotten after the cleanup interval
+        for i in range(100):
+            self.assertTrue(router(_plane('p%d' % i, 45.0, 0.5, 10 * i)))
+        self.assertLessEqual(len(router._members), 101)
+        self.assertTrue(router(_plane('b', 45.0, 0.5, 2000)))
+        self.assertEqual(1, len(router._members))
+        self.assertEqual(1, len(router._members._expiry))
+        # an object forgotten by the tile is not routed to it
+        self.assertFalse(router(_plane('p99', 45.0, 355.0, 2001)))
+        home = _HomeTile(tiling, 1)
+        self.assertTrue(home({'observation': _plane('a', 45.0, 0.5, 0)}))
+        self.assertFalse(home({'observation': _plane('a', 45.0, 359.5, 0)}))
+
+
+class TestGeodesy(unittest.TestCase):
+
+    def test_meters_per_degree(self):
+        north, east = meters_per_degree(np.array([0.0, 45.0, 90.0]))
+        np.testing.assert_allclose([110574.276, 111131.777, 111693.980], north, rtol=1e-8)
+        np.testing.assert_allclose([111319.491, 78846.835, 0.0], east, rtol=1e-8, atol=1e-6)
+
+    def test_distances(self):
+        # Flinders Peak to Buninyong, the example of Vincenty's paper
+        self.assertAlmostEqual(54972.271, float(vincenty_distance(-37.95103342, 144.42486789, -37.65282114, 143.92649554)), places=2)
+        self.assertEqual(0.0, float(vincenty_distance(52.5, 13.4, 52.5, 13.4)))
+        rnd = np.random.RandomState(3)
+        lats = rnd.uniform(-70.0, 70.0, 1000)
+        lons = rnd.uniform(-180.0, 180.0, 1000)
+        distances = rnd.uniform(1000.0, 100000.0, 1000)
+        lats2, lons2 = destination_point(lats, lons, rnd.uniform(0.0, 360.0, 1000), distances)
+        np.testing.assert_allclose(distances, haversine_distance(lats, lons, lats2, lons2), rtol=1e-9)
+        exact = vincenty_distance(lats, lons, lats2, lons2)
+        np.testing.assert_allclose(exact, approximate_distance(lats, lons, lats2, lons2), rtol=1e-3)
+        # sphere and ellipsoid differ by less than 1%
+        np.testing.assert_allclose(exact, distances, rtol=1e-2)
+
+
+class TestImports(unittest.TestCase):
+
+    def test_lazy_imports(self):
+        # the local engines and the schema module are imported without the topology stack
+        code = ("import sys\n"
+                "import streamsx.geospatial\n"
+                "from streamsx.geospatial.local import RegionMatchEngine, FlightPathEncounterEngine\n"
+                "from streamsx.geospatial.schema import RegionMatchSchema\n"
+                "assert not [m for m in sys.modules if m.startswith('streamsx.topology') or m.startswith('streamsx.spl')]\n"
+                "assert str(RegionMatchSchema.Devices).startswith('tuple<')\n"
+                "assert 'streamsx.topology.schema' in sys.modules\n"
+                "assert streamsx.geospatial.region_match.__module__ == 'streamsx.geospatial._geospatial'\n")
+        subprocess.check_call([sys.executable, '-c', code], cwd=os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+
+if __name__ == '__main__':
+    unittest.main()